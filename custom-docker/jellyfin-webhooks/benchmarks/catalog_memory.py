@@ -0,0 +1,141 @@
+'''
+Memory benchmark for the in-memory library catalog (`Series` / `Season` / `Episode`).
+
+Builds a synthetic series library (see `synthetic_library.py`) for every requested scale, loads a
+warm catalog of it (every season refreshed, every episode's number, name and video file resolved)
+and reports the memory the catalog keeps alive, measured with `tracemalloc`.
+
+Usage (from `custom-docker/jellyfin-webhooks`):
+
+    python -m benchmarks.catalog_memory --scales 1000,10000 --output catalog.json
+    python -m benchmarks.catalog_memory --scales 1000 --compare catalog.json
+'''
+import os
+import gc
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+from benchmarks.common import git_revision, prepare_environment
+from benchmarks.synthetic_library import LibraryLayout, generate
+
+
+def load_catalog(series_root: str, names: list) -> list:
+    from jellyfin_webhooks.components.series import Series
+
+    catalog = []
+    for name in names:
+        series = Series(name=name, base_dir=os.path.join(series_root, name))
+        series.refresh()
+        for season in series.seasons.values():
+            for episode in season.episodes.values():
+                episode.episode_num, episode.name, episode.file
+        catalog.append(series)
+    return catalog
+
+
+def run_scale(episodes: int, args) -> dict:
+    series = max(1, round(episodes / (args.seasons * args.episodes)))
+    layout = LibraryLayout(series=series, seasons=args.seasons, episodes=args.episodes, movies=0, pack_ratio=0, seed=args.seed)
+    root = tempfile.mkdtemp(prefix=f'jfw-catalog-{episodes}-', dir=args.root)
+    try:
+        library = generate(root, layout)
+        series_root = os.path.join(library.media_root, 'series')
+        names = sorted(os.listdir(series_root))
+
+        # Imports and parser caches would otherwise be counted against the catalog
+        load_catalog(series_root, names[:1])
+        gc.collect()
+        tracemalloc.start()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        catalog = load_catalog(series_root, names)
+        load_s = time.perf_counter() - start
+        gc.collect()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        loaded = sum(len(season.episodes) for s in catalog for season in s.seasons.values())
+        retained = current - baseline
+        del catalog
+        return {
+            "episodes": loaded,
+            "series": layout.series,
+            "seasons": layout.seasons,
+            "load_s": round(load_s, 3),
+            "retained_bytes": retained,
+            "peak_bytes": peak - baseline,
+            "bytes_per_episode": round(retained / loaded, 1) if loaded else None,
+        }
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(current: dict, baseline: dict):
+    previous = {r['episodes']: r for r in baseline.get('results', [])}
+    print(f"\nComparison against {baseline.get('meta', {}).get('git_revision', '?')} (bytes per episode)")
+    print(f"{'episodes':>10} {'baseline':>12} {'current':>12} {'change':>9}")
+    for result in current['results']:
+        old = previous.get(result['episodes'])
+        if not old:
+            continue
+        before, after = old['bytes_per_episode'] or 0, result['bytes_per_episode'] or 0
+        change = ((after - before) / before * 100) if before else 0
+        print(f"{result['episodes']:>10} {before:>12.1f} {after:>12.1f} {change:>8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1000,10000', help='Comma separated library sizes (episodes)')
+    parser.add_argument('--seasons', type=int, default=4, help='Seasons per series')
+    parser.add_argument('--episodes', type=int, default=10, help='Episodes per season')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--root', default=None, help='Directory to build the synthetic trees in (default: system temp)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated trees')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='jfw-catalog-app-')
+    prepare_environment(workdir)
+
+    results = {
+        "meta": {
+            "benchmark": "catalog_memory",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    try:
+        for episodes in [int(s) for s in args.scales.split(',') if s.strip()]:
+            print(f"Running catalog_memory benchmark with {episodes} episodes...", file=sys.stderr)
+            result = run_scale(episodes, args)
+            results['results'].append(result)
+            print(f"  {result['bytes_per_episode']} bytes/episode, loaded in {result['load_s']}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
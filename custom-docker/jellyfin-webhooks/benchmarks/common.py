@@ -0,0 +1,45 @@
+import os
+import statistics
+import subprocess
+
+
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def pick(p):
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))], 3)
+
+    return {
+        "min": round(ordered[0], 3),
+        "p50": pick(50),
+        "p90": pick(90),
+        "p99": pick(99),
+        "max": round(ordered[-1], 3),
+        "mean": round(statistics.fmean(ordered), 3),
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(__file__), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return 'unknown'
+
+
+def prepare_environment(workdir: str):
+    '''
+    Must run before `jellyfin_webhooks` is imported: constants are read from the environment at import time
+    '''
+    os.makedirs(workdir, exist_ok=True)
+    os.environ.setdefault('JELYFIN_WEBHOOKS_LOG_FILE', os.path.join(workdir, 'app.log'))
+    os.environ.setdefault('JELYFIN_WEBHOOKS_SETTINGS_FILE', os.path.join(workdir, 'settings.json'))
+    os.environ.setdefault('JELYFIN_WEBHOOKS_REQUESTS_DIR', os.path.join(workdir, 'requests'))
+    os.environ.setdefault('JELYFIN_WEBHOOKS_REQUESTS_INDEX_FILE', os.path.join(workdir, 'requests_index.sqlite3'))
+    os.environ.setdefault('JELYFIN_WEBHOOKS_WATCHED_STORE_FILE', os.path.join(workdir, 'watched.sqlite3'))
+    os.environ.setdefault('JELYFIN_WEBHOOKS_LINK_REPORT_DIR', os.path.join(workdir, 'link_reports'))
+    # Benchmarks point the app at their own trees after startup
+    os.environ.setdefault('JELYFIN_WEBHOOKS_WARMUP', 'false')
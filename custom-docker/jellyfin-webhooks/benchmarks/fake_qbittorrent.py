@@ -0,0 +1,147 @@
+'''
+Minimal in-process stand-in for the qBittorrent WebUI API (v2).
+
+Implements just enough of the API for `qbittorrentapi.Client` to log in, list torrents and
+add tags, so the webhooks can be exercised without a real client (or VPN tunnel).
+'''
+import json
+import time
+import threading
+import collections
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+
+class FakeQBittorrent:
+    def __init__(self, torrents: list = None, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0):
+        self.torrents = {t['hash']: dict(t) for t in (torrents or [])}
+        self.latency_ms = latency_ms
+        self.calls = collections.Counter()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeQBittorrent':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-qbittorrent', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def tagged(self, tag: str = 'watched') -> list:
+        with self._lock:
+            return [t['name'] for t in self.torrents.values() if tag in _split_tags(t.get('tags', ''))]
+
+    # --- API implementation ---
+
+    def _torrents_info(self, params: dict) -> list:
+        with self._lock:
+            torrents = [dict(t) for t in self.torrents.values()]
+        if params.get('hashes'):
+            hashes = set(params['hashes'].split('|'))
+            torrents = [t for t in torrents if t['hash'] in hashes]
+        if 'category' in params:
+            torrents = [t for t in torrents if t.get('category') == params['category']]
+        if params.get('tag'):
+            torrents = [t for t in torrents if params['tag'] in _split_tags(t.get('tags', ''))]
+        if params.get('sort'):
+            torrents.sort(key=lambda t: t.get(params['sort']) or 0, reverse=params.get('reverse', '').lower() == 'true')
+        offset = int(params.get('offset') or 0)
+        if offset:
+            torrents = torrents[offset:]
+        if params.get('limit'):
+            torrents = torrents[:int(params['limit'])]
+        return torrents
+
+    def _add_tags(self, params: dict):
+        tags = [t.strip() for t in params.get('tags', '').split(',') if t.strip()]
+        hashes = params.get('hashes', '')
+        with self._lock:
+            targets = self.torrents.values() if hashes == 'all' else [self.torrents[h] for h in hashes.split('|') if h in self.torrents]
+            for torrent in targets:
+                current = _split_tags(torrent.get('tags', ''))
+                torrent['tags'] = ', '.join(current + [t for t in tags if t not in current])
+
+    def _all_tags(self) -> list:
+        with self._lock:
+            return sorted({tag for t in self.torrents.values() for tag in _split_tags(t.get('tags', ''))})
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, *args):
+                pass
+
+            def _params(self) -> dict:
+                params = {k: v[-1] for k, v in parse_qs(urlparse(self.path).query).items()}
+                length = int(self.headers.get('Content-Length') or 0)
+                if length:
+                    body = self.rfile.read(length).decode()
+                    params.update({k: v[-1] for k, v in parse_qs(body, keep_blank_values=True).items()})
+                return params
+
+            def _reply(self, status: int, body, content_type: str = 'text/plain', headers: dict = None):
+                payload = body if isinstance(body, bytes) else body.encode()
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _json(self, data):
+                self._reply(200, json.dumps(data), 'application/json')
+
+            def _dispatch(self):
+                path = urlparse(self.path).path
+                params = self._params()
+                with fake._lock:
+                    fake.calls[path] += 1
+                if fake.latency_ms:
+                    time.sleep(fake.latency_ms / 1000)
+
+                if path == '/api/v2/auth/login':
+                    return self._reply(200, 'Ok.', headers={'Set-Cookie': 'SID=fake-session; HttpOnly; path=/'})
+                if path == '/api/v2/auth/logout':
+                    return self._reply(200, '')
+                if path == '/api/v2/app/version':
+                    return self._reply(200, 'v4.6.3')
+                if path == '/api/v2/app/webapiVersion':
+                    return self._reply(200, '2.9.3')
+                if path == '/api/v2/app/buildInfo':
+                    return self._json({"qt": "6.5.2", "libtorrent": "1.2.19.0", "boost": "1.83.0", "openssl": "3.1.3", "bitness": 64})
+                if path == '/api/v2/torrents/info':
+                    return self._json(fake._torrents_info(params))
+                if path == '/api/v2/torrents/addTags':
+                    fake._add_tags(params)
+                    return self._reply(200, '')
+                if path == '/api/v2/torrents/tags':
+                    return self._json(fake._all_tags())
+                return self._reply(404, 'Not Found')
+
+            do_GET = _dispatch
+            do_POST = _dispatch
+
+        return Handler
+
+
+def _split_tags(tags: str) -> list:
+    return [t.strip() for t in tags.split(',') if t.strip()]
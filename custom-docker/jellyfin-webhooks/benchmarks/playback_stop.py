@@ -0,0 +1,159 @@
+'''
+End-to-end benchmark for `/webhook/playback_stop`.
+
+Builds a synthetic library (see `synthetic_library.py`) for every requested scale, points the app
+at it and at a local fake qBittorrent, then fires recorded-style `PlaybackStop` events through the
+Flask app and reports request latency and the per-phase timings returned by the handler.
+
+Usage (from `custom-docker/jellyfin-webhooks`):
+
+    python -m benchmarks.playback_stop --scales 1000,10000,100000 --output bench.json
+    python -m benchmarks.playback_stop --scales 1000 --compare bench.json
+'''
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+
+from benchmarks.common import git_revision, percentiles, prepare_environment
+from benchmarks.fake_qbittorrent import FakeQBittorrent
+from benchmarks.synthetic_library import LibraryLayout, generate
+
+
+def pick_events(events: list, count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    if count >= len(events):
+        return list(events)
+    return rng.sample(events, count)
+
+
+def run_scale(app, c, files: int, args) -> dict:
+    layout = LibraryLayout.for_file_count(files, seasons=args.seasons, episodes=args.episodes, movie_ratio=args.movie_ratio, seed=args.seed)
+    root = tempfile.mkdtemp(prefix=f'jfw-bench-{files}-', dir=args.root)
+    try:
+        start = time.perf_counter()
+        library = generate(root, layout)
+        generate_s = time.perf_counter() - start
+
+        c.MEDIA_DATA_ROOT = library.media_root
+        c.TORRENTS_DATA_ROOT = library.torrents_root
+
+        with FakeQBittorrent(library.torrents, latency_ms=args.qbt_latency_ms) as qbt:
+            c.QBT_HOST = qbt.url
+            client = app.test_client()
+            url = f'{c.BASE_URL}/webhook/playback_stop' + ('?dry_run=true' if args.dry_run else '')
+
+            events = pick_events(library.events, args.requests + args.warmup, args.seed)
+            latencies, phases, statuses = [], {}, {}
+            for i, event in enumerate(events):
+                start = time.perf_counter()
+                response = client.post(url, json=event)
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                if i < args.warmup:
+                    continue
+
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+                latencies.append(elapsed_ms)
+                body = response.get_json(silent=True) or {}
+                for phase, value in (body.get('timings_ms') or {}).items():
+                    phases.setdefault(phase, []).append(value)
+
+            return {
+                "files": files,
+                "layout": {
+                    "series": layout.series,
+                    "seasons": layout.seasons,
+                    "episodes": layout.episodes,
+                    "movies": layout.movies,
+                    "video_files": layout.video_files,
+                    "files_written": library.files_written,
+                    "torrents": len(library.torrents),
+                },
+                "generate_s": round(generate_s, 3),
+                "requests": len(latencies),
+                "statuses": {str(k): v for k, v in sorted(statuses.items())},
+                "errors": sum(v for k, v in statuses.items() if k >= 400),
+                "latency_ms": percentiles(latencies),
+                "phases_ms": {phase: percentiles(values) for phase, values in sorted(phases.items())},
+                "qbittorrent_calls": dict(qbt.calls),
+            }
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+def compare(current: dict, baseline: dict):
+    previous = {r['files']: r for r in baseline.get('results', [])}
+    print(f"\nComparison against {baseline.get('meta', {}).get('git_revision', '?')} (p50 latency, ms)")
+    print(f"{'files':>10} {'baseline':>12} {'current':>12} {'change':>9}")
+    for result in current['results']:
+        old = previous.get(result['files'])
+        if not old:
+            continue
+        before, after = old['latency_ms'].get('p50', 0), result['latency_ms'].get('p50', 0)
+        change = ((after - before) / before * 100) if before else 0
+        print(f"{result['files']:>10} {before:>12.2f} {after:>12.2f} {change:>8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1000,10000,100000', help='Comma separated library sizes (video files)')
+    parser.add_argument('--requests', type=int, default=50, help='Measured requests per scale')
+    parser.add_argument('--warmup', type=int, default=2, help='Unmeasured requests fired before measuring')
+    parser.add_argument('--seasons', type=int, default=4, help='Seasons per series')
+    parser.add_argument('--episodes', type=int, default=10, help='Episodes per season')
+    parser.add_argument('--movie-ratio', type=float, default=0.2, help='Fraction of the library that is movies')
+    parser.add_argument('--qbt-latency-ms', type=float, default=0, help='Artificial latency added to every qBittorrent call')
+    parser.add_argument('--dry-run', action='store_true', help='Send events with `dry_run=true`')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--root', default=None, help='Directory to build the synthetic trees in (default: system temp)')
+    parser.add_argument('--keep', action='store_true', help='Keep the generated trees')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='jfw-bench-app-')
+    prepare_environment(workdir)
+
+    from jellyfin_webhooks.main import create_app
+    from jellyfin_webhooks.utils.constants import constants as c
+
+    app = create_app()
+    results = {
+        "meta": {
+            "benchmark": "playback_stop",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    try:
+        for files in [int(s) for s in args.scales.split(',') if s.strip()]:
+            print(f"Running playback_stop benchmark with {files} files...", file=sys.stderr)
+            result = run_scale(app, c, files, args)
+            results['results'].append(result)
+            print(f"  p50={result['latency_ms'].get('p50')}ms p99={result['latency_ms'].get('p99')}ms errors={result['errors']}", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+'''
+Load-replay harness driven by the request logs recorded by `RequestLogger`.
+
+Reads `<requests-dir>/webhook/<endpoint>[.<timestamp>].jsonl[.gz|.zst]` (current, rotated and compacted segments),
+orders the recorded requests by their original timestamp and re-fires their bodies at the app.
+Every request is forced into dry-run mode so nothing gets tagged, and flagged as a replay (`?replay=true`):
+unlike a manual dry run, it still goes through the event filter, so requests the live service ignored
+are ignored again and the replayed load matches the recorded one.
+
+Pacing:
+    --speed X     keep the recorded inter-arrival gaps, X times faster (bursts are preserved)
+    --rate N      fire at a fixed N requests/second
+    (neither)     fire as fast as `--concurrency` allows
+
+Targets:
+    --target URL  an already running instance, e.g. http://localhost:5000/jellyfin-webhooks
+    --in-process  a Flask app built in this process (optionally against `--fake-qbt`)
+
+Usage (from `custom-docker/jellyfin-webhooks`):
+
+    python -m benchmarks.replay --requests-dir ./data/requests --in-process --fake-qbt torrents.json --speed 10
+    python -m benchmarks.replay --requests-dir ./data/requests --target http://nas:5000/jellyfin-webhooks --concurrency 8
+'''
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.common import git_revision, percentiles, prepare_environment
+
+DEFAULT_ENDPOINTS = ('playback_stop', 'stremio-event')
+# Recorded endpoint log name -> route it was recorded for
+ROUTES = {
+    'playback_stop': '/webhook/playback_stop',
+    'stremio-event': '/webhook/stremio-event',
+}
+
+
+def load_requests(requests_dir: str, endpoints: list, since: float = 0, limit: int = 0) -> list:
+    '''
+    Reads the recorded requests of `endpoints` from their log segments (live, rotated and compacted), oldest first.
+    Imports the app's modules: in-process, call it once the environment is prepared
+    '''
+    from jellyfin_webhooks.utils.log_segments import list_segments, iter_lines
+
+    category_dir = os.path.join(requests_dir, 'webhook')
+    if not os.path.isdir(category_dir):
+        return []
+    entries = []
+    for endpoint in endpoints:
+        for segment in list_segments(category_dir, endpoint):
+            for line in iter_lines(segment.path):
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if entry.get('method') != 'POST' or entry.get('timestamp', 0) < since:
+                    continue
+                if not isinstance(entry.get('body'), dict):
+                    continue
+                entries.append((entry['timestamp'], endpoint, entry['body']))
+    entries.sort(key=lambda e: e[0])
+    return entries[:limit] if limit else entries
+
+
+class HttpTarget:
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def post(self, route: str, body: dict) -> int:
+        req = urllib.request.Request(
+            f'{self.base_url}{route}?dry_run=true&replay=true',
+            data=json.dumps(body).encode(),
+            headers={'Content-Type': 'application/json', 'User-Agent': 'jellyfin-webhooks-replay'},
+            method='POST',
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+class InProcessTarget:
+    def __init__(self, app, base_url: str):
+        self.app = app
+        self.base_url = base_url
+        self._local = threading.local()
+
+    def post(self, route: str, body: dict) -> int:
+        # Test clients are cheap, but not meant to be shared across threads
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client.post(f'{self.base_url}{route}?dry_run=true&replay=true', json=body).status_code
+
+
+class Replayer:
+    def __init__(self, target, concurrency: int, rate: float = 0, speed: float = 0):
+        self.target = target
+        self.concurrency = concurrency
+        self.rate = rate
+        self.speed = speed
+        self.latencies = []
+        self.lags = []
+        self.statuses = {}
+        self.exceptions = {}
+        self._lock = threading.Lock()
+
+    def _fire(self, scheduled_at: float, endpoint: str, body: dict):
+        started = time.perf_counter()
+        status = None
+        try:
+            status = self.target.post(ROUTES[endpoint], body)
+        except Exception as e:
+            with self._lock:
+                self.exceptions[type(e).__name__] = self.exceptions.get(type(e).__name__, 0) + 1
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.lags.append(max(0.0, (started - scheduled_at) * 1000))
+            if status is not None:
+                self.latencies.append(elapsed_ms)
+                key = f'{endpoint}:{status}'
+                self.statuses[key] = self.statuses.get(key, 0) + 1
+
+    def run(self, entries: list) -> dict:
+        if not entries:
+            return {"requests": 0}
+        first_ts = entries[0][0]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='replay') as pool:
+            for i, (ts, endpoint, body) in enumerate(entries):
+                if self.speed:
+                    scheduled_at = started + (ts - first_ts) / self.speed
+                elif self.rate:
+                    scheduled_at = started + i / self.rate
+                else:
+                    scheduled_at = time.perf_counter()
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                # Force dry-run in the body as well, the handler accepts either
+                pool.submit(self._fire, scheduled_at, endpoint, dict(body, dry_run=True))
+        wall_s = time.perf_counter() - started
+
+        errors = sum(v for k, v in self.statuses.items() if int(k.rsplit(':', 1)[1]) >= 400)
+        return {
+            "requests": len(entries),
+            "completed": len(self.latencies),
+            "wall_s": round(wall_s, 3),
+            "throughput_rps": round(len(self.latencies) / wall_s, 2) if wall_s else 0,
+            "latency_ms": percentiles(self.latencies),
+            "schedule_lag_ms": percentiles(self.lags),
+            "statuses": dict(sorted(self.statuses.items())),
+            "errors": errors + sum(self.exceptions.values()),
+            "exceptions": self.exceptions,
+        }
+
+
+def build_in_process_target(args):
+    workdir = tempfile.mkdtemp(prefix='jfw-replay-app-')
+    # Keep the replayed requests out of the logs being replayed
+    prepare_environment(workdir)
+
+    from jellyfin_webhooks.main import create_app
+    from jellyfin_webhooks.utils.constants import constants as c
+
+    fake_qbt = None
+    if args.fake_qbt:
+        from benchmarks.fake_qbittorrent import FakeQBittorrent
+        with open(args.fake_qbt) as f:
+            torrents = json.load(f)
+        fake_qbt = FakeQBittorrent(torrents, latency_ms=args.qbt_latency_ms).start()
+        c.QBT_HOST = fake_qbt.url
+    if args.media_root:
+        c.MEDIA_DATA_ROOT = args.media_root
+    if args.torrents_root:
+        c.TORRENTS_DATA_ROOT = args.torrents_root
+    return InProcessTarget(create_app(), c.BASE_URL), fake_qbt
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests-dir', default='/app/data/requests', help='RequestLogger directory to read from')
+    parser.add_argument('--endpoints', default=','.join(DEFAULT_ENDPOINTS), help='Comma separated webhook logs to replay')
+    parser.add_argument('--since', type=float, default=0, help='Only replay requests recorded after this unix timestamp')
+    parser.add_argument('--limit', type=int, default=0, help='Replay at most this many requests')
+    parser.add_argument('--concurrency', type=int, default=4)
+    pacing = parser.add_mutually_exclusive_group()
+    pacing.add_argument('--rate', type=float, default=0, help='Fixed requests per second')
+    pacing.add_argument('--speed', type=float, default=0, help='Replay recorded timing, X times faster')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--target', help='Base URL of a running instance (including JELLYFIN_WEBHOOK_BASE_URL)')
+    target.add_argument('--in-process', action='store_true', help='Replay against an app built in this process')
+    parser.add_argument('--fake-qbt', help='JSON list of torrents served by a stand-in qBittorrent (in-process only)')
+    parser.add_argument('--qbt-latency-ms', type=float, default=0, help='Artificial latency added to every fake qBittorrent call')
+    parser.add_argument('--media-root', help='Override MEDIA_DATA_ROOT (in-process only)')
+    parser.add_argument('--torrents-root', help='Override TORRENTS_DATA_ROOT (in-process only)')
+    parser.add_argument('--timeout', type=float, default=60, help='Per-request timeout in seconds (HTTP target)')
+    parser.add_argument('--output', help='Write JSON results to this file')
+    args = parser.parse_args(argv)
+
+    endpoints = [e.strip() for e in args.endpoints.split(',') if e.strip()]
+    unknown = [e for e in endpoints if e not in ROUTES]
+    if unknown:
+        parser.error(f'Unknown endpoints: {unknown}. Known: {list(ROUTES)}')
+
+    fake_qbt = None
+    if args.in_process:
+        replay_target, fake_qbt = build_in_process_target(args)
+    else:
+        replay_target = HttpTarget(args.target, args.timeout)
+
+    entries = load_requests(args.requests_dir, endpoints, since=args.since, limit=args.limit)
+    print(f"Loaded {len(entries)} recorded requests from {args.requests_dir}", file=sys.stderr)
+
+    try:
+        report = Replayer(replay_target, args.concurrency, rate=args.rate, speed=args.speed).run(entries)
+    finally:
+        if fake_qbt:
+            fake_qbt.stop()
+
+    results = {
+        "meta": {
+            "benchmark": "replay",
+            "git_revision": git_revision(),
+            "timestamp": int(time.time()),
+            "args": vars(args),
+        },
+        "results": report,
+    }
+    if fake_qbt:
+        results['results']['qbittorrent_calls'] = dict(fake_qbt.calls)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
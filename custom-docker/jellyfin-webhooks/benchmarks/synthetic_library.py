@@ -0,0 +1,259 @@
+'''
+Generates a synthetic Jellyfin library and its hardlinked torrent tree.
+
+Layout (mirrors a Sonarr/Radarr + Jellyfin setup):
+
+    <root>/media/series/<Series>/tvshow.nfo
+    <root>/media/series/<Series>/Season <n>/<Series> SxxEyy - <title> [1080p].mkv (+ .nfo, -thumb.jpg)
+    <root>/media/movies/<Title> (<year>)/<Title> (<year>).mkv (+ .nfo, -thumb.jpg)
+    <root>/torrents/tv/<Series>.Sxx.1080p.WEB-DL/...                  (season packs, hardlinked)
+    <root>/torrents/tv/<Series> SxxEyy - <title> [1080p].mkv          (single episodes, hardlinked)
+    <root>/torrents/movies/<Title>.<year>.1080p.BluRay/...             (movies, hardlinked)
+'''
+import os
+import random
+import hashlib
+import dataclasses
+
+# EBML magic, so the files at least look like matroska containers
+VIDEO_HEADER = b'\x1a\x45\xdf\xa3'
+THUMB_BYTES = b'\xff\xd8\xff\xe0' + b'\x00' * 60
+
+EPISODE_NFO = '''<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<episodedetails>
+  <plot>Synthetic episode {episode} of season {season}.</plot>
+  <lockdata>false</lockdata>
+  <dateadded>2024-01-01 00:00:00</dateadded>
+  <title>{title}</title>
+  <rating>7.5</rating>
+  <year>{year}</year>
+  <runtime>42</runtime>
+  <uniqueid type="tvdb" default="true">{tvdb}</uniqueid>
+  <tvdbid>{tvdb}</tvdbid>
+  <showtitle>{series}</showtitle>
+  <episode>{episode}</episode>
+  <season>{season}</season>
+  <aired>{year}-01-{day:02d}</aired>
+  <fileinfo>
+    <streamdetails>
+      <video><codec>h264</codec><width>1920</width><height>1080</height></video>
+      <audio><codec>eac3</codec><language>eng</language><channels>6</channels></audio>
+    </streamdetails>
+  </fileinfo>
+</episodedetails>
+'''
+
+TVSHOW_NFO = '''<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<tvshow>
+  <plot>Synthetic series.</plot>
+  <title>{series}</title>
+  <year>{year}</year>
+  <uniqueid type="tvdb" default="true">{tvdb}</uniqueid>
+  <season>-1</season>
+  <episode>-1</episode>
+  <status>Ended</status>
+</tvshow>
+'''
+
+MOVIE_NFO = '''<?xml version="1.0" encoding="utf-8" standalone="yes"?>
+<movie>
+  <plot>Synthetic movie.</plot>
+  <lockdata>false</lockdata>
+  <title>{title}</title>
+  <originaltitle>{title}</originaltitle>
+  <year>{year}</year>
+  <premiered>{year}-06-01</premiered>
+  <runtime>118</runtime>
+  <uniqueid type="tmdb" default="true">{tmdb}</uniqueid>
+  <uniqueid type="imdb">{imdb}</uniqueid>
+  <tmdbid>{tmdb}</tmdbid>
+  <imdbid>{imdb}</imdbid>
+</movie>
+'''
+
+WORDS = [
+    'Silent', 'Crimson', 'Harbor', 'Echo', 'Paper', 'Winter', 'Signal', 'Hollow', 'Glass', 'River',
+    'Atlas', 'Ember', 'North', 'Velvet', 'Iron', 'Orbit', 'Lantern', 'Static', 'Copper', 'Meadow',
+]
+
+
+@dataclasses.dataclass
+class LibraryLayout:
+    series: int = 10
+    seasons: int = 4
+    episodes: int = 10
+    movies: int = 100
+    # Fraction of seasons that come from a single season-pack torrent
+    pack_ratio: float = 0.5
+    seed: int = 1
+
+    @classmethod
+    def for_file_count(cls, files: int, seasons: int = 4, episodes: int = 10, movie_ratio: float = 0.2, **kwargs) -> 'LibraryLayout':
+        '''
+        Builds a layout with (roughly) `files` video files in the library
+        '''
+        movies = int(files * movie_ratio)
+        series = max(1, round((files - movies) / (seasons * episodes)))
+        return cls(series=series, seasons=seasons, episodes=episodes, movies=movies, **kwargs)
+
+    @property
+    def video_files(self) -> int:
+        return self.series * self.seasons * self.episodes + self.movies
+
+
+@dataclasses.dataclass
+class SyntheticLibrary:
+    root: str
+    media_root: str
+    torrents_root: str
+    layout: LibraryLayout
+    # Torrents as qBittorrent would report them
+    torrents: list = dataclasses.field(default_factory=list)
+    # Jellyfin `PlaybackStop` payloads, one per library item
+    events: list = dataclasses.field(default_factory=list)
+    files_written: int = 0
+
+
+def _title(rng: random.Random, words: int = 2) -> str:
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _hash(*parts) -> str:
+    return hashlib.sha1('/'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def _write(path: str, data) -> None:
+    mode = 'wb' if isinstance(data, bytes) else 'w'
+    with open(path, mode) as f:
+        f.write(data)
+
+
+def _torrent(name: str, content_path: str, size: int, category: str) -> dict:
+    return {
+        "hash": _hash(content_path),
+        "name": name,
+        "content_path": content_path,
+        "save_path": os.path.dirname(content_path),
+        "category": category,
+        "size": size,
+        "total_size": size,
+        "state": "stalledUP",
+        "progress": 1,
+        "tags": "",
+        "added_on": 1700000000,
+        "completion_on": 1700000600,
+    }
+
+
+def _event(item_type: str, **kwargs) -> dict:
+    event = {
+        "NotificationType": "PlaybackStop",
+        "PlayedToCompletion": True,
+        "ItemType": item_type,
+        "ItemId": _hash(item_type, *kwargs.values())[:32],
+        "UserId": "0" * 32,
+        "NotificationUsername": "bench",
+        "ClientName": "synthetic",
+        "RunTimeTicks": 25200000000,
+        "PlaybackPositionTicks": 25100000000,
+    }
+    event.update(kwargs)
+    return event
+
+
+def generate(root: str, layout: LibraryLayout) -> SyntheticLibrary:
+    '''
+    Creates the media + torrent trees under `root` and returns the generated torrents and events
+    '''
+    rng = random.Random(layout.seed)
+    library = SyntheticLibrary(
+        root=root,
+        media_root=os.path.join(root, 'media'),
+        torrents_root=os.path.join(root, 'torrents'),
+        layout=layout,
+    )
+    series_root = os.path.join(library.media_root, 'series')
+    movies_root = os.path.join(library.media_root, 'movies')
+    tv_torrents = os.path.join(library.torrents_root, 'tv')
+    movie_torrents = os.path.join(library.torrents_root, 'movies')
+    for path in (series_root, movies_root, tv_torrents, movie_torrents):
+        os.makedirs(path, exist_ok=True)
+
+    for s in range(layout.series):
+        series = f'{_title(rng)} {s:05d}'
+        year = 1990 + s % 30
+        series_dir = os.path.join(series_root, series)
+        os.makedirs(series_dir, exist_ok=True)
+        _write(os.path.join(series_dir, 'tvshow.nfo'), TVSHOW_NFO.format(series=series, year=year, tvdb=100000 + s))
+        library.files_written += 1
+
+        for season in range(1, layout.seasons + 1):
+            season_dir = os.path.join(series_dir, f'Season {season}')
+            os.makedirs(season_dir, exist_ok=True)
+            is_pack = rng.random() < layout.pack_ratio
+            pack_name = f'{series.replace(" ", ".")}.S{season:02d}.1080p.WEB-DL'
+            pack_dir = os.path.join(tv_torrents, pack_name)
+            if is_pack:
+                os.makedirs(pack_dir, exist_ok=True)
+
+            for episode in range(1, layout.episodes + 1):
+                title = _title(rng, 3)
+                prefix = f'{series} S{season:02d}E{episode:02d} - {title} [1080p]'
+                video = os.path.join(season_dir, f'{prefix}.mkv')
+                _write(video, VIDEO_HEADER)
+                _write(os.path.join(season_dir, f'{prefix}.nfo'), EPISODE_NFO.format(
+                    series=series, season=season, episode=episode, title=title,
+                    year=year, tvdb=_hash(series, season, episode)[:8], day=episode % 28 + 1,
+                ))
+                _write(os.path.join(season_dir, f'{prefix}-thumb.jpg'), THUMB_BYTES)
+                library.files_written += 3
+
+                if is_pack:
+                    os.link(video, os.path.join(pack_dir, os.path.basename(video)))
+                else:
+                    linked = os.path.join(tv_torrents, os.path.basename(video))
+                    os.link(video, linked)
+                    library.torrents.append(_torrent(os.path.basename(video), linked, len(VIDEO_HEADER), 'tv-sonarr'))
+                library.files_written += 1
+
+                library.events.append(_event(
+                    'Episode',
+                    Name=title,
+                    SeriesName=series,
+                    SeasonNumber=season,
+                    EpisodeNumber=episode,
+                    Year=year,
+                    Provider_tvdb=_hash(series, season, episode)[:8],
+                ))
+
+            if is_pack:
+                library.torrents.append(_torrent(pack_name, pack_dir, layout.episodes * len(VIDEO_HEADER), 'tv-sonarr'))
+
+    for m in range(layout.movies):
+        title = f'{_title(rng)} {m:05d}'
+        year = 1970 + m % 55
+        movie_dir = os.path.join(movies_root, f'{title} ({year})')
+        os.makedirs(movie_dir, exist_ok=True)
+        video = os.path.join(movie_dir, f'{title} ({year}).mkv')
+        _write(video, VIDEO_HEADER)
+        tmdb, imdb = 500000 + m, f'tt{9000000 + m}'
+        _write(os.path.join(movie_dir, f'{title} ({year}).nfo'), MOVIE_NFO.format(title=title, year=year, tmdb=tmdb, imdb=imdb))
+        _write(os.path.join(movie_dir, f'{title} ({year})-thumb.jpg'), THUMB_BYTES)
+
+        torrent_name = f'{title.replace(" ", ".")}.{year}.1080p.BluRay'
+        torrent_dir = os.path.join(movie_torrents, torrent_name)
+        os.makedirs(torrent_dir, exist_ok=True)
+        os.link(video, os.path.join(torrent_dir, os.path.basename(video)))
+        library.files_written += 4
+        library.torrents.append(_torrent(torrent_name, torrent_dir, len(VIDEO_HEADER), 'radarr'))
+
+        library.events.append(_event(
+            'Movie',
+            Name=title,
+            Year=year,
+            PremiereDate=f'{year}-06-01T00:00:00.0000000Z',
+            Provider_tmdb=str(tmdb),
+            Provider_imdb=imdb,
+        ))
+
+    return library
@@ -0,0 +1,225 @@
+'''
+Memory and time benchmark of the torrent list fetch (`/api/v2/torrents/info`).
+
+For every requested number of torrents, compares the two ways the app can read the list:
+
+- `qbittorrentapi`: the whole response decoded with `json` and every torrent wrapped in a `TorrentDictionary`
+  (`get_client().torrents_info()`)
+- `summary`: the response decoded as it streams in, each torrent reduced to a `TorrentSummary` tuple
+  (`qbittorrent.torrents_summary()`)
+
+Both are measured decoding an in-memory response (`decode`) and end to end against the fake qBittorrent
+(`fetch`, the fake running in a child process so its allocations aren't counted): the peak memory allocated
+during the call and what the result keeps alive, measured with `tracemalloc`, and the wall time over
+`--repeat` runs (without tracing).
+The torrents carry the full set of fields qBittorrent 4.6 returns.
+
+Usage (from `custom-docker/jellyfin-webhooks`):
+
+    python -m benchmarks.torrent_list --scales 1000,10000 --output torrent_list.json
+    python -m benchmarks.torrent_list --scales 10000 --compare torrent_list.json
+'''
+import gc
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import platform
+import tempfile
+import shutil
+import contextlib
+import tracemalloc
+import multiprocessing
+
+from benchmarks.common import git_revision, percentiles, prepare_environment
+from benchmarks.fake_qbittorrent import FakeQBittorrent
+
+STATES = ['stalledUP', 'uploading', 'pausedUP', 'downloading', 'stalledDL', 'queuedUP']
+
+
+def make_torrents(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    torrents = []
+    for i in range(count):
+        name = f"Synthetic Show {i:06d} S{rng.randint(1, 12):02d} 1080p WEB-DL x264-GROUP"
+        size = rng.randint(200 * 2**20, 60 * 2**30)
+        progress = 1 if rng.random() < 0.9 else round(rng.random(), 4)
+        added_on = 1600000000 + rng.randint(0, 10**8)
+        category = rng.choice(['tv', 'movies', 'tv-sonarr', 'radarr'])
+        torrents.append({
+            "added_on": added_on, "amount_left": int(size * (1 - progress)), "auto_tmm": True,
+            "availability": -1, "category": category, "completed": int(size * progress),
+            "completion_on": added_on + rng.randint(60, 86400), "content_path": f"/data/torrents/{category}/{name}",
+            "dl_limit": 0, "dlspeed": 0, "download_path": "", "downloaded": int(size * progress),
+            "downloaded_session": 0, "eta": 8640000, "f_l_piece_prio": False, "force_start": False,
+            "hash": hashlib.sha1(name.encode()).hexdigest(), "inactive_seeding_time_limit": -2,
+            "infohash_v1": hashlib.sha1(name.encode()).hexdigest(), "infohash_v2": "",
+            "last_activity": added_on + rng.randint(0, 10**6), "magnet_uri": f"magnet:?xt=urn:btih:{hashlib.sha1(name.encode()).hexdigest()}&dn={name.replace(' ', '+')}&tr=udp%3a%2f%2ftracker.example.org%3a1337%2fannounce",
+            "max_inactive_seeding_time": -1, "max_ratio": -1, "max_seeding_time": -1, "name": name,
+            "num_complete": rng.randint(0, 500), "num_incomplete": rng.randint(0, 50), "num_leechs": 0,
+            "num_seeds": 0, "priority": 0, "progress": progress, "ratio": round(rng.random() * 5, 6),
+            "ratio_limit": -2, "save_path": f"/data/torrents/{category}", "seeding_time": rng.randint(0, 10**7),
+            "seeding_time_limit": -2, "seen_complete": added_on + 3600, "seq_dl": False, "size": size,
+            "state": rng.choice(STATES), "super_seeding": False, "tags": rng.choice(['', '', 'watched', 'cross-seed, watched']),
+            "time_active": rng.randint(0, 10**7), "total_size": size, "tracker": "udp://tracker.example.org:1337/announce",
+            "trackers_count": rng.randint(1, 12), "up_limit": 0, "uploaded": rng.randint(0, 10 * size),
+            "uploaded_session": 0, "upspeed": 0,
+        })
+    return torrents
+
+
+def _serve(torrents: list, urls, stop):
+    with FakeQBittorrent(torrents) as qbt:
+        urls.put(qbt.url)
+        stop.wait()
+
+
+@contextlib.contextmanager
+def fake_qbittorrent(torrents: list):
+    '''
+    Yields the URL of a fake qBittorrent serving `torrents` from a child process
+    '''
+    context = multiprocessing.get_context('spawn')
+    urls, stop = context.Queue(), context.Event()
+    process = context.Process(target=_serve, args=(torrents, urls, stop), daemon=True)
+    process.start()
+    try:
+        yield urls.get(timeout=60)
+    finally:
+        stop.set()
+        process.join(timeout=10)
+
+
+def measure(function, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        times.append((time.perf_counter() - start) * 1000)
+        del result
+
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    result = function()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "torrents": len(result),
+        "time_ms": percentiles(times),
+        "peak_bytes": peak - baseline,
+        "retained_bytes": current - baseline,
+    }
+
+
+def run_scale(count: int, args) -> dict:
+    import qbittorrentapi
+    from jellyfin_webhooks.utils import qbittorrent
+    from jellyfin_webhooks.utils.constants import constants as c
+    from jellyfin_webhooks.utils.torrent_list import iter_torrents
+
+    torrents = make_torrents(count, args.seed)
+    body = json.dumps(torrents).encode()
+    chunk_size = c.QBT_STREAM_CHUNK_SIZE
+
+    def decode_qbittorrentapi():
+        return qbittorrentapi.TorrentInfoList(json.loads(body), client=None)
+
+    def decode_summary():
+        return list(iter_torrents(body[i:i + chunk_size] for i in range(0, len(body), chunk_size)))
+
+    result = {
+        "torrents": count,
+        "response_bytes": len(body),
+        "decode": {
+            "qbittorrentapi": measure(decode_qbittorrentapi, args.repeat),
+            "summary": measure(decode_summary, args.repeat),
+        },
+    }
+    del body
+
+    with fake_qbittorrent(torrents) as url:
+        del torrents
+        c.QBT_HOST = url
+        client = qbittorrent.get_client()
+        # Logs in and settles the version checks before measuring
+        client.torrents_info(limit=1)
+        qbittorrent.torrents_summary(limit=1)
+        result["fetch"] = {
+            "qbittorrentapi": measure(client.torrents_info, args.repeat),
+            "summary": measure(qbittorrent.torrents_summary, args.repeat),
+        }
+    return result
+
+
+def compare(current: dict, baseline: dict):
+    previous = {r['torrents']: r for r in baseline.get('results', [])}
+    print(f"\nComparison against {baseline.get('meta', {}).get('git_revision', '?')} (fetch with torrents_summary)")
+    print(f"{'torrents':>10} {'peak before':>14} {'peak after':>14} {'change':>9} {'p50 before':>12} {'p50 after':>12}")
+    for result in current['results']:
+        old = previous.get(result['torrents'])
+        if not old:
+            continue
+        before, after = old['fetch']['summary'], result['fetch']['summary']
+        change = ((after['peak_bytes'] - before['peak_bytes']) / before['peak_bytes'] * 100) if before['peak_bytes'] else 0
+        print(
+            f"{result['torrents']:>10} {before['peak_bytes']:>14} {after['peak_bytes']:>14} {change:>8.1f}% "
+            f"{before['time_ms'].get('p50', 0):>12.2f} {after['time_ms'].get('p50', 0):>12.2f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', default='1000,10000', help='Comma separated torrent counts')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed runs per measurement')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write JSON results to this file')
+    parser.add_argument('--compare', help='Baseline JSON results to compare against')
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix='jfw-torrent-list-app-')
+    prepare_environment(workdir)
+
+    results = {
+        "meta": {
+            "benchmark": "torrent_list",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": int(time.time()),
+            "args": vars(args),
+        },
+        "results": [],
+    }
+    try:
+        for count in [int(s) for s in args.scales.split(',') if s.strip()]:
+            print(f"Running torrent_list benchmark with {count} torrents...", file=sys.stderr)
+            result = run_scale(count, args)
+            results['results'].append(result)
+            for mode in ('decode', 'fetch'):
+                full, lean = result[mode]['qbittorrentapi'], result[mode]['summary']
+                print(
+                    f"  {mode}: peak {full['peak_bytes'] / 2**20:.1f} -> {lean['peak_bytes'] / 2**20:.1f} MiB, "
+                    f"p50 {full['time_ms'].get('p50')} -> {lean['time_ms'].get('p50')} ms",
+                    file=sys.stderr
+                )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
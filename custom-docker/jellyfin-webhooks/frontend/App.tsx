@@ -5,6 +5,7 @@ import { WebhooksTable } from './components/WebhooksTable';
 import { DevLogTable } from './components/DevLogTable';
 import { DryRunModal } from './components/DryRunModal';
 import { NetworkView } from './components/NetworkView';
+import { LinkReportView } from './components/LinkReportView';
 import { ApiResponse, LogEntry, RequestLogEntry, WebhookConfig, EndpointLog } from './types';
 
 interface NetworkTarget {
@@ -19,7 +20,7 @@ const App = () => {
     const [endpoints, setEndpoints] = useState<EndpointLog[]>([]);
 
     // View Mode
-    const [activeTab, setActiveTab] = useState<'webhooks' | 'devlogs'>('webhooks');
+    const [activeTab, setActiveTab] = useState<'webhooks' | 'devlogs' | 'links'>('webhooks');
 
     // Logs Pagination & Filtering
     const [page, setPage] = useState(1);
@@ -149,6 +150,12 @@ const App = () => {
                     >
                         Dev Logs / Admin
                     </button>
+                    <button
+                        onClick={() => setActiveTab('links')}
+                        className={`pb-2 text-sm font-bold uppercase tracking-wide transition-colors ${activeTab === 'links' ? 'text-green-400 border-b-2 border-green-400' : 'text-zinc-500 hover:text-zinc-300'}`}
+                    >
+                        Hardlinks
+                    </button>
                 </div>
 
                 {activeTab === 'webhooks' ? (
@@ -159,7 +166,7 @@ const App = () => {
                         </h2>
                         <WebhooksTable webhooks={webhooks} onDryRun={handleDryRun} onNetwork={handleNetworkWebhook} />
                     </>
-                ) : (
+                ) : activeTab === 'devlogs' ? (
                     <>
                         <h2 className="text-xl font-semibold mb-4 text-zinc-300 flex items-center gap-2">
                             <span className="w-2 h-2 rounded-full bg-purple-500"></span>
@@ -167,6 +174,14 @@ const App = () => {
                         </h2>
                         <DevLogTable endpoints={endpoints} onNetwork={handleNetworkEndpoint} />
                     </>
+                ) : (
+                    <>
+                        <h2 className="text-xl font-semibold mb-4 text-zinc-300 flex items-center gap-2">
+                            <span className="w-2 h-2 rounded-full bg-green-500"></span>
+                            Hardlink Coverage
+                        </h2>
+                        <LinkReportView />
+                    </>
                 )}
             </section>
 
@@ -0,0 +1,179 @@
+import React, { useEffect, useState } from 'react';
+import { Job, LinkKind, LinkReportEntry, LinkReportSummary } from '../types';
+
+const KINDS: { kind: LinkKind; label: string; color: string }[] = [
+    { kind: 'linked', label: 'Hardlinked', color: 'text-green-400' },
+    { kind: 'copy', label: 'Copies', color: 'text-red-400' },
+    { kind: 'library_only', label: 'Library only', color: 'text-yellow-400' },
+    { kind: 'orphan', label: 'Orphan torrents', color: 'text-blue-400' },
+];
+
+const formatBytes = (bytes: number) => {
+    const units = ['B', 'KB', 'MB', 'GB', 'TB'];
+    let value = bytes;
+    let unit = 0;
+    while (value >= 1024 && unit < units.length - 1) {
+        value /= 1024;
+        unit++;
+    }
+    return `${value.toFixed(unit === 0 ? 0 : 1)} ${units[unit]}`;
+};
+
+export const LinkReportView: React.FC = () => {
+    const [reports, setReports] = useState<LinkReportSummary[]>([]);
+    const [job, setJob] = useState<Job | null>(null);
+    const [selected, setSelected] = useState<LinkReportSummary | null>(null);
+    const [kind, setKind] = useState<LinkKind>('copy');
+    const [entries, setEntries] = useState<LinkReportEntry[]>([]);
+    const [page, setPage] = useState(1);
+    const [totalPages, setTotalPages] = useState(1);
+
+    const fetchReports = async () => {
+        try {
+            const res = await fetch(`api/links/reports`);
+            const json = await res.json();
+            setReports(json.data);
+            setSelected(current => current ?? json.data[0] ?? null);
+            const running = (json.jobs as Job[]).find(j => j.status === 'pending' || j.status === 'running');
+            setJob(running ?? null);
+        } catch (err) {
+            console.error("Failed to fetch link reports", err);
+        }
+    };
+
+    const fetchEntries = async (reportId: string, k: LinkKind, p: number) => {
+        try {
+            const res = await fetch(`api/links/reports/${reportId}/entries?kind=${k}&page=${p}&per_page=50`);
+            const json = await res.json();
+            setEntries(json.data);
+            setTotalPages(Math.max(1, json.metadata?.total_pages || 1));
+        } catch (err) {
+            console.error("Failed to fetch link report entries", err);
+        }
+    };
+
+    const startReport = async () => {
+        try {
+            const res = await fetch(`api/links/reports`, { method: 'POST' });
+            const json = await res.json();
+            setJob(json.data);
+        } catch (err) {
+            console.error("Failed to start link report", err);
+        }
+    };
+
+    useEffect(() => {
+        fetchReports();
+    }, []);
+
+    // Poll the running job, then pick up its report
+    useEffect(() => {
+        if (!job) return;
+        const timer = setInterval(async () => {
+            const res = await fetch(`api/links/reports/${job.id}`);
+            const json = await res.json();
+            if (json.job && (json.job.status === 'success' || json.job.status === 'error')) {
+                setJob(null);
+                setSelected(json.data);
+                fetchReports();
+            } else if (json.job) {
+                setJob(json.job);
+            }
+        }, 2000);
+        return () => clearInterval(timer);
+    }, [job?.id]);
+
+    useEffect(() => {
+        if (selected) {
+            fetchEntries(selected.id, kind, page);
+        }
+    }, [selected, kind, page]);
+
+    return (
+        <div className="w-full">
+            <div className="flex justify-between items-center mb-4">
+                <div className="flex gap-4 items-center">
+                    <label className="text-zinc-400 text-sm">Report:</label>
+                    <select
+                        value={selected?.id ?? ''}
+                        onChange={(e) => { setSelected(reports.find(r => r.id === e.target.value) ?? null); setPage(1); }}
+                        className="bg-zinc-900 text-white px-3 py-1 text-sm rounded border border-zinc-700 focus:outline-none focus:border-zinc-500"
+                    >
+                        {reports.length === 0 && <option value="">No reports yet</option>}
+                        {reports.map(r => (
+                            <option key={r.id} value={r.id}>{new Date(r.created_at * 1000).toLocaleString()}</option>
+                        ))}
+                    </select>
+                    {selected && (
+                        <a href={`api/links/reports/${selected.id}/download`} className="text-xs text-blue-300 hover:underline">Download JSONL</a>
+                    )}
+                </div>
+                <button
+                    onClick={startReport}
+                    disabled={!!job}
+                    className="px-4 py-1.5 bg-zinc-900 border border-zinc-800 rounded hover:bg-zinc-800 disabled:opacity-50 disabled:cursor-not-allowed transition-colors text-sm"
+                >
+                    {job ? `Running: ${job.phase ?? 'starting'} (${job.progress.done} files)` : 'New report'}
+                </button>
+            </div>
+
+            {selected && (
+                <>
+                    <div className="grid grid-cols-4 gap-4 mb-4">
+                        {KINDS.map(k => (
+                            <button
+                                key={k.kind}
+                                onClick={() => { setKind(k.kind); setPage(1); }}
+                                className={`bg-black border p-3 text-left font-mono ${kind === k.kind ? 'border-zinc-500' : 'border-zinc-800 hover:border-zinc-700'}`}
+                            >
+                                <div className={`text-xs uppercase font-bold ${k.color}`}>{k.label}</div>
+                                <div className="text-lg text-zinc-200">{selected.totals[k.kind].files}</div>
+                                <div className="text-xs text-zinc-500">{formatBytes(selected.totals[k.kind].bytes)}</div>
+                            </button>
+                        ))}
+                    </div>
+                    {selected.wasted_bytes > 0 && (
+                        <p className="text-sm text-red-400 mb-4">{formatBytes(selected.wasted_bytes)} used by copies that could be hardlinks.</p>
+                    )}
+                    {Object.entries(selected.errors).map(([root, message]) => (
+                        <p key={root} className="text-sm text-yellow-400 mb-2">{message}</p>
+                    ))}
+
+                    <div className="bg-black font-mono text-sm border border-zinc-800 w-full">
+                        <div className="grid grid-cols-12 p-2 border-b border-zinc-900 bg-zinc-900 font-bold text-zinc-400">
+                            <span className="col-span-5">Library file</span>
+                            <span className="col-span-5">Torrent file</span>
+                            <span className="col-span-2 text-right">Size</span>
+                        </div>
+                        {entries.length === 0 && (
+                            <div className="p-4 text-center text-zinc-500">No files.</div>
+                        )}
+                        {entries.map((entry, i) => (
+                            <div key={i} className="grid grid-cols-12 p-2 border-b border-zinc-900 items-center text-xs">
+                                <span className="col-span-5 text-zinc-300 break-all">{entry.path ?? '-'}</span>
+                                <span className="col-span-5 text-zinc-500 break-all">{entry.torrent_path ?? '-'}</span>
+                                <span className="col-span-2 text-right text-zinc-400">{formatBytes(entry.size)}</span>
+                            </div>
+                        ))}
+                    </div>
+
+                    <div className="mt-4 flex gap-4 items-center justify-between text-sm text-zinc-400">
+                        <span>Page {page} of {totalPages}</span>
+                        <div className="flex gap-2">
+                            <button
+                                onClick={() => setPage(p => Math.max(1, p - 1))}
+                                className="px-4 py-1.5 bg-zinc-900 border border-zinc-800 rounded hover:bg-zinc-800 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+                                disabled={page === 1}
+                            >Previous</button>
+                            <button
+                                onClick={() => setPage(p => Math.min(totalPages, p + 1))}
+                                className="px-4 py-1.5 bg-zinc-900 border border-zinc-800 rounded hover:bg-zinc-800 disabled:opacity-50 disabled:cursor-not-allowed transition-colors"
+                                disabled={page === totalPages}
+                            >Next</button>
+                        </div>
+                    </div>
+                </>
+            )}
+        </div>
+    );
+};
@@ -39,4 +39,33 @@ export interface EndpointLog {
     category: string;
     name: string;
     endpoint: string;
-}
\ No newline at end of file
+}
+export type LinkKind = 'linked' | 'copy' | 'library_only' | 'orphan';
+
+export interface LinkReportEntry {
+    kind: LinkKind;
+    size: number;
+    path?: string;
+    torrent_path?: string;
+}
+
+export interface LinkReportSummary {
+    id: string;
+    created_at: number;
+    duration: number;
+    torrent_roots: string[];
+    library_roots: string[];
+    torrent_files: number;
+    totals: Record<LinkKind, { files: number; bytes: number }>;
+    wasted_bytes: number;
+    errors: Record<string, string>;
+}
+
+export interface Job {
+    id: string;
+    kind: string;
+    status: 'pending' | 'running' | 'success' | 'error';
+    phase: string | null;
+    progress: { done: number; total: number; percent: number | null };
+    error: string | null;
+}
@@ -1,3 +1,3 @@
-from . import logs, requests, torrents, webhooks
+from . import cache, events, health, libraries, links, logs, reconcile, requests, run, torrents, watched, webhooks
 
-__all__ = ['logs', 'requests', 'torrents', 'webhooks']
\ No newline at end of file
+__all__ = ['cache', 'events', 'health', 'libraries', 'links', 'logs', 'reconcile', 'requests', 'run', 'torrents', 'watched', 'webhooks']
\ No newline at end of file
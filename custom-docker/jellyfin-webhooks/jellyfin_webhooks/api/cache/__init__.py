@@ -0,0 +1,42 @@
+from flask import Blueprint, jsonify
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.webhook.playback_stop import deduplicator as playback_stop_dedup
+from jellyfin_webhooks.components.torrent_index import torrent_index
+
+route = Blueprint('api_cache', __name__)
+
+# Name -> object exposing `stats()` and `clear()`, and optionally `entries()`
+CACHES = {
+    "playback_stop_dedup": playback_stop_dedup,
+    "torrent_negative": torrent_index.negative,
+}
+
+
+@route.route(f'{c.BASE_URL}/api/cache', methods=['GET'])
+@log_request(category="api", endpoint="cache")
+def get_caches():
+    return jsonify({
+        "data": {name: cache.stats() for name, cache in CACHES.items()}
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/cache/<name>', methods=['GET'])
+@log_request(category="api", endpoint="cache/name/get")
+def get_cache(name):
+    cache = CACHES.get(name)
+    if cache is None:
+        return jsonify({"status": "error", "message": f"Unknown cache {name}"}), 404
+    return jsonify({
+        "data": cache.entries() if hasattr(cache, 'entries') else [],
+        "metadata": cache.stats()
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/cache/<name>', methods=['DELETE'])
+@log_request(category="api", endpoint="cache/name")
+def clear_cache(name):
+    cache = CACHES.get(name)
+    if cache is None:
+        return jsonify({"status": "error", "message": f"Unknown cache {name}"}), 404
+    return jsonify({"status": "success", "cleared": cache.clear()})
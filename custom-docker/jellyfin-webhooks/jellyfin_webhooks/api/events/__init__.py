@@ -0,0 +1,31 @@
+from flask import Blueprint, jsonify
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.webhook.stremio_event import pipeline as stremio_pipeline
+
+route = Blueprint('api_events', __name__)
+
+# Name -> `EventPipeline`
+PIPELINES = {
+    "stremio_event": stremio_pipeline,
+}
+
+
+@route.route(f'{c.BASE_URL}/api/events', methods=['GET'])
+@log_request(category="api", endpoint="events")
+def get_pipelines():
+    '''
+    Queue depth, accepted/dropped/processed counts and per-sink delivery stats of every event pipeline
+    '''
+    return jsonify({
+        "data": {name: pipeline.stats() for name, pipeline in PIPELINES.items()}
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/events/<name>', methods=['GET'])
+@log_request(category="api", endpoint="events/name")
+def get_pipeline(name):
+    pipeline = PIPELINES.get(name)
+    if pipeline is None:
+        return jsonify({"status": "error", "message": f"Unknown pipeline {name}"}), 404
+    return jsonify({"data": pipeline.stats()})
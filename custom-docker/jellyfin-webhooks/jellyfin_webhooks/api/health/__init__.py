@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.components.warmup import warmup
+
+route = Blueprint('api_health', __name__)
+
+# Polled by the container healthcheck, so these aren't logged with `log_request`
+
+@route.route(f'{c.BASE_URL}/healthz', methods=['GET'])
+def get_health():
+    return jsonify({"status": "ok"}), 200
+
+
+@route.route(f'{c.BASE_URL}/healthz/ready', methods=['GET'])
+def get_ready():
+    '''
+    200 once the background warm-up has finished (503 until then), with per-step progress and timings
+    '''
+    if warmup.ready:
+        return jsonify({"status": "ready", "data": warmup.to_dict()}), 200
+    return jsonify({"status": "warming_up", "data": warmup.to_dict()}), 503
@@ -0,0 +1,54 @@
+from flask import Blueprint, request, jsonify, current_app
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.walker import map_roots
+from jellyfin_webhooks.components.torrent_index import torrent_index
+from jellyfin_webhooks.components.movie_index import movie_index
+from jellyfin_webhooks.components.catalog import library_catalog
+
+route = Blueprint('api_libraries', __name__)
+
+
+@route.route(f'{c.BASE_URL}/api/libraries', methods=['GET'])
+@log_request(category="api", endpoint="libraries")
+def get_libraries():
+    '''
+    Configured roots and per-root statistics of the torrent index, the movie index and the series catalog
+    '''
+    return jsonify({
+        "data": {
+            "torrents": torrent_index.stats(),
+            "movies": movie_index.stats(),
+            "series": library_catalog.stats(),
+        }
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/libraries/refresh', methods=['POST'])
+@log_request(category="api", endpoint="libraries/refresh")
+def refresh():
+    '''
+    Rebuilds the torrent index shards and refreshes the movie index shards, all of them or only `root`.
+    Query Params:
+        root: str (a root of `TORRENTS_DATA_ROOTS` or `MOVIE_ROOTS`)
+    '''
+    root = request.args.get('root')
+    results = {}
+    for kind, shards, rebuild in (
+        ("torrents", torrent_index.shards, lambda shard: shard.build()),
+        ("movies", movie_index.shards, lambda shard: shard.refresh()),
+    ):
+        selected = {shard.root: shard for shard in shards if not root or shard.root == root.rstrip('/')}
+        if not selected:
+            continue
+        # Roots in parallel, a failing one doesn't stop the others
+        for shard_root, result in map_roots(lambda r: rebuild(selected[r]), selected).items():
+            if isinstance(result, Exception):
+                current_app.logger.error(f"Could not refresh {kind} root {shard_root}: {result}")
+                results.setdefault(kind, {})[shard_root] = {"status": "error", "message": str(result)}
+            else:
+                results.setdefault(kind, {})[shard_root] = {"status": "success", "count": result}
+
+    if root and not results:
+        return jsonify({"status": "error", "message": f"Unknown root {root}"}), 404
+    return jsonify({"status": "success", "data": results})
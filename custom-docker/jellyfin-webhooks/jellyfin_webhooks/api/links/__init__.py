@@ -0,0 +1,93 @@
+import math
+from flask import Blueprint, request, jsonify, current_app, send_file
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.jobs import JobRegistry
+from jellyfin_webhooks.components.link_report import KINDS, build_report, list_reports, load_report, entries_path, read_entries
+
+route = Blueprint('api_links', __name__)
+
+
+@route.route(f'{c.BASE_URL}/api/links/reports', methods=['POST'])
+@log_request(category="api", endpoint="links/reports/create")
+def post_report():
+    '''
+    Starts a hardlink report job: which library files are hardlinked to torrents, which are copies,
+    and which torrent files have no library counterpart
+    '''
+    job, started = JobRegistry.submit_exclusive('link_report', build_report)
+    if not started:
+        return jsonify({"status": "error", "message": "A report is already running", "data": job.to_dict()}), 409
+
+    current_app.logger.info(f"Hardlink report {job.id} started")
+    return jsonify({"status": "accepted", "data": job.to_dict()}), 202
+
+
+@route.route(f'{c.BASE_URL}/api/links/reports', methods=['GET'])
+@log_request(category="api", endpoint="links/reports")
+def get_reports():
+    '''
+    Report jobs of this process (running or not) and the summaries of the reports kept on disk, newest first
+    '''
+    return jsonify({
+        "data": list_reports(),
+        "jobs": [job.to_dict() for job in JobRegistry.list('link_report')],
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/links/reports/<report_id>', methods=['GET'])
+@log_request(category="api", endpoint="links/reports/report_id")
+def get_report(report_id):
+    job = JobRegistry.get(report_id)
+    summary = load_report(report_id)
+    if summary is None and (job is None or job.kind != 'link_report'):
+        return jsonify({"status": "error", "message": f"Unknown report {report_id}"}), 404
+    return jsonify({"data": summary, "job": job.to_dict() if job else None})
+
+
+@route.route(f'{c.BASE_URL}/api/links/reports/<report_id>/entries', methods=['GET'])
+@log_request(category="api", endpoint="links/reports/report_id/entries")
+def get_entries(report_id):
+    '''
+    Entries of a report, in the order they were found. Available while the report is running.
+    Query Params:
+        kind: str (linked, copy, library_only, orphan)
+        page: int (default 1)
+        per_page: int (default 50)
+    '''
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    kind = request.args.get('kind')
+    if kind and kind not in KINDS:
+        return jsonify({"status": "error", "message": f"`kind` must be one of {', '.join(KINDS)}"}), 400
+    if entries_path(report_id) is None:
+        return jsonify({"status": "error", "message": f"Unknown report {report_id}"}), 404
+
+    entries, total_items = read_entries(report_id, kind, start=(page - 1) * per_page, stop=page * per_page)
+    return jsonify({
+        "data": entries,
+        "metadata": {
+            "page": page,
+            "per_page": per_page,
+            "total_items": total_items,
+            "total_pages": math.ceil(total_items / per_page)
+        }
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/links/reports/<report_id>/download', methods=['GET'])
+@log_request(category="api", endpoint="links/reports/report_id/download")
+def download(report_id):
+    '''
+    The report's entries as JSON Lines, streamed from disk
+    '''
+    path = entries_path(report_id)
+    if path is None:
+        return jsonify({"status": "error", "message": f"Unknown report {report_id}"}), 404
+    return send_file(path, mimetype='application/x-ndjson', as_attachment=True, download_name=f'link_report_{report_id}.jsonl')
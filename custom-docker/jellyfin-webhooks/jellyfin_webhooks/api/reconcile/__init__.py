@@ -0,0 +1,133 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, request, jsonify, current_app
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.jobs import Job, JobRegistry
+from jellyfin_webhooks.utils.qbittorrent import qbt_calls
+from jellyfin_webhooks.components.torrent_index import torrent_index
+from jellyfin_webhooks.components.movie_index import movie_index
+from jellyfin_webhooks.components.resolver import normalize_item, describe_item, resolve_torrent_paths, TorrentLookup
+
+route = Blueprint('api_reconcile', __name__)
+
+
+def _resolve_group(job: Job, group: list) -> list:
+    # Items of a group share their Series objects, so each season's NFOs are parsed once
+    series_cache = {}
+    results = []
+    for item in group:
+        try:
+            paths = resolve_torrent_paths(item, index=torrent_index, series_cache=series_cache, movie_index=movie_index)
+            results.append((item, paths, None))
+        except Exception as e:
+            results.append((item, None, str(e) or type(e).__name__))
+        job.advance()
+    return results
+
+
+def reconcile(job: Job, items: list, dry_run: bool) -> dict:
+    '''
+    Resolves a batch of watched items against a single scan of the torrent tree and a single
+    torrent list, then tags every matched torrent in batched calls
+    '''
+    items = [normalize_item(item) for item in items]
+
+    job.set_phase('scan_torrent_tree')
+    torrent_index.build()
+
+    job.set_phase('scan_movies')
+    movie_index.refresh()
+
+    job.set_phase('fetch_torrents')
+    lookup = TorrentLookup(qbt_calls.torrents_summary())
+
+    groups = {}
+    for i, item in enumerate(items):
+        key = ('series', item.get('SeriesName')) if item.get('ItemType') == 'Episode' else ('item', i)
+        groups.setdefault(key, []).append(item)
+
+    job.set_phase('resolve', total=len(items))
+    to_tag = {}
+    matched = 0
+    season_packs = 0
+    unmatched = []
+    with ThreadPoolExecutor(max_workers=c.RECONCILE_WORKERS, thread_name_prefix='reconcile') as pool:
+        for results in pool.map(lambda group: _resolve_group(job, group), groups.values()):
+            for item, paths, error in results:
+                if error is None and paths[0] is None:
+                    error = 'Could not find a hardlinked torrent file'
+                if error is not None:
+                    unmatched.append({"item": describe_item(item), "ItemId": item.get('ItemId'), "reason": error})
+                    continue
+
+                matches, message = lookup.match(*paths)
+                if message:
+                    season_packs += 1
+                elif not matches:
+                    unmatched.append({"item": describe_item(item), "ItemId": item.get('ItemId'), "reason": f'No torrent owns {paths[0]}'})
+                    continue
+                if matches:
+                    matched += 1
+                for torrent in matches:
+                    to_tag[torrent.hash] = torrent
+
+    already_tagged = [h for h, t in to_tag.items() if 'watched' in [tag.strip() for tag in t.tags.split(',')]]
+    hashes = [h for h in to_tag if h not in already_tagged]
+
+    job.set_phase('tag', total=len(hashes))
+    if not dry_run:
+        for i in range(0, len(hashes), c.RECONCILE_TAG_BATCH):
+            batch = hashes[i:i + c.RECONCILE_TAG_BATCH]
+            qbt_calls.torrents_add_tags(tags='watched', torrent_hashes=batch)
+            job.advance(len(batch))
+    logging.info(f"{'[DRY RUN]' if dry_run else '[LIVE]'} Reconciled {len(items)} items: {len(hashes)} torrents to tag, {len(unmatched)} unmatched")
+
+    return {
+        "dry_run": dry_run,
+        "items": len(items),
+        "matched": matched,
+        "season_packs_skipped": season_packs,
+        "tagged_torrents": sorted(to_tag[h].name for h in hashes),
+        "already_tagged": len(already_tagged),
+        "unmatched": unmatched,
+    }
+
+
+@route.route(f'{c.BASE_URL}/api/reconcile', methods=['POST'])
+@log_request(category="api", endpoint="reconcile")
+def post_reconcile():
+    '''
+    Starts a reconciliation job.
+    Body: a list of items, `{"items": [...], "dry_run": bool}` or a Jellyfin `/Items` export (`{"Items": [...]}`).
+    Items use the Jellyfin webhook payload shape (or Jellyfin API item fields).
+    '''
+    data = request.get_json(silent=True)
+    if isinstance(data, list):
+        data = {"items": data}
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Expected a JSON body"}), 400
+
+    items = data.get('items', data.get('Items'))
+    if not isinstance(items, list) or not items or not all(isinstance(i, dict) for i in items):
+        return jsonify({"status": "error", "message": "`items` must be a non-empty list of objects"}), 400
+
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true' or bool(data.get('dry_run', False))
+    job = JobRegistry.submit('reconcile', reconcile, items, dry_run, params={"items": len(items), "dry_run": dry_run})
+    current_app.logger.info(f"Reconciliation job {job.id} started for {len(items)} items (dry_run={dry_run})")
+    return jsonify({"status": "accepted", "data": job.to_dict()}), 202
+
+
+@route.route(f'{c.BASE_URL}/api/reconcile', methods=['GET'])
+@log_request(category="api", endpoint="reconcile/jobs")
+def get_reconcile_jobs():
+    return jsonify({"data": [job.to_dict() for job in JobRegistry.list('reconcile')]})
+
+
+@route.route(f'{c.BASE_URL}/api/reconcile/<job_id>', methods=['GET'])
+@log_request(category="api", endpoint="reconcile/job_id")
+def get_reconcile_job(job_id):
+    job = JobRegistry.get(job_id)
+    if job is None or job.kind != 'reconcile':
+        return jsonify({"status": "error", "message": f"Unknown job {job_id}"}), 404
+    return jsonify({"data": job.to_dict()})
@@ -1,10 +1,12 @@
-import re
 import os
-import json
 import math
 from flask import Blueprint, request, jsonify, current_app
 from jellyfin_webhooks.utils.constants import constants as c
 from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.walker import scan
+from jellyfin_webhooks.utils.log_segments import SEGMENT_EXTENSIONS, list_segments, parse_segment, read_entries
+from jellyfin_webhooks.utils.log_compactor import log_compactor
+from jellyfin_webhooks.utils.request_index import BODY_FIELDS, request_index
 
 route = Blueprint('requests', __name__)
 
@@ -14,29 +16,32 @@ def get_endpoints_list():
     """
     Returns a list of all endpoints that have log files.
     """
-    base_dir = "/app/data/requests"
+    base_dir = c.REQUESTS_LOG_DIR
     endpoints_map = {} # Key: "category/name" -> object
     
     if os.path.exists(base_dir):
-        for category in os.listdir(base_dir):
-            cat_path = os.path.join(base_dir, category)
-            if not os.path.isdir(cat_path): continue
-            
-            for file in os.listdir(cat_path):
-                if not file.endswith('.jsonl'): continue
-                
-                # Check for rotation pattern: name.timestamp.jsonl or name.jsonl
-                match = re.match(r'^(.+?)(?:\.\d+)?\.jsonl$', file)
-                if match:
-                    name = match.group(1)
-                    key = f"{category}/{name}"
-                    if key not in endpoints_map:
-                         endpoints_map[key] = {
-                             "category": category,
-                             "name": name,
-                             "endpoint": name, # alias for compatibility
-                             "id": f"{category}-{name}" # unique ID
-                         }
+        # Logs live in `<base_dir>/<category>/<file>`
+        for entry in scan(base_dir, include=SEGMENT_EXTENSIONS, max_depth=2):
+            parts = os.path.relpath(entry.path, base_dir).split(os.sep)
+            if len(parts) != 2: continue
+            category, file = parts
+
+            # Live `name.jsonl`, rotated `name.timestamp.jsonl`, compacted `name.timestamp.jsonl.gz|.zst`
+            segment = parse_segment(entry)
+            if segment:
+                name = segment.endpoint
+                key = f"{category}/{name}"
+                if key not in endpoints_map:
+                     endpoints_map[key] = {
+                         "category": category,
+                         "name": name,
+                         "endpoint": name, # alias for compatibility
+                         "id": f"{category}-{name}", # unique ID
+                         "segments": 0,
+                         "bytes": 0
+                     }
+                endpoints_map[key]["segments"] += 1
+                endpoints_map[key]["bytes"] += segment.size
     
     # Sort by category then name
     sorted_list = sorted(list(endpoints_map.values()), key=lambda x: (x['category'], x['name']))
@@ -60,11 +65,10 @@ def get_request_logs(category, endpoint):
     except ValueError:
         return jsonify({"error": "Invalid pagination parameters"}), 400
 
-    base_dir = f"/app/data/requests/{category}"
-    filename = f"{endpoint}.jsonl"
-    file_path = os.path.join(base_dir, filename)
+    base_dir = os.path.join(c.REQUESTS_LOG_DIR, category)
+    segments = list_segments(base_dir, endpoint) if os.path.isdir(base_dir) else []
 
-    if not os.path.exists(file_path):
+    if not segments:
         return jsonify({
             "data": [],
             "metadata": {
@@ -76,28 +80,12 @@ def get_request_logs(category, endpoint):
         })
 
     try:
-        # Read all lines (efficient enough for 5000 lines)
-        with open(file_path, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        # Parse and reverse (newest first)
-        logs = []
-        for line in lines:
-            if line.strip():
-                try:
-                    logs.append(json.loads(line))
-                except json.JSONDecodeError:
-                    continue
-        
-        logs.reverse() # Newest first
-        
-        total_items = len(logs)
-        total_pages = math.ceil(total_items / per_page)
-        
+        # Newest first, across the live file and the rotated (possibly compressed) segments.
+        # Only the segments holding the requested page are decoded
         start_idx = (page - 1) * per_page
         end_idx = start_idx + per_page
-        
-        paginated_logs = logs[start_idx:end_idx]
+        paginated_logs, total_items = read_entries(segments, start_idx, end_idx)
+        total_pages = math.ceil(total_items / per_page)
         
         return jsonify({
             "data": paginated_logs,
@@ -105,10 +93,128 @@ def get_request_logs(category, endpoint):
                 "page": page,
                 "per_page": per_page,
                 "total_items": total_items,
-                "total_pages": total_pages
+                "total_pages": total_pages,
+                "segments": len(segments)
             }
         })
 
     except Exception as e:
         current_app.logger.error(f"Error reading request logs: {e}")
         return jsonify({"error": "Failed to read logs"}), 500
+
+
+@route.route(f'{c.BASE_URL}/api/requests/storage', methods=['GET'])
+@log_request(category="api", endpoint="requests/storage")
+def get_storage():
+    """
+    Disk usage and retention policy of every category, and the compactor status.
+    """
+    return jsonify({
+        "data": {
+            "categories": log_compactor.usage(),
+            "compactor": log_compactor.stats()
+        }
+    })
+
+@route.route(f'{c.BASE_URL}/api/requests/compact', methods=['POST'])
+@log_request(category="api", endpoint="requests/compact")
+def compact():
+    """
+    Compresses rotated segments and applies retention right away.
+    """
+    try:
+        summary = log_compactor.run()
+    except Exception as e:
+        current_app.logger.error(f"Error compacting request logs: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "data": summary})
+
+@route.route(f'{c.BASE_URL}/api/requests/search', methods=['GET'])
+@log_request(category="api", endpoint="requests/search")
+def search_requests():
+    """
+    Searches every request log (live, rotated and compacted segments) through the request index.
+    Query Params:
+        category, endpoint: str
+        status: comma separated status codes
+        min_status, max_status: int (e.g. min_status=400 for failures)
+        min_duration, max_duration: int (ms)
+        since, until: float (unix timestamps)
+        series_name, name, item_type, notification_type: str (case insensitive, exact)
+        q: str (words matched against SeriesName and Name, by prefix)
+        page: int (default 1)
+        per_page: int (default 50)
+    Requests logged in the last moment may be missing when the index writer is behind: the search waits
+    at most REQUESTS_INDEX_FLUSH_TIMEOUT seconds for them, and `metadata.complete` is false when it gave up.
+    """
+    if not c.REQUESTS_INDEX_ENABLED:
+        return jsonify({"error": "The request index is disabled (REQUESTS_INDEX_ENABLED)"}), 404
+
+    args = request.args
+    try:
+        page = int(args.get('page', 1))
+        per_page = int(args.get('per_page', 50))
+        integer = lambda key: int(args[key]) if args.get(key) else None
+        number = lambda key: float(args[key]) if args.get(key) else None
+        filters = {
+            "category": args.get('category'),
+            "endpoint": args.get('endpoint'),
+            "statuses": [int(status) for status in args.get('status', '').split(',') if status.strip()],
+            "min_status": integer('min_status'),
+            "max_status": integer('max_status'),
+            "min_duration": integer('min_duration'),
+            "max_duration": integer('max_duration'),
+            "since": number('since'),
+            "until": number('until'),
+            "fields": {field: args.get(field) for field in BODY_FIELDS if args.get(field)},
+            "text": args.get('q'),
+        }
+    except ValueError:
+        return jsonify({"error": "Invalid search parameters"}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    try:
+        # Entries logged a moment ago may still be queued
+        complete = request_index.flush(timeout=c.REQUESTS_INDEX_FLUSH_TIMEOUT)
+        if not complete:
+            current_app.logger.warning("Request index is behind, searching without the latest entries")
+        logs, total_items = request_index.search(**filters, offset=(page - 1) * per_page, limit=per_page)
+    except Exception as e:
+        current_app.logger.error(f"Error searching request logs: {e}")
+        return jsonify({"error": "Failed to search logs"}), 500
+
+    return jsonify({
+        "data": logs,
+        "metadata": {
+            "page": page,
+            "per_page": per_page,
+            "total_items": total_items,
+            "total_pages": math.ceil(total_items / per_page),
+            "complete": complete,
+        }
+    })
+
+@route.route(f'{c.BASE_URL}/api/requests/index', methods=['GET'])
+@log_request(category="api", endpoint="requests/index")
+def get_index():
+    """
+    Size and state of the request index.
+    """
+    return jsonify({"data": request_index.stats()})
+
+@route.route(f'{c.BASE_URL}/api/requests/index', methods=['POST'])
+@log_request(category="api", endpoint="requests/reindex")
+def reindex():
+    """
+    Rebuilds the request index from the request logs on disk.
+    Query Params:
+        clear: bool (default false), drop the current index first
+    """
+    clear = request.args.get('clear', 'false').lower() == 'true'
+    try:
+        entries = request_index.rebuild(clear=clear)
+    except Exception as e:
+        current_app.logger.error(f"Error rebuilding the request index: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "data": {"entries": entries}})
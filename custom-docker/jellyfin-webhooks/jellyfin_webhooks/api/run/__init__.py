@@ -1,23 +1,154 @@
-from flask import Blueprint, jsonify, current_app
+import os
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, jsonify, current_app, request
 from jellyfin_webhooks.utils.constants import constants as c
-import qbittorrentapi
 from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.jobs import Job, JobRegistry
+from jellyfin_webhooks.utils.qbittorrent import qbt_calls
+from jellyfin_webhooks.components.torrent_index import torrent_index
+from jellyfin_webhooks.components.movie_index import movie_index
 
 route = Blueprint('api/run', __name__, template_folder='templates')
 
 
+def load_state() -> dict:
+    if os.path.exists(c.RUN_STATE_FILE):
+        try:
+            with open(c.RUN_STATE_FILE, 'r') as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.error(f"Could not read run state {c.RUN_STATE_FILE}: {e}")
+    return {}
+
+
+def save_state(state: dict):
+    tmp_path = f'{c.RUN_STATE_FILE}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+    os.replace(tmp_path, c.RUN_STATE_FILE)
+
+
+def _torrent_mark(torrent) -> float:
+    # `completion_on` is <= 0 while a torrent is still downloading
+    return max(torrent.added_on or 0, torrent.completion_on or 0)
+
+
+def _index_torrent(torrent) -> dict:
+    if not os.path.exists(torrent.content_path):
+        return {"name": torrent.name, "files": 0, "linked": 0, "missing": True}
+    files, linked = torrent_index.add(torrent.content_path)
+    return {"name": torrent.name, "files": files, "linked": linked, "missing": False}
+
+
+def incremental_scan(job: Job, webhook_id: str, full: bool = False) -> dict:
+    '''
+    Indexes the files of every torrent added or completed since the stored high-water mark,
+    so the webhook finds them in `torrent_index` instead of walking the torrent tree.
+    Torrents missing on disk (still moving, not downloaded yet) are kept in the state and retried by
+    the next runs, at most `RUN_MISSING_MAX_ATTEMPTS` times, while the mark moves on
+    '''
+    state = load_state()
+    # The index lives in memory, so after a restart everything has to be indexed again
+    full = full or len(torrent_index) == 0
+    high_water_mark = 0 if full else state.get('high_water_mark', 0)
+    # Torrent hash -> number of runs that found it missing
+    pending = {} if full else state.get('missing', {})
+
+    job.set_phase('fetch_torrents')
+    torrents = qbt_calls.torrents_info(sort='added_on')
+    changed = [t for t in torrents if _torrent_mark(t) > high_water_mark or t.hash in pending]
+
+    job.set_phase('index_torrents', total=len(changed))
+    indexed = []
+    with ThreadPoolExecutor(max_workers=c.RUN_CONCURRENCY, thread_name_prefix='run') as pool:
+        for result in pool.map(_index_torrent, changed):
+            indexed.append(result)
+            job.advance()
+
+    # Only movie directories modified since the previous refresh are read again
+    job.set_phase('index_movies')
+    movies_read = movie_index.refresh()
+
+    missing, given_up = {}, []
+    for torrent, result in zip(changed, indexed):
+        if not result['missing']:
+            continue
+        attempts = pending.get(torrent.hash, 0) + 1
+        if attempts < c.RUN_MISSING_MAX_ATTEMPTS:
+            missing[torrent.hash] = attempts
+        else:
+            given_up.append(torrent.name)
+    if given_up:
+        logging.warning(f"Incremental scan {job.id}: giving up on {len(given_up)} torrents still missing on disk after {c.RUN_MISSING_MAX_ATTEMPTS} runs")
+
+    new_mark = max([high_water_mark] + [_torrent_mark(t) for t in changed])
+    save_state({
+        "high_water_mark": new_mark,
+        "missing": missing,
+        "last_run": {"job_id": job.id, "webhook_id": webhook_id, "finished_at": time.time(), "torrents": len(changed)},
+    })
+
+    summary = {
+        "webhook_id": webhook_id,
+        "full": full,
+        "previous_high_water_mark": high_water_mark,
+        "high_water_mark": new_mark,
+        "torrents_total": len(torrents),
+        "torrents_scanned": len(changed),
+        "files_indexed": sum(r['files'] for r in indexed),
+        "files_linked_to_library": sum(r['linked'] for r in indexed),
+        "torrents_without_library_files": sorted(r['name'] for r in indexed if r['files'] and not r['linked']),
+        "torrents_missing_on_disk": sorted(r['name'] for r in indexed if r['missing']),
+        "torrents_retried": len([t for t in changed if t.hash in pending]),
+        "torrents_given_up": sorted(given_up),
+        "movie_directories_read": movies_read,
+    }
+    logging.info(f"Incremental scan {job.id}: indexed {summary['files_indexed']} files from {len(changed)} torrents")
+    return summary
+
+
 @route.route(f'{c.BASE_URL}/api/run/<webhook_id>', methods=['POST'])
 @log_request(category="api", endpoint="run/webhook_id")
 def post_run(webhook_id):
+    if webhook_id not in c.WEBHOOK_CONFIG:
+        return jsonify({"status": "ERROR", "message": f"Unknown webhook {webhook_id}"}), 404
+
     current_app.logger.info(f"MANUAL RUN: Triggered for {webhook_id}")
-    
-    # Logic to trigger a scan of recent torrents
-    try:
-        qbt = qbittorrentapi.Client(host=c.QBT_HOST, username=c.QBT_USER, password=c.QBT_PASS)
-        qbt.auth_log_in()
-        # We can trigger a refresh of the last 5 torrents
-        recent = qbt.torrents_info(limit=5, sort='added_on', reverse=True)
-        current_app.logger.info(f"Manual scan complete. Checked {len(recent)} recent torrents.")
-        return jsonify({"status": "SUCCESS", "message": "Scan triggered"})
-    except Exception as e:
-        return jsonify({"status": "ERROR", "message": str(e)}), 500
\ No newline at end of file
+
+    full = request.args.get('full', 'false').lower() == 'true' or bool((request.get_json(silent=True) or {}).get('full', False))
+    job, started = JobRegistry.submit_exclusive('run', incremental_scan, webhook_id, full, params={"webhook_id": webhook_id, "full": full})
+    if not started:
+        return jsonify({"status": "RUNNING", "message": "A scan is already running", "data": job.to_dict()}), 409
+    return jsonify({"status": "SUCCESS", "message": "Scan triggered", "data": job.to_dict()}), 202
+
+
+@route.route(f'{c.BASE_URL}/api/run/<webhook_id>/status', methods=['GET'])
+@log_request(category="api", endpoint="run/webhook_id/status")
+def get_run_status(webhook_id):
+    '''
+    Returns a scan job (`?job_id=`, defaults to the latest one), the stored high-water mark and the torrent index stats
+    '''
+    if webhook_id not in c.WEBHOOK_CONFIG:
+        return jsonify({"status": "ERROR", "message": f"Unknown webhook {webhook_id}"}), 404
+
+    job_id = request.args.get('job_id')
+    if job_id:
+        job = JobRegistry.get(job_id)
+        if job is not None and (job.kind != 'run' or job.params.get('webhook_id') != webhook_id):
+            job = None
+    else:
+        job = next((j for j in JobRegistry.list('run') if j.params.get('webhook_id') == webhook_id), None)
+
+    if job_id and job is None:
+        return jsonify({"status": "ERROR", "message": f"Unknown job {job_id}"}), 404
+
+    return jsonify({
+        "status": "SUCCESS",
+        "data": job.to_dict() if job else None,
+        "state": load_state(),
+        "index": torrent_index.stats(),
+        "movie_index": movie_index.stats(),
+    })
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, current_app
-import qbittorrentapi
 from jellyfin_webhooks.utils.constants import constants as c
 from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.qbittorrent import qbt_calls
+from jellyfin_webhooks.utils.async_qbittorrent import async_qbt_calls
+from jellyfin_webhooks.utils import blocking
 
 route = Blueprint('api_torrents', __name__)
 
@@ -9,14 +11,8 @@ route = Blueprint('api_torrents', __name__)
 @log_request(category="api", endpoint="torrents")
 def get_torrents():
     try:
-        qbt_client = qbittorrentapi.Client(
-            host=c.QBT_HOST, 
-            username=c.QBT_USER, 
-            password=c.QBT_PASS
-        )
-        qbt_client.auth_log_in()
-        
-        torrents = qbt_client.torrents_info()
+        # Dashboard polls share in-flight calls with the webhooks
+        torrents = qbt_calls.torrents_summary()
         
         # Simplify the response
         results = []
@@ -40,3 +36,13 @@ def get_torrents():
     except Exception as e:
         current_app.logger.error(f"Error fetching torrents: {e}")
         return jsonify({"status": "error", "message": str(e)}), 500
+
+
+@route.route(f'{c.BASE_URL}/api/torrents/calls', methods=['GET'])
+@log_request(category="api", endpoint="torrents/calls")
+def get_torrent_calls():
+    '''
+    qBittorrent call statistics: upstream vs coalesced calls, queue wait times and upstream latencies.
+    `async` holds those of the async client (ASGI mode) and `executors` the load of its thread pools
+    '''
+    return jsonify({"data": qbt_calls.stats(), "async": async_qbt_calls.stats(), "executors": blocking.stats()})
@@ -0,0 +1,57 @@
+import math
+from flask import Blueprint, request, jsonify, current_app
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.components.watched_store import watched_store
+
+route = Blueprint('api_watched', __name__)
+
+
+@route.route(f'{c.BASE_URL}/api/watched', methods=['GET'])
+@log_request(category="api", endpoint="watched")
+def get_history():
+    '''
+    Files tagged as watched, most recent first.
+    Query Params:
+        source: str (playback_stop, rebuild)
+        page: int (default 1)
+        per_page: int (default 50)
+    '''
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', 50))
+    except ValueError:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+    if page < 1 or per_page < 1:
+        return jsonify({"error": "Invalid pagination parameters"}), 400
+
+    records, total_items = watched_store.history(offset=(page - 1) * per_page, limit=per_page, source=request.args.get('source'))
+    return jsonify({
+        "data": records,
+        "metadata": {
+            "page": page,
+            "per_page": per_page,
+            "total_items": total_items,
+            "total_pages": math.ceil(total_items / per_page)
+        }
+    })
+
+
+@route.route(f'{c.BASE_URL}/api/watched/stats', methods=['GET'])
+@log_request(category="api", endpoint="watched/stats")
+def get_stats():
+    return jsonify({"data": dict(watched_store.stats(), enabled=c.WATCHED_STORE_ENABLED)})
+
+
+@route.route(f'{c.BASE_URL}/api/watched/rebuild', methods=['POST'])
+@log_request(category="api", endpoint="watched/rebuild")
+def rebuild():
+    '''
+    Recreates the store from the torrents tagged `watched` in qBittorrent
+    '''
+    try:
+        summary = watched_store.rebuild()
+    except Exception as e:
+        current_app.logger.error(f"Error rebuilding the watched store: {e}")
+        return jsonify({"status": "error", "message": str(e)}), 500
+    return jsonify({"status": "success", "data": summary})
@@ -0,0 +1,169 @@
+'''
+ASGI entry point: `uvicorn jellyfin_webhooks.asgi:app` (or `python -m jellyfin_webhooks.asgi`).
+
+The webhooks with an async view are served natively on the event loop: their qBittorrent calls go through
+the pooled async client and their filesystem work through a bounded executor, so many events can be in flight
+on a few threads. Every other route is the unchanged Flask app, run on the `wsgi` pool.
+'''
+import io
+import sys
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from flask import Flask
+
+from jellyfin_webhooks.main import create_app
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils import blocking
+from jellyfin_webhooks.utils.async_qbittorrent import async_qbt_calls
+from jellyfin_webhooks.webhook import playback_stop
+
+# (method, path) -> async view
+ASYNC_ROUTES = {
+    ('POST', f'{c.BASE_URL}/webhook/playback_stop'): playback_stop.main_async,
+}
+
+
+def build_environ(scope: dict, body: bytes) -> dict:
+    '''
+    WSGI environ of an ASGI HTTP request
+    '''
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': '',
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = scope['client'][0], str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = f"HTTP_{name.upper().replace('-', '_')}"
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def read_body(receive: Callable) -> bytes:
+    body = b''
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        body += message.get('body', b'')
+        if not message.get('more_body', False):
+            break
+    return body
+
+
+def _headers(pairs) -> list:
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in pairs]
+
+
+class AsyncDispatcher:
+    '''
+    ASGI application: `ASYNC_ROUTES` are awaited on the event loop inside a Flask request context
+    (so `request`, `jsonify`, `current_app` and `log_request` work as in the Flask views),
+    everything else is handed to the Flask WSGI app on the `wsgi` executor
+    '''
+    def __init__(self, flask_app: Flask, routes: Optional[dict] = None):
+        self.flask_app = flask_app
+        self.routes = ASYNC_ROUTES if routes is None else routes
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            # No websockets
+            return
+
+        body = await read_body(receive)
+        environ = build_environ(scope, body)
+        view = self.routes.get((scope['method'], scope['path']))
+        if view is not None:
+            await self.dispatch(view, environ, send)
+        else:
+            await self.fallback(environ, send)
+
+    async def lifespan(self, receive: Callable, send: Callable):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_qbt_calls.aclose()
+                blocking.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def dispatch(self, view: Callable, environ: dict, send: Callable):
+        app = self.flask_app
+        # As `Flask.full_dispatch_request`: error handlers, then after-request handlers (CORS)
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = await view()
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            body = response.get_data()
+        await send({'type': 'http.response.start', 'status': response.status_code, 'headers': _headers(response.headers.items())})
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def fallback(self, environ: dict, send: Callable):
+        started = {}
+
+        def start_response(status: str, headers: list, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        loop = asyncio.get_running_loop()
+        executor = blocking.get_executor('wsgi')
+        chunks = await loop.run_in_executor(executor, self.flask_app.wsgi_app, environ, start_response)
+        iterator = iter(chunks)
+        try:
+            # Streamed responses (downloads) are read chunk by chunk on the pool, never whole
+            chunk = await loop.run_in_executor(executor, next, iterator, None)
+            await send({'type': 'http.response.start', 'status': started['status'], 'headers': _headers(started['headers'])})
+            while True:
+                following = None if chunk is None else await loop.run_in_executor(executor, next, iterator, None)
+                await send({'type': 'http.response.body', 'body': chunk or b'', 'more_body': following is not None})
+                if following is None:
+                    break
+                chunk = following
+        finally:
+            if hasattr(chunks, 'close'):
+                await loop.run_in_executor(executor, chunks.close)
+
+
+def create_asgi_app(**kwargs) -> AsyncDispatcher:
+    return AsyncDispatcher(create_app(**kwargs))
+
+
+app = create_asgi_app()
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    logging.info(f"Serving on port {c.PORT} (ASGI)")
+    uvicorn.run(app, host='0.0.0.0', port=c.PORT, log_level='debug' if c.DEBUG_ENVIRONMENT else 'info', lifespan='on')
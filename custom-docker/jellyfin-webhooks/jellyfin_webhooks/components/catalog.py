@@ -0,0 +1,140 @@
+import os
+import time
+import logging
+from threading import Lock
+from typing import Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.walker import scan, map_roots
+from jellyfin_webhooks.components.series import Series
+
+
+def library_directory(name: str, roots: list) -> str:
+    '''
+    Directory of the series/movie `name`: in the first root that has it, else in the first root
+    '''
+    for root in roots:
+        directory = f'{root}/{name}'
+        if os.path.isdir(directory):
+            return directory
+    return f'{roots[0]}/{name}'
+
+
+class LibraryCatalog:
+    '''
+    Keeps the `Series` objects of the series roots (`SERIES_ROOTS`) alive between requests, so seasons and
+    episodes are only listed and parsed once. A series is dropped as soon as the mtime of its directory
+    or of one of its season directories changes (episodes added, removed or renamed).
+    '''
+    def __init__(self, roots: Optional[list] = None):
+        self._roots = roots
+        self._series: dict[str, tuple[Series, tuple]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.loaded_at: Optional[float] = None
+        self.load_duration: Optional[float] = None
+        self.root_stats: dict[str, dict] = {}
+
+    @property
+    def roots(self) -> list:
+        # Resolved lazily so changes to `MEDIA_DATA_ROOT` are picked up
+        return self._roots or c.series_roots
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    @staticmethod
+    def _signature(directory: str) -> tuple:
+        try:
+            signature = [('', os.stat(directory).st_mtime_ns)]
+        except OSError:
+            return ()
+        for entry in scan(directory, recursive=False, files=False, dirs=True):
+            if not entry.name.startswith('Season '):
+                continue
+            try:
+                signature.append((entry.name, entry.stat().st_mtime_ns))
+            except OSError:
+                continue
+        return tuple(sorted(signature))
+
+    def series(self, name: str) -> Series:
+        '''
+        Returns the cached `Series` for `name`, or a fresh one when its directories changed
+        '''
+        return self._series_at(library_directory(name, self.roots), name)
+
+    def _series_at(self, directory: str, name: str) -> Series:
+        signature = self._signature(directory)
+        with self._lock:
+            cached = self._series.get(directory)
+            if cached is not None and cached[1] == signature:
+                self.hits += 1
+                return cached[0]
+            self.misses += 1
+
+        series = Series(name=name, base_dir=directory)
+        if signature:
+            with self._lock:
+                self._series[directory] = (series, signature)
+        return series
+
+    def _load_root(self, root: str) -> dict:
+        if not os.path.isdir(root):
+            raise FileNotFoundError(f'{root} does not exist or is not mounted')
+        start = time.time()
+        series_count = episodes = 0
+        for entry in scan(root, recursive=False, files=False, dirs=True):
+            try:
+                series = self._series_at(entry.path, entry.name)
+                series.refresh()
+                series_count += 1
+                episodes += sum(len(season.episodes) for season in series.seasons.values())
+            except Exception as e:
+                logging.warning(f"Could not load series {entry.name} into the catalog: {e}")
+        return {"series": series_count, "episodes": episodes, "loaded_at": time.time(), "load_duration": time.time() - start, "error": None}
+
+    def load(self) -> int:
+        '''
+        Lists and parses every series of every root, roots in parallel. Returns the number of loaded episodes
+        '''
+        start = time.time()
+        episodes = 0
+        for root, result in map_roots(self._load_root, self.roots).items():
+            if isinstance(result, Exception):
+                logging.error(f"Could not load series root {root}: {result}")
+                self.root_stats[root] = dict(self.root_stats.get(root, {}), error=str(result))
+                continue
+            self.root_stats[root] = result
+            episodes += result['episodes']
+
+        with self._lock:
+            # Series removed from disk
+            for directory in [d for d in self._series if not os.path.isdir(d)]:
+                del self._series[directory]
+        self.loaded_at = time.time()
+        self.load_duration = self.loaded_at - start
+        logging.info(f"Loaded {len(self._series)} series ({episodes} episodes) into the catalog in {self.load_duration:.2f}s")
+        return episodes
+
+    def stats(self) -> dict:
+        roots = self.roots
+        cached = {root: 0 for root in roots}
+        with self._lock:
+            for directory in self._series:
+                root = os.path.dirname(directory)
+                if root in cached:
+                    cached[root] += 1
+        return {
+            "roots": roots,
+            "series": len(self._series),
+            "loaded_at": self.loaded_at,
+            "load_duration": self.load_duration,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shards": [dict(self.root_stats.get(root, {}), root=root, cached=cached[root]) for root in roots],
+        }
+
+
+library_catalog = LibraryCatalog()
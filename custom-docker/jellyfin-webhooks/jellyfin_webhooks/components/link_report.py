@@ -0,0 +1,264 @@
+import os
+import json
+import time
+import logging
+import threading
+from itertools import islice
+from typing import Iterator, Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.jobs import Job
+from jellyfin_webhooks.utils.walker import scan, extensions, map_roots
+
+# `linked`: library file hardlinked to a torrent file, `copy`: library file duplicating a torrent file (wasted space),
+# `library_only`: library file without torrent counterpart, `orphan`: torrent file without library counterpart
+KINDS = ('linked', 'copy', 'library_only', 'orphan')
+
+# Bytes compared at the start and the end of same-sized files, which rules out most non-copies cheaply
+SAMPLE_SIZE = 64 * 1024
+# Chunks in which files whose samples match are then compared in full
+CHUNK_SIZE = 1024 * 1024
+
+
+def _files(root: str) -> Iterator[tuple[str, os.stat_result]]:
+    for entry in scan(root, exclude=extensions(c.NON_VIDEO_FILE_FORMATS)):
+        try:
+            yield entry.path, entry.stat()
+        except OSError:
+            continue
+
+
+def _same_content(path: str, other: str, size: int) -> bool:
+    '''
+    Whether two files of `size` bytes are identical. Only files whose first and last `SAMPLE_SIZE` bytes match
+    are read in full, so `copy` entries (and `wasted_bytes`) are never a guess
+    '''
+    try:
+        with open(path, 'rb') as a, open(other, 'rb') as b:
+            if a.read(SAMPLE_SIZE) != b.read(SAMPLE_SIZE):
+                return False
+            if size <= SAMPLE_SIZE:
+                return True
+            if size > 2 * SAMPLE_SIZE:
+                a.seek(-SAMPLE_SIZE, os.SEEK_END)
+                b.seek(-SAMPLE_SIZE, os.SEEK_END)
+                if a.read(SAMPLE_SIZE) != b.read(SAMPLE_SIZE):
+                    return False
+            a.seek(SAMPLE_SIZE)
+            b.seek(SAMPLE_SIZE)
+            while True:
+                chunk = a.read(CHUNK_SIZE)
+                if chunk != b.read(CHUNK_SIZE):
+                    return False
+                if not chunk:
+                    return True
+    except OSError:
+        return False
+
+
+class LinkReport:
+    '''
+    Hardlink coverage of the libraries (`SERIES_ROOTS`, `MOVIE_ROOTS`) against the torrent roots, in one walk of each:
+    the torrent files are kept by (device, inode) - like `TorrentIndex` - then every library file is classified
+    as it is walked. Entries are appended to `<LINK_REPORT_DIR>/<id>.jsonl` as they are found: besides the
+    torrent inodes, only the totals stay in memory. They are written to `<id>.json` when the report is done.
+    '''
+    def __init__(self, report_id: str, directory: Optional[str] = None):
+        self.id = report_id
+        self.directory = directory or c.LINK_REPORT_DIR
+        self.totals = {kind: {"files": 0, "bytes": 0} for kind in KINDS}
+        self.errors: dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._output = None
+
+    @property
+    def entries_path(self) -> str:
+        return os.path.join(self.directory, f'{self.id}.jsonl')
+
+    @property
+    def summary_path(self) -> str:
+        return os.path.join(self.directory, f'{self.id}.json')
+
+    def _emit(self, kind: str, size: int, **entry):
+        line = json.dumps({"kind": kind, "size": size, **entry})
+        with self._lock:
+            self._output.write(line + '\n')
+            self.totals[kind]['files'] += 1
+            self.totals[kind]['bytes'] += size
+
+    def _scan_torrents(self, job: Job, roots: list) -> tuple[dict, dict]:
+        torrents: dict[tuple[int, int], tuple[int, str, int]] = {}
+        by_size: dict[int, list] = {}
+        lock = threading.Lock()
+
+        def walk(root: str) -> int:
+            if not os.path.isdir(root):
+                raise FileNotFoundError(f'{root} does not exist or is not mounted')
+            count = 0
+            for path, st in _files(root):
+                key = (st.st_dev, st.st_ino)
+                with lock:
+                    # A file hardlinked twice inside the torrent tree (cross-seeding) is counted once
+                    if key not in torrents:
+                        torrents[key] = (st.st_size, path, st.st_nlink)
+                        by_size.setdefault(st.st_size, []).append(key)
+                count += 1
+                job.advance()
+            return count
+
+        for root, result in map_roots(walk, roots).items():
+            if isinstance(result, Exception):
+                logging.error(f"Link report {self.id}: could not scan torrent root {root}: {result}")
+                self.errors[root] = str(result)
+        return torrents, by_size
+
+    def _scan_library(self, job: Job, roots: list, torrents: dict, by_size: dict) -> set:
+        claimed = set()
+        lock = threading.Lock()
+
+        def walk(root: str) -> int:
+            if not os.path.isdir(root):
+                raise FileNotFoundError(f'{root} does not exist or is not mounted')
+            count = 0
+            for path, st in _files(root):
+                key = (st.st_dev, st.st_ino)
+                if key in torrents:
+                    with lock:
+                        claimed.add(key)
+                    self._emit('linked', st.st_size, path=path, torrent_path=torrents[key][1])
+                else:
+                    # Empty files all look alike. Torrent files without any hardlink are the likeliest originals
+                    candidates = sorted(by_size.get(st.st_size, ()), key=lambda other: torrents[other][2] > 1) if st.st_size else ()
+                    original = next((other for other in candidates if _same_content(path, torrents[other][1], st.st_size)), None)
+                    if original is not None:
+                        with lock:
+                            claimed.add(original)
+                        self._emit('copy', st.st_size, path=path, torrent_path=torrents[original][1])
+                    else:
+                        self._emit('library_only', st.st_size, path=path)
+                count += 1
+                job.advance()
+            return count
+
+        for root, result in map_roots(walk, roots).items():
+            if isinstance(result, Exception):
+                logging.error(f"Link report {self.id}: could not scan library root {root}: {result}")
+                self.errors[root] = str(result)
+        return claimed
+
+    def run(self, job: Job) -> dict:
+        torrent_roots = c.torrent_roots
+        library_roots = list(dict.fromkeys(c.series_roots + c.movie_roots))
+        assert torrent_roots, 'Couldnt get `DATA_ROOT` from environment'
+        start = time.time()
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._output = open(self.entries_path, 'w', encoding='utf-8')
+        try:
+            job.set_phase('scan_torrents')
+            torrents, by_size = self._scan_torrents(job, torrent_roots)
+
+            job.set_phase('scan_library')
+            claimed = self._scan_library(job, library_roots, torrents, by_size)
+
+            job.set_phase('orphans', total=len(torrents))
+            for key, (size, path, _) in torrents.items():
+                if key not in claimed:
+                    self._emit('orphan', size, torrent_path=path)
+                job.advance()
+        finally:
+            self._output.close()
+            self._output = None
+
+        summary = {
+            "id": self.id,
+            "created_at": start,
+            "duration": time.time() - start,
+            "torrent_roots": torrent_roots,
+            "library_roots": library_roots,
+            "torrent_files": len(torrents),
+            "totals": self.totals,
+            # Space a hardlink would have saved
+            "wasted_bytes": self.totals['copy']['bytes'],
+            "errors": self.errors,
+        }
+        with open(self.summary_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f)
+        prune_reports(self.directory)
+        logging.info(
+            f"Link report {self.id}: {self.totals['linked']['files']} linked, {self.totals['copy']['files']} copies, "
+            f"{self.totals['orphan']['files']} orphans in {summary['duration']:.2f}s"
+        )
+        return summary
+
+
+def build_report(job: Job) -> dict:
+    return LinkReport(job.id).run(job)
+
+
+def prune_reports(directory: Optional[str] = None, keep: Optional[int] = None):
+    '''
+    Deletes all but the `LINK_REPORT_KEEP` most recent finished reports
+    '''
+    directory = directory or c.LINK_REPORT_DIR
+    keep = c.LINK_REPORT_KEEP if keep is None else keep
+    for summary in list_reports(directory)[keep:]:
+        for suffix in ('.json', '.jsonl'):
+            try:
+                os.remove(os.path.join(directory, summary['id'] + suffix))
+            except OSError:
+                pass
+
+
+def list_reports(directory: Optional[str] = None) -> list:
+    '''
+    Summaries of the finished reports, newest first
+    '''
+    directory = directory or c.LINK_REPORT_DIR
+    summaries = []
+    for entry in scan(directory, recursive=False, include=('json',)):
+        try:
+            with open(entry.path, 'r', encoding='utf-8') as f:
+                summaries.append(json.load(f))
+        except (OSError, json.JSONDecodeError):
+            continue
+    return sorted(summaries, key=lambda s: s.get('created_at', 0), reverse=True)
+
+
+def load_report(report_id: str, directory: Optional[str] = None) -> Optional[dict]:
+    path = os.path.join(directory or c.LINK_REPORT_DIR, f'{os.path.basename(report_id)}.json')
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def entries_path(report_id: str, directory: Optional[str] = None) -> Optional[str]:
+    path = os.path.join(directory or c.LINK_REPORT_DIR, f'{os.path.basename(report_id)}.jsonl')
+    return path if os.path.isfile(path) else None
+
+
+def read_entries(report_id: str, kind: Optional[str] = None, start: int = 0, stop: int = 50) -> tuple[list, int]:
+    '''
+    Entries `[start, stop)` of a report (of `kind` only, if given) and the number of matching entries.
+    The file is streamed, so a report of any size is paged in constant memory
+    '''
+    path = entries_path(report_id)
+    if path is None:
+        return [], 0
+    with open(path, 'r', encoding='utf-8') as f:
+        lines = (line for line in f if line.strip())
+        if kind:
+            # Entries start with their kind, so non-matching lines aren't decoded
+            prefix = json.dumps({"kind": kind})[:-1] + ','
+            lines = (line for line in lines if line.startswith(prefix))
+        total = 0
+        entries = []
+        for line in islice(lines, start):
+            total += 1
+        for line in islice(lines, stop - start):
+            entries.append(json.loads(line))
+            total += 1
+        total += sum(1 for _ in lines)
+    return entries, total
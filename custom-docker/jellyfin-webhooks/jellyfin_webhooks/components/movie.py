@@ -1,8 +1,12 @@
 import os
 import pathlib
 
+from typing import Iterable, Optional
+
 from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.components.torrent_index import TorrentIndex
 from jellyfin_webhooks.utils.functions import markup_language_to_json
+from jellyfin_webhooks.utils.walker import scan, extensions
 
 
 class Movie:
@@ -10,14 +14,18 @@ class Movie:
         self,
         name: str,
         base_dir: str,
-        non_video_file_formats: list[str] = c.NON_VIDEO_FILE_FORMATS
+        non_video_file_formats: Iterable[str] = c.NON_VIDEO_FILE_FORMATS,
+        file: Optional[str] = None,
     ):
+        '''
+        :param file: The movie's video file, when already known (e.g. from the movie index)
+        '''
         self.directory = pathlib.Path(base_dir)
-        self.non_video_file_formats = [f.lower().replace('.', '') for f in non_video_file_formats]
+        self.non_video_file_formats = extensions(non_video_file_formats)
 
         self.name = name
         self._metadata = None
-        self._file = None
+        self._file = pathlib.Path(file) if file else None
 
 
     @property
@@ -25,27 +33,33 @@ class Movie:
         if self._file:
             return self._file
 
-        for file in self.directory.iterdir():
-            # Find file that's in VIDEO format
-            if file.suffix.lower().replace('.', '') not in self.non_video_file_formats:
-                self._file = file
-                break
+        # Find file that's in VIDEO format
+        for entry in scan(self.directory, recursive=False, exclude=self.non_video_file_formats):
+            self._file = pathlib.Path(entry.path)
+            break
 
         assert self._file is not None, f'Could not find file corresponding to Episode {self}'
         return self._file
 
 
-    def get_torrent_path(self):
-        assert isinstance(c.TORRENTS_DATA_ROOT, str), 'Couldnt get `DATA_ROOT` from environment'
-        assert os.path.exists(c.TORRENTS_DATA_ROOT), 'DATA_ROOT path does not exist'
+    def get_torrent_path(self, index: Optional[TorrentIndex] = None):
+        '''
+        Finds the torrent file hardlinked to `self.file`.
+        Uses `index` when provided, otherwise walks the torrent roots
+        '''
+        if index is not None:
+            return index.find(self.file)
+
+        roots = c.torrent_roots
+        assert roots, 'Couldnt get `DATA_ROOT` from environment'
+        assert any(os.path.exists(root) for root in roots), 'DATA_ROOT path does not exist'
 
-        for root, _, files in os.walk(c.TORRENTS_DATA_ROOT):
-            for filename in files:
-                full_path = pathlib.Path(root) / filename
-                
-                # Found a match
-                if os.path.samefile(full_path, self.file):
-                    return full_path
+        st = os.stat(self.file)
+        for root in roots:
+            for entry in scan(root):
+                # Found a match (`inode()` comes from the directory listing, only candidates get a `stat`)
+                if entry.inode() == st.st_ino and entry.stat().st_dev == st.st_dev:
+                    return pathlib.Path(entry.path)
         return None
 
 
@@ -0,0 +1,324 @@
+import os
+import re
+import time
+import logging
+import unicodedata
+from threading import Lock
+from typing import Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.functions import markup_language_to_json
+from jellyfin_webhooks.utils.walker import scan, extension, extensions, map_roots
+
+DIRECTORY_PATTERN = re.compile(r'^(?P<title>.+?)\s*\((?P<year>\d{4})\)')
+
+
+def normalize_title(title: Optional[str]) -> str:
+    '''
+    Lowercases `title` and strips accents and punctuation, so `Star Wars: A New Hope`
+    and `Star Wars - A New Hope` compare equal
+    '''
+    title = unicodedata.normalize('NFKD', title or '')
+    title = ''.join(ch for ch in title if not unicodedata.combining(ch))
+    return ' '.join(re.sub(r'[^\w]+', ' ', title.lower()).split())
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _text(value) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get('#text')
+    value = str(value).strip() if value is not None else ''
+    return value or None
+
+
+def read_movie_nfo(nfo_path: str) -> dict:
+    '''
+    Returns the title, year and provider ids found in a Jellyfin/Kodi movie NFO
+    '''
+    movie = markup_language_to_json(nfo_path).get('movie') or {}
+    if not isinstance(movie, dict):
+        return {}
+
+    details = {
+        "title": _text(movie.get('title')),
+        "year": _text(movie.get('year')) or (_text(movie.get('premiered')) or '').split('-')[0] or None,
+        "tmdb": _text(movie.get('tmdbid')),
+        "imdb": _text(movie.get('imdbid')),
+    }
+    for uniqueid in _as_list(movie.get('uniqueid')):
+        provider = (uniqueid.get('@attributes', {}).get('type') if isinstance(uniqueid, dict) else None) or ''
+        if provider.lower() in ('tmdb', 'imdb') and not details[provider.lower()]:
+            details[provider.lower()] = _text(uniqueid)
+    return details
+
+
+class MovieIndexShard:
+    '''
+    Maps the movies of a single movie root by provider id (tmdb/imdb) and by normalized
+    title + year to their video file, using each movie's NFO.
+    Refreshes are incremental: a movie directory is only read again when its mtime changed.
+    '''
+    def __init__(self, root: str):
+        self.root = root
+        self._movies: dict[str, dict] = {}    # Movie directory -> details
+        self._keys: dict[tuple, str] = {}     # ('tmdb', id) / ('imdb', id) / ('title', title, year) -> movie directory
+        self._lock = Lock()
+        self._refresh_lock = Lock()
+        self.refreshed_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.refresh_duration: Optional[float] = None
+        self.directories_read = 0
+        self.error: Optional[str] = None
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._movies)
+
+    @property
+    def refreshing(self) -> bool:
+        return self._refresh_lock.locked()
+
+    @property
+    def is_fresh(self) -> bool:
+        # A shard being refreshed is never fresh, so lookups wait for the refresh instead of missing
+        if self.refreshing:
+            return False
+        now = time.time()
+        if self.refreshed_at is not None and now - self.refreshed_at <= c.MOVIE_INDEX_REFRESH_INTERVAL:
+            return True
+        # Failed refreshes count too, so an unmounted disk isn't retried on every lookup
+        return self.failed_at is not None and now - self.failed_at <= c.MOVIE_INDEX_REFRESH_INTERVAL
+
+    @staticmethod
+    def _read_movie(directory: str, mtime_ns: int) -> Optional[dict]:
+        nfos, videos = [], []
+        non_video = extensions(c.NON_VIDEO_FILE_FORMATS)
+        for entry in scan(directory, recursive=False):
+            ext = extension(entry.name)
+            if ext == 'nfo':
+                nfos.append(entry)
+            elif ext not in non_video:
+                videos.append(entry)
+        if not videos:
+            return None
+
+        # Extras and samples are smaller than the feature itself
+        video = max(videos, key=lambda entry: entry.stat().st_size)
+        st = video.stat()
+        details = {"title": None, "year": None, "tmdb": None, "imdb": None}
+        # `movie.nfo` or `<video name>.nfo`, whichever Jellyfin wrote
+        for nfo in sorted(nfos, key=lambda entry: entry.name != 'movie.nfo'):
+            try:
+                details = read_movie_nfo(nfo.path)
+                break
+            except Exception as e:
+                logging.warning(f"Could not read movie NFO {nfo.path}: {e}")
+
+        match = DIRECTORY_PATTERN.match(os.path.basename(directory))
+        if match:
+            details['title'] = details.get('title') or match.group('title')
+            details['year'] = details.get('year') or match.group('year')
+        return dict(
+            details,
+            directory=directory,
+            file=video.path,
+            dev=st.st_dev,
+            inode=st.st_ino,
+            mtime_ns=mtime_ns,
+        )
+
+    @staticmethod
+    def _keys_of(movie: dict) -> list:
+        keys = []
+        if movie.get('tmdb'):
+            keys.append(('tmdb', str(movie['tmdb'])))
+        if movie.get('imdb'):
+            keys.append(('imdb', str(movie['imdb']).lower()))
+        if movie.get('title'):
+            keys.append(('title', normalize_title(movie['title']), str(movie.get('year') or '')))
+        return keys
+
+    def refresh(self, if_older_than: Optional[float] = None) -> int:
+        '''
+        Re-reads the movie directories whose mtime changed since the last refresh. Returns the number of directories read
+
+        :param if_older_than: Skip the refresh if another one finished (or failed) after this timestamp
+        '''
+        with self._refresh_lock:
+            if if_older_than is not None and max(self.refreshed_at or 0, self.failed_at or 0) >= if_older_than:
+                return 0
+            start = time.time()
+            try:
+                if not os.path.isdir(self.root):
+                    self.error = f'{self.root} does not exist or is not mounted'
+                    raise FileNotFoundError(self.error)
+
+                known = self._movies
+                movies = {}
+                read = 0
+                for entry in scan(self.root, recursive=False, files=False, dirs=True):
+                    try:
+                        mtime_ns = entry.stat().st_mtime_ns
+                    except OSError:
+                        continue
+                    movie = known.get(entry.path)
+                    if movie is None or movie['mtime_ns'] != mtime_ns:
+                        try:
+                            movie = self._read_movie(entry.path, mtime_ns)
+                        except OSError as e:
+                            logging.warning(f"Could not index movie directory {entry.path}: {e}")
+                            movie = None
+                        read += 1
+                    if movie is not None:
+                        movies[entry.path] = movie
+            except Exception:
+                self.failed_at = time.time()
+                raise
+
+            keys = {}
+            for directory, movie in movies.items():
+                for key in self._keys_of(movie):
+                    keys.setdefault(key, directory)
+
+            with self._lock:
+                self._movies = movies
+                self._keys = keys
+                self.failed_at = None
+                self.error = None
+                self.refreshed_at = time.time()
+                self.refresh_duration = self.refreshed_at - start
+                self.directories_read += read
+        logging.info(f"Indexed {len(movies)} movies under {self.root} ({read} directories read) in {self.refresh_duration:.2f}s")
+        return read
+
+    def lookup(self, tmdb: Optional[str] = None, imdb: Optional[str] = None, title: Optional[str] = None, year: Optional[str] = None) -> Optional[dict]:
+        '''
+        Returns the indexed movie matching the provider ids, or else the normalized title and year
+        '''
+        keys = []
+        if tmdb:
+            keys.append(('tmdb', str(tmdb)))
+        if imdb:
+            keys.append(('imdb', str(imdb).lower()))
+        if title:
+            keys.append(('title', normalize_title(title), str(year or '')))
+
+        for key in keys:
+            directory = self._keys.get(key)
+            movie = self._movies.get(directory) if directory else None
+            if movie is None:
+                continue
+            # The file may have been replaced (e.g. an upgrade) without a refresh yet
+            try:
+                st = os.stat(movie['file'])
+            except OSError:
+                continue
+            if (st.st_dev, st.st_ino) == (movie['dev'], movie['inode']):
+                self.hits += 1
+                return movie
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "movies": len(self._movies),
+            "keys": len(self._keys),
+            "refreshed_at": self.refreshed_at,
+            "refresh_duration": self.refresh_duration,
+            "directories_read": self.directories_read,
+            "hits": self.hits,
+            "error": self.error,
+        }
+
+
+class MovieIndex:
+    '''
+    Movies of every movie root (`MOVIE_ROOTS`), one `MovieIndexShard` per root.
+    Shards are refreshed in parallel and independently, so a slow or unmounted disk only delays its own movies.
+    '''
+    def __init__(self, roots: Optional[list] = None):
+        self._roots = roots
+        self._shards: dict[str, MovieIndexShard] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def roots(self) -> list:
+        # Resolved lazily so changes to `MEDIA_DATA_ROOT` are picked up
+        return self._roots or c.movie_roots
+
+    @property
+    def shards(self) -> list[MovieIndexShard]:
+        with self._lock:
+            for root in self.roots:
+                if root not in self._shards:
+                    self._shards[root] = MovieIndexShard(root)
+            return [self._shards[root] for root in self.roots]
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    @property
+    def is_fresh(self) -> bool:
+        return all(shard.is_fresh for shard in self.shards)
+
+    def _refresh_shards(self, shards: list[MovieIndexShard], if_older_than: Optional[float] = None) -> int:
+        by_root = {shard.root: shard for shard in shards}
+        read = 0
+        for root, result in map_roots(lambda root: by_root[root].refresh(if_older_than), by_root).items():
+            if isinstance(result, Exception):
+                logging.error(f"Could not index movie root {root}: {result}")
+            else:
+                read += result
+        return read
+
+    def refresh(self, if_older_than: Optional[float] = None) -> int:
+        '''
+        Refreshes every shard in parallel. Returns the number of directories read
+        '''
+        return self._refresh_shards(self.shards, if_older_than)
+
+    def lookup(self, tmdb: Optional[str] = None, imdb: Optional[str] = None, title: Optional[str] = None, year: Optional[str] = None) -> Optional[dict]:
+        for shard in self.shards:
+            movie = shard.lookup(tmdb, imdb, title, year)
+            if movie is not None:
+                return movie
+        return None
+
+    def find(self, tmdb: Optional[str] = None, imdb: Optional[str] = None, title: Optional[str] = None, year: Optional[str] = None) -> Optional[dict]:
+        '''
+        Like `lookup`, but refreshes the stale shards on a miss (each at most once every `MOVIE_INDEX_REFRESH_INTERVAL` seconds)
+        '''
+        requested_at = time.time()
+        movie = self.lookup(tmdb, imdb, title, year)
+        if movie is None:
+            stale = [shard for shard in self.shards if not shard.is_fresh]
+            if stale:
+                self._refresh_shards(stale, if_older_than=requested_at)
+                movie = self.lookup(tmdb, imdb, title, year)
+
+        with self._lock:
+            if movie is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return movie
+
+    def stats(self) -> dict:
+        shards = self.shards
+        return {
+            "roots": self.roots,
+            "movies": sum(len(shard) for shard in shards),
+            "hits": self.hits,
+            "misses": self.misses,
+            "shards": [shard.stats() for shard in shards],
+        }
+
+
+movie_index = MovieIndex()
@@ -0,0 +1,145 @@
+import pathlib
+from typing import Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.timing import PhaseTimer
+from jellyfin_webhooks.components.series import Series
+from jellyfin_webhooks.components.movie import Movie
+from jellyfin_webhooks.components.torrent_index import TorrentIndex
+from jellyfin_webhooks.components.movie_index import MovieIndex
+from jellyfin_webhooks.components.catalog import LibraryCatalog, library_directory
+
+PACK_MESSAGE = 'Episode is part of a Series Pack, can only tag as watched on series last episode.'
+
+
+def normalize_item(item: dict) -> dict:
+    '''
+    Accepts either a Jellyfin webhook payload or a Jellyfin API item (`/Items` export)
+    and returns it in the webhook payload shape
+    '''
+    data = dict(item)
+    data.setdefault('ItemType', item.get('Type'))
+    data.setdefault('SeasonNumber', item.get('ParentIndexNumber'))
+    data.setdefault('EpisodeNumber', item.get('IndexNumber'))
+    data.setdefault('ItemId', item.get('Id'))
+    data.setdefault('Year', item.get('ProductionYear'))
+    for provider, provider_id in (item.get('ProviderIds') or {}).items():
+        data.setdefault(f'Provider_{provider.lower()}', provider_id)
+
+    for key in ('SeasonNumber', 'EpisodeNumber'):
+        if data.get(key) is not None:
+            data[key] = int(data[key])
+    return data
+
+
+def item_year(data: dict) -> str:
+    if data.get('PremiereDate'):
+        return data['PremiereDate'].split('-')[0]
+    return str(data.get('Year') or data.get('ProductionYear') or '')
+
+
+def describe_item(data: dict) -> str:
+    if data.get('ItemType') == 'Episode':
+        return f"{data.get('SeriesName')} S{int(data.get('SeasonNumber') or 0):02d}E{int(data.get('EpisodeNumber') or 0):02d}"
+    return f"{data.get('Name')} ({item_year(data)})"
+
+
+def resolve_torrent_paths(
+    data: dict,
+    timer: Optional[PhaseTimer] = None,
+    index: Optional[TorrentIndex] = None,
+    series_cache: Optional[dict] = None,
+    movie_index: Optional[MovieIndex] = None,
+    catalog: Optional[LibraryCatalog] = None,
+) -> tuple[Optional[pathlib.Path], Optional[pathlib.Path]]:
+    '''
+    Finds the torrent file of the watched item and, for episodes, the torrent file of the
+    season's last episode (None when it's the same file).
+
+    :param timer: Collects per-phase timings
+    :param index: Torrent inode index to use instead of walking `TORRENTS_DATA_ROOT`
+    :param series_cache: Series objects reused across calls, keyed by series name
+    :param movie_index: Resolves movies by provider id / title instead of guessing their directory
+    :param catalog: Series objects kept between requests (used when `series_cache` has no entry)
+    '''
+    timer = timer or PhaseTimer()
+    torrent_file_path = None
+    last_ep_torrent_file_path = None
+    if data.get('ItemType') == 'Episode':
+        with timer.phase('resolve_library'):
+            series_name = data.get('SeriesName')
+            series = series_cache.get(series_name) if series_cache is not None else None
+            if series is None and catalog is not None:
+                series = catalog.series(series_name)
+            if series is None:
+                series = Series(
+                    name=series_name,
+                    base_dir = library_directory(series_name, c.series_roots)
+                )
+            if series_cache is not None:
+                series_cache[series_name] = series
+            season = series[int(data.get('SeasonNumber'))]
+            episode = season[data.get('EpisodeNumber')]
+        with timer.phase('torrent_path'):
+            torrent_file_path = episode.get_torrent_path(index)
+        assert torrent_file_path is not None, 'Could not proceed with request. Server was unable to find torrent file corresponding to Episode'
+
+        # Must verify if Episode is part of a `Series Pack`.
+        #   This is done by checking all episodes, and comparing the torrent file path of the latest episode
+        #   With the torrents (if both `watched` ep and `last` ep have similar root (base-dir), they're a season pack)
+        with timer.phase('last_episode_torrent_path'):
+            last_ep_torrent_file_path = season[-1].get_torrent_path(index)
+        if last_ep_torrent_file_path == torrent_file_path:
+            last_ep_torrent_file_path = None    # If `watched` == `last_ep`, then proceed normally (so tag torrent as watched either way)
+    else:
+        with timer.phase('resolve_library'):
+            indexed = None
+            if movie_index is not None:
+                indexed = movie_index.find(
+                    tmdb=data.get('Provider_tmdb'),
+                    imdb=data.get('Provider_imdb'),
+                    title=data.get('Name'),
+                    year=item_year(data),
+                )
+            if indexed is not None:
+                movie = Movie(name=data.get('Name'), base_dir=indexed['directory'], file=indexed['file'])
+            else:
+                movie = Movie(
+                    name=data.get('Name'),
+                    base_dir = library_directory(f'{data.get("Name")} ({item_year(data)})'.replace(':', ' -'), c.movie_roots)
+                )
+        with timer.phase('torrent_path'):
+            torrent_file_path = movie.get_torrent_path(index)
+    return torrent_file_path, last_ep_torrent_file_path
+
+
+class TorrentLookup:
+    '''
+    Indexes a torrent list by `content_path`, so the torrent owning a file is found by
+    checking the file's own path and its parent directories
+    '''
+    def __init__(self, torrents):
+        self._by_path: dict[str, list] = {}
+        for torrent in torrents:
+            self._by_path.setdefault(torrent.content_path.lower().rstrip('/'), []).append(torrent)
+
+    def owners(self, file_path: pathlib.Path) -> list:
+        owners = []
+        path = pathlib.PurePosixPath(file_path.as_posix().lower())
+        for candidate in (path, *path.parents):
+            owners.extend(self._by_path.get(candidate.as_posix(), []))
+        return owners
+
+    def match(self, torrent_file_path: pathlib.Path, last_ep_torrent_file_path: Optional[pathlib.Path] = None) -> tuple[list, str]:
+        '''
+        Returns the torrents to tag for `torrent_file_path`, and a message when some were skipped
+        because they also contain the season's last episode (season packs)
+        '''
+        matches = self.owners(torrent_file_path)
+        if not last_ep_torrent_file_path:
+            return matches, ''
+
+        pack_hashes = {t.hash for t in self.owners(last_ep_torrent_file_path)}
+        to_tag = [t for t in matches if t.hash not in pack_hashes]
+        message = PACK_MESSAGE if len(to_tag) != len(matches) else ''
+        return to_tag, message
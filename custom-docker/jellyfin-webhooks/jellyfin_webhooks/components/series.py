@@ -1,22 +1,40 @@
 import os
+import sys
 import pathlib
+from threading import Lock
 
-from typing import Optional
+from typing import Iterable, Optional
 
 from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.components.torrent_index import TorrentIndex
 from jellyfin_webhooks.utils.functions import markup_language_to_json
+from jellyfin_webhooks.utils.walker import scan, extensions
+
+# The catalog classes use `__slots__` and keep paths as (interned) strings: a warm catalog of a
+# large library holds tens of thousands of episodes. `Path` objects are only built when asked for.
+# Cached objects are shared by concurrent requests: `seasons` and `episodes` are never mutated in place,
+# writers build a new dict under the object's lock and swap it in, so readers always see a complete one.
 
 class Series:
+    __slots__ = ('name', '_directory', 'seasons', 'non_video_file_formats', '_metadata', '_lock')
+
     def __init__(
         self,
         name: str,
         base_dir: str,
-        non_video_file_formats: list[str] = c.NON_VIDEO_FILE_FORMATS
+        non_video_file_formats: Iterable[str] = c.NON_VIDEO_FILE_FORMATS
     ):
         self.name = name
-        self.directory = pathlib.Path(base_dir)
+        self._directory = sys.intern(os.fspath(base_dir))
         self.seasons: dict[int, 'Season'] = {}
-        self.non_video_file_formats = [f.lower().replace('.', '') for f in non_video_file_formats]
+        # Shared by every series using the same formats
+        self.non_video_file_formats = extensions(non_video_file_formats)
+        self._metadata = None
+        self._lock = Lock()
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return pathlib.Path(self._directory)
 
     def __getitem__(self, key: int):
         return self.get(key)
@@ -27,19 +45,19 @@ class Series:
             return self._metadata
 
         self._metadata = {}
-        for file in self.directory.iterdir():
-            if file.suffix.lower() in ('.nfo', '.xml'):
-                self._metadata.update(markup_language_to_json(self.directory / file))
+        for entry in scan(self._directory, recursive=False, include=('nfo', 'xml')):
+            self._metadata.update(markup_language_to_json(entry.path))
         return self._metadata
 
     def get(self, season_num: int) -> 'Season':
         '''
             Tries to fetch the season associated with `season_num`
         '''
-        if self.seasons.get(season_num):
-            return self.seasons[season_num]
+        seasons = self.seasons
+        if seasons.get(season_num):
+            return seasons[season_num]
         
-        for folder in self.directory.iterdir():
+        for folder in scan(self._directory, recursive=False, files=False, dirs=True):
             if not folder.name.startswith('Season '):
                 continue
             folder_season = int(folder.name.split(' ')[-1])
@@ -51,20 +69,23 @@ class Series:
             )
             self.add_season(season)
 
+        seasons = self.seasons
         if season_num == -1:
-            return self.seasons[max(self.seasons.keys())]
-        return self.seasons[season_num]
+            return seasons[max(seasons.keys())]
+        return seasons[season_num]
 
     def add_season(self, season: 'Season'):
-        if season.season_num in self.seasons.keys():
-            return False
-        self.seasons[season.season_num] = season
+        with self._lock:
+            if season.season_num in self.seasons.keys():
+                return False
+            self.seasons = {**self.seasons, season.season_num: season}
         return True
 
     def replace_season(self, season: 'Season'):
-        if season.season_num not in self.seasons.keys():
-            return False
-        self.seasons[season.season_num] = season
+        with self._lock:
+            if season.season_num not in self.seasons.keys():
+                return False
+            self.seasons = {**self.seasons, season.season_num: season}
         return True
 
     def refresh(self, refresh_episodes: bool=True):
@@ -72,14 +93,13 @@ class Series:
         Refreshes season list for `self` serie
         
         '''
-        for folder in self.directory.iterdir():
+        for folder in scan(self._directory, recursive=False, files=False, dirs=True):
             if not folder.name.startswith('Season '):
                 continue
 
-            season = Season(
-                self,
-                int(folder.name.split(' ')[-1])
-            )
+            season_num = int(folder.name.split(' ')[-1])
+            # Known seasons are kept, their refresh only reads the episodes added since
+            season = self.seasons.get(season_num) or Season(self, season_num)
             if refresh_episodes:
                 season.refresh()
             self.add_season(season)
@@ -87,6 +107,7 @@ class Series:
 
 
 class Season:
+    __slots__ = ('episodes', 'series', 'season_num', '_listed_mtime', '_lock')
 
     def __init__(
         self,
@@ -95,8 +116,18 @@ class Season:
     ):
         self.episodes: dict[int, 'Episode'] = {}
         self.series = series
-        self.season_num = season_num
-        self.directory = series.directory / f'Season {self.season_num}'
+        self.season_num = int(season_num)
+        # mtime of the season directory when all its files were last listed
+        self._listed_mtime: Optional[int] = None
+        self._lock = Lock()
+
+    @property
+    def path(self) -> str:
+        return f'{self.series._directory}/Season {self.season_num}'
+
+    @property
+    def directory(self) -> pathlib.Path:
+        return pathlib.Path(self.path)
 
     def __getitem__(self, key: int):
         return self.get(key)
@@ -106,60 +137,87 @@ class Season:
         '''
             Tries to fetch the episode associated with `episode_num`
         '''
-        if self.episodes.get(episode_num):
-            return self.episodes[episode_num]
+        episodes = self.episodes
+        if episodes.get(episode_num):
+            return episodes[episode_num]
         
         self.refresh(stop_on=episode_num)
 
+        episodes = self.episodes
         if episode_num == -1:
-            return self.episodes[max(self.episodes.keys())]
-        return self.episodes[episode_num]
+            return episodes[max(episodes.keys())]
+        return episodes[episode_num]
 
     def add_episode(self, episode: 'Episode'):
-        if episode.episode_num in self.episodes.keys():
-            return False
-
-        self.episodes[episode.episode_num] = episode
+        with self._lock:
+            if episode.episode_num in self.episodes.keys():
+                return False
+            self.episodes = {**self.episodes, episode.episode_num: episode}
         return True
 
     def replace_episode(self, episode: 'Episode'):
-        if episode.episode_num not in self.episodes.keys():
-            return False
-        self.episodes[episode.episode_num] = episode
+        with self._lock:
+            if episode.episode_num not in self.episodes.keys():
+                return False
+            self.episodes = {**self.episodes, episode.episode_num: episode}
         return True
 
+    def _mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
     def refresh(self, stop_on: int=0):
         '''
         Refreshes episode list for `self` season.
-        Stops at `stop_on` episode num
+        Stops at `stop_on` episode num.
+        Files of known episodes aren't read again, and a season fully listed since its directory
+        last changed isn't listed at all
         
         :param self: Description
         '''
-        episode_list = {}
-        for file in self.directory.iterdir():
-            filename_preffix = file.name.replace(file.suffix, '')
-            
-            # Ignore `thumbnails`
-            if filename_preffix.lower().endswith('-thumb'):
-                continue
-
-            if filename_preffix.lower().strip('-thumb') in episode_list:
-                continue
-            episode = Episode(
-                season = self,
-                episode_num=None,
-                name=None,
-                filename_preffix=filename_preffix,
-            )
-            episode_list[filename_preffix.lower()] = episode
-            self.add_episode(episode)
-
-            if stop_on == episode.episode_num:
+        with self._lock:
+            mtime = self._mtime()
+            if mtime is not None and mtime == self._listed_mtime:
                 return True
+
+            episodes = dict(self.episodes)
+            episode_list = {
+                episode._filename_preffix.lower(): episode
+                for episode in episodes.values() if episode._filename_preffix
+            }
+            try:
+                for entry in scan(self.path, recursive=False):
+                    file = pathlib.Path(entry.name)
+                    filename_preffix = file.name.replace(file.suffix, '')
+                    
+                    # Ignore `thumbnails`
+                    if filename_preffix.lower().endswith('-thumb'):
+                        continue
+
+                    if filename_preffix.lower().strip('-thumb') in episode_list:
+                        continue
+                    episode = Episode(
+                        season = self,
+                        episode_num=None,
+                        name=None,
+                        filename_preffix=filename_preffix,
+                    )
+                    episode_list[filename_preffix.lower()] = episode
+                    episodes.setdefault(episode.episode_num, episode)
+
+                    if stop_on == episode.episode_num:
+                        return True
+                # Every file was seen
+                self._listed_mtime = mtime
+            finally:
+                self.episodes = episodes
         return True
         
 
 class Episode:
+    __slots__ = ('season', '_metadata', '_file', '_filename_preffix', '_name', '_episode_num')
 
     def __init__(
         self,
@@ -203,12 +261,11 @@ class Episode:
         if self._filename_preffix:
             return self._filename_preffix
 
-        for file in self.season.directory.iterdir():
-            if not file.suffix.lower() in ('.nfo', '.xml'):
-                continue
+        for entry in scan(self.season.path, recursive=False, include=('nfo', 'xml')):
+            file = pathlib.Path(entry.path)
 
             # Read Metadata and confirm if it's correspondent to `self` or not
-            metadata = markup_language_to_json(self.season.directory / file)
+            metadata = markup_language_to_json(file)
             if int(metadata['episodedetails']['season']) != self.season.season_num:
                 continue
             
@@ -221,64 +278,78 @@ class Episode:
         assert self._filename_preffix is not None, f'Could not find data corresponding to Episode {self}'
         return self._filename_preffix
     
+    def _read_metadata(self) -> dict:
+        # Update metadata with both `.xml` and `.nfo`
+        metadata = {}
+        for suffix in ('xml', 'nfo'):
+            metadata_file = f'{self.season.path}/{self.filename_preffix}.{suffix}'
+            # Jellyfin only writes `.nfo` files, other tools may add `.xml` ones
+            if not os.path.exists(metadata_file):
+                continue
+            metadata.update(markup_language_to_json(metadata_file))
+        assert metadata != {}, f'Could not find metadata related to episode `{self}`'
+        return metadata
+
     @property
     def metadata(self):
         if self._metadata:
             return self._metadata
 
-        # Update metadata with both `.xml` and `.nfo`
-        self._metadata = {}
-        for suffix in ('xml', 'nfo'):
-            self._metadata.update(
-                markup_language_to_json(self.season.directory / f'{self.filename_preffix}.{suffix}')
-            )
-        assert self._metadata != {}, f'Could not find metadata related to episode `{self}`'
+        self._metadata = self._read_metadata()
         return self._metadata
 
+    def _load_details(self):
+        # Only the episode number and title are kept, the parsed NFO is dropped unless `metadata` was asked for
+        details = (self._metadata or self._read_metadata())['episodedetails']
+        if self._episode_num is None:
+            self._episode_num = int(details['episode'])
+        if self._name is None:
+            self._name = details['title']
+
     @property
     def file(self) -> pathlib.Path:
         if self._file:
-            return self._file
-
-        for file in self.season.directory.iterdir():
-            if not file.name.lower().startswith(self.filename_preffix.lower()):
-                continue
+            return pathlib.Path(self.season.path, self._file)
 
-            # Find file that's in VIDEO format
-            if file.suffix.lower().replace('.', '') not in self.season.series.non_video_file_formats:
-                self._file = file
+        # Find file that's in VIDEO format
+        for entry in scan(self.season.path, recursive=False, exclude=self.season.series.non_video_file_formats):
+            if entry.name.lower().startswith(self.filename_preffix.lower()):
+                self._file = entry.name
                 break
 
         assert self._file is not None, f'Could not find file corresponding to Episode {self}'
-        return self._file
+        return pathlib.Path(self.season.path, self._file)
 
     @property
     def episode_num(self) -> int:
-        if self._episode_num is not None:
-            return self._episode_num
-        
-        self._episode_num = int(self.metadata['episodedetails']['episode'])
+        if self._episode_num is None:
+            self._load_details()
         return self._episode_num
         
     @property
     def name(self) -> str:
-        if self._name is not None:
-            return self._name
-        
-        self._name = self.metadata['episodedetails']['title']
+        if self._name is None:
+            self._load_details()
         return self._name
 
-    def get_torrent_path(self):
-        assert isinstance(c.TORRENTS_DATA_ROOT, str), 'Couldnt get `DATA_ROOT` from environment'
-        assert os.path.exists(c.TORRENTS_DATA_ROOT), 'DATA_ROOT path does not exist'
-
-        for root, _, files in os.walk(c.TORRENTS_DATA_ROOT):
-            for filename in files:
-                full_path = pathlib.Path(root) / filename
-                
-                # Found a match
-                if os.path.samefile(full_path, self.file):
-                    return full_path
+    def get_torrent_path(self, index: Optional[TorrentIndex] = None):
+        '''
+        Finds the torrent file hardlinked to `self.file`.
+        Uses `index` when provided, otherwise walks the torrent roots
+        '''
+        if index is not None:
+            return index.find(self.file)
+
+        roots = c.torrent_roots
+        assert roots, 'Couldnt get `DATA_ROOT` from environment'
+        assert any(os.path.exists(root) for root in roots), 'DATA_ROOT path does not exist'
+
+        st = os.stat(self.file)
+        for root in roots:
+            for entry in scan(root):
+                # Found a match (`inode()` comes from the directory listing, only candidates get a `stat`)
+                if entry.inode() == st.st_ino and entry.stat().st_dev == st.st_dev:
+                    return pathlib.Path(entry.path)
         return None
 
 
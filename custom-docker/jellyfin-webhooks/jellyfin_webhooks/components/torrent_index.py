@@ -0,0 +1,369 @@
+import os
+import time
+import pathlib
+import logging
+from threading import Lock, Thread
+from typing import Optional, Union
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.cache import TTLCache
+from jellyfin_webhooks.utils.walker import scan, map_roots
+
+
+class NegativeCache:
+    '''
+    Remembers library files known to have no torrent counterpart, keyed by (device, inode, mtime).
+    Entries expire after `NEGATIVE_CACHE_TTL` seconds, and are all dropped as soon as the mtimes of
+    the torrent tree's top directories change (i.e. torrents were added or removed).
+    The tree is checked by a background thread every `NEGATIVE_CACHE_SIGNATURE_INTERVAL` seconds,
+    so lookups never pay for it.
+    '''
+    def __init__(self, index: 'TorrentIndex'):
+        self.index = index
+        self._entries = TTLCache(ttl=c.NEGATIVE_CACHE_TTL, maxsize=c.NEGATIVE_CACHE_MAXSIZE)
+        self._lock = Lock()
+        self._signature = None
+        self._signature_checked_at: Optional[float] = None
+        self._watcher: Optional[Thread] = None
+        self.invalidations = 0
+
+    def _tree_signature(self) -> tuple:
+        '''
+        mtimes of the directories in the first `NEGATIVE_CACHE_SIGNATURE_DEPTH` levels of every torrent root
+        '''
+        signature = []
+        for root in self.index.roots:
+            try:
+                signature.append((root, os.stat(root).st_mtime_ns))
+            except OSError:
+                signature.append((root, None))
+                continue
+            for entry in scan(root, files=False, dirs=True, max_depth=c.NEGATIVE_CACHE_SIGNATURE_DEPTH):
+                try:
+                    signature.append((entry.path, entry.stat(follow_symlinks=False).st_mtime_ns))
+                except OSError:
+                    signature.append((entry.path, None))
+        return tuple(sorted(signature, key=lambda item: (item[0], item[1] or 0)))
+
+    def _check(self):
+        # Costs a few syscalls per directory of the top levels of every root
+        signature = self._tree_signature()
+        with self._lock:
+            if signature != self._signature:
+                if self._signature is not None and len(self._entries):
+                    logging.info(f"Torrent tree changed, dropping {len(self._entries)} negative cache entries")
+                    self.invalidations += 1
+                self._entries.clear()
+                self._signature = signature
+            self._signature_checked_at = time.time()
+
+    def _watch(self):
+        while True:
+            try:
+                self._check()
+            except Exception as e:
+                logging.error(f"Could not check the torrent tree for the negative cache: {e}")
+            time.sleep(c.NEGATIVE_CACHE_SIGNATURE_INTERVAL)
+
+    def _ensure_watching(self):
+        if self._watcher is not None:
+            return
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = Thread(target=self._watch, name='negative-cache-watcher', daemon=True)
+                self._watcher.start()
+
+    @staticmethod
+    def key(st: os.stat_result) -> tuple[int, int, int]:
+        return (st.st_dev, st.st_ino, st.st_mtime_ns)
+
+    def contains(self, st: os.stat_result) -> bool:
+        self._ensure_watching()
+        return self._entries.get(self.key(st)) is not None
+
+    def add(self, st: os.stat_result, file: Union[str, pathlib.Path]):
+        self._ensure_watching()
+        # Until the first check there is nothing to compare a change against
+        if self._signature is None:
+            return
+        self._entries.set(self.key(st), {"path": str(file), "cached_at": time.time()})
+
+    def entries(self) -> list:
+        return [
+            {"dev": key[0], "inode": key[1], "mtime_ns": key[2], "expires_in": expires_in, **value}
+            for key, value, expires_in in self._entries.items()
+        ]
+
+    def clear(self) -> int:
+        return self._entries.clear()
+
+    def stats(self) -> dict:
+        return dict(self._entries.stats(), invalidations=self.invalidations, checked_at=self._signature_checked_at)
+
+
+class TorrentIndexShard:
+    '''
+    Inodes of the files under a single torrent root. Shards are built and refreshed independently
+    '''
+    def __init__(self, root: str):
+        self.root = root
+        self._inodes: dict[tuple[int, int], str] = {}
+        self.devices: set[int] = set()
+        self._lock = Lock()
+        self._build_lock = Lock()
+        self.built_at: Optional[float] = None
+        self.failed_at: Optional[float] = None
+        self.build_duration: Optional[float] = None
+        self.error: Optional[str] = None
+        self.hits = 0
+
+    def __len__(self) -> int:
+        return len(self._inodes)
+
+    @property
+    def building(self) -> bool:
+        return self._build_lock.locked()
+
+    @property
+    def is_fresh(self) -> bool:
+        '''
+        Whether the shard was built recently enough that a lookup miss shouldn't trigger a rebuild.
+        A shard being built is never fresh, so lookups wait for the build instead of missing
+        '''
+        if self.building:
+            return False
+        now = time.time()
+        if self.built_at is not None and now - self.built_at <= c.TORRENT_INDEX_REBUILD_INTERVAL:
+            return True
+        # Failed builds count too, so an unmounted disk isn't retried on every lookup
+        return self.failed_at is not None and now - self.failed_at <= c.TORRENT_INDEX_REBUILD_INTERVAL
+
+    def build(self, if_older_than: Optional[float] = None) -> int:
+        '''
+        Walks the root once and replaces the shard. Returns the number of indexed files
+
+        :param if_older_than: Skip the walk if another build finished (or failed) after this timestamp
+        '''
+        with self._build_lock:
+            if if_older_than is not None and max(self.built_at or 0, self.failed_at or 0) >= if_older_than:
+                return len(self._inodes)
+            start = time.time()
+            try:
+                if not os.path.isdir(self.root):
+                    self.error = f'{self.root} does not exist or is not mounted'
+                    raise FileNotFoundError(self.error)
+
+                inodes = {}
+                for full_path, st in _walk(self.root):
+                    inodes[(st.st_dev, st.st_ino)] = full_path
+            except Exception:
+                self.failed_at = time.time()
+                raise
+
+            with self._lock:
+                self._inodes = inodes
+                # A root may span several filesystems (mounts below it)
+                self.devices = {key[0] for key in inodes} | {os.stat(self.root).st_dev}
+                self.built_at = time.time()
+                self.build_duration = self.built_at - start
+                self.failed_at = None
+                self.error = None
+        logging.info(f"Indexed {len(inodes)} torrent files under {self.root} in {self.build_duration:.2f}s")
+        return len(inodes)
+
+    def update(self, entries: dict):
+        with self._lock:
+            self._inodes.update(entries)
+            self.devices.update(key[0] for key in entries)
+
+    def lookup(self, key: tuple[int, int]) -> Optional[pathlib.Path]:
+        path = self._inodes.get(key)
+        if path is None:
+            return None
+
+        # Inodes get reused once files are deleted, so confirm the entry is still valid
+        try:
+            current = os.stat(path)
+        except OSError:
+            current = None
+        if current is None or (current.st_dev, current.st_ino) != key:
+            with self._lock:
+                self._inodes.pop(key, None)
+            return None
+        self.hits += 1
+        return pathlib.Path(path)
+
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "files": len(self._inodes),
+            "devices": sorted(self.devices),
+            "built_at": self.built_at,
+            "build_duration": self.build_duration,
+            "hits": self.hits,
+            "error": self.error,
+        }
+
+
+def _walk(path: str):
+    if os.path.isfile(path):
+        try:
+            yield path, os.stat(path)
+        except OSError:
+            pass
+        return
+    for entry in scan(path):
+        try:
+            yield entry.path, entry.stat()
+        except OSError:
+            continue
+
+
+class TorrentIndex:
+    '''
+    Maps every file under the torrent roots (`TORRENTS_DATA_ROOTS`) by (device, inode), so the torrent
+    counterpart of a hardlinked library file can be found without walking the torrent trees.
+    There is one shard per root, built in parallel. Hardlinks never cross filesystems, so a lookup only
+    involves the shards holding the file's device: a slow or unmounted disk doesn't hold up the others.
+    '''
+    def __init__(self, roots: Optional[list] = None):
+        self._roots = roots
+        self._shards: dict[str, TorrentIndexShard] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.negative = NegativeCache(self)
+
+    @property
+    def roots(self) -> list:
+        # Resolved lazily so changes to `TORRENTS_DATA_ROOT(S)` are picked up
+        return self._roots or c.torrent_roots
+
+    @property
+    def shards(self) -> list[TorrentIndexShard]:
+        with self._lock:
+            for root in self.roots:
+                if root not in self._shards:
+                    self._shards[root] = TorrentIndexShard(root)
+            return [self._shards[root] for root in self.roots]
+
+    def shard(self, root: str) -> Optional[TorrentIndexShard]:
+        return next((shard for shard in self.shards if shard.root == root), None)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    @property
+    def is_fresh(self) -> bool:
+        return all(shard.is_fresh for shard in self.shards)
+
+    def _build_shards(self, shards: list[TorrentIndexShard], if_older_than: Optional[float] = None) -> dict:
+        by_root = {shard.root: shard for shard in shards}
+        results = map_roots(lambda root: by_root[root].build(if_older_than), by_root)
+        for root, result in results.items():
+            if isinstance(result, Exception):
+                logging.error(f"Could not index torrent root {root}: {result}")
+        return results
+
+    def build(self, if_older_than: Optional[float] = None) -> int:
+        '''
+        Rebuilds every shard in parallel. Returns the number of indexed files.
+        Raises only when no root could be indexed
+
+        :param if_older_than: Skip the shards built after this timestamp
+        '''
+        assert self.roots, 'Couldnt get `DATA_ROOT` from environment'
+        results = self._build_shards(self.shards, if_older_than)
+        errors = [result for result in results.values() if isinstance(result, Exception)]
+        if len(errors) == len(results):
+            raise errors[0]
+        return sum(result for result in results.values() if not isinstance(result, Exception))
+
+    def _shard_of(self, path: str, st: Optional[os.stat_result] = None) -> Optional[TorrentIndexShard]:
+        shards = self.shards
+        for shard in sorted(shards, key=lambda s: len(s.root), reverse=True):
+            if path == shard.root or path.startswith(shard.root.rstrip('/') + '/'):
+                return shard
+        if st is not None:
+            return next((shard for shard in shards if st.st_dev in shard.devices), shards[0] if shards else None)
+        return shards[0] if shards else None
+
+    def add(self, path: Union[str, pathlib.Path]) -> tuple[int, int]:
+        '''
+        Indexes a single file or every file below a directory (e.g. a torrent's `content_path`).
+        Returns the number of indexed files, and how many of them are hardlinked elsewhere
+        '''
+        indexed, linked = 0, 0
+        entries = {}
+        first = None
+        for full_path, st in _walk(str(path)):
+            entries[(st.st_dev, st.st_ino)] = full_path
+            first = first or st
+            indexed += 1
+            linked += st.st_nlink > 1
+        shard = self._shard_of(str(path), first)
+        if shard is not None and entries:
+            shard.update(entries)
+        return indexed, linked
+
+    def _candidates(self, st: os.stat_result) -> list[TorrentIndexShard]:
+        # Shards never built yet don't know their devices
+        return [shard for shard in self.shards if st.st_dev in shard.devices or shard.built_at is None]
+
+    def lookup(self, file: Union[str, pathlib.Path], st: Optional[os.stat_result] = None) -> Optional[pathlib.Path]:
+        '''
+        Returns the torrent file sharing an inode with `file`, or None
+        '''
+        st = st or os.stat(file)
+        key = (st.st_dev, st.st_ino)
+        for shard in self._candidates(st):
+            path = shard.lookup(key)
+            if path is not None:
+                return path
+        return None
+
+    def find(self, file: Union[str, pathlib.Path]) -> Optional[pathlib.Path]:
+        '''
+        Like `lookup`, but rebuilds the shards that could hold the file on a miss (new torrents may have been
+        added since they were built). A shard is rebuilt at most once every `TORRENT_INDEX_REBUILD_INTERVAL` seconds,
+        and files that already missed are answered from the negative cache until the torrent trees change
+        '''
+        requested_at = time.time()
+        st = os.stat(file)
+        path = self.lookup(file, st)
+        # Only misses are checked against the negative cache
+        if path is None and self.negative.contains(st):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        if path is None:
+            stale = [shard for shard in self._candidates(st) if not shard.is_fresh]
+            if stale:
+                # Concurrent misses share a single rebuild per shard
+                self._build_shards(stale, if_older_than=requested_at)
+                path = self.lookup(file, st)
+        # A shard not built yet (or still building) may hold the file: such a miss isn't remembered
+        if path is None and all(shard.built_at is not None and not shard.building for shard in self._candidates(st)):
+            self.negative.add(st, file)
+
+        with self._lock:
+            if path is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return path
+
+    def stats(self) -> dict:
+        shards = self.shards
+        return {
+            "roots": self.roots,
+            "files": sum(len(shard) for shard in shards),
+            "hits": self.hits,
+            "misses": self.misses,
+            "negative_cache": self.negative.stats(),
+            "shards": [shard.stats() for shard in shards],
+        }
+
+
+torrent_index = TorrentIndex()
@@ -0,0 +1,146 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.qbittorrent import qbt_calls
+from jellyfin_webhooks.components.torrent_index import torrent_index
+from jellyfin_webhooks.components.movie_index import movie_index
+from jellyfin_webhooks.components.catalog import library_catalog
+from jellyfin_webhooks.utils.request_index import request_index
+
+
+class StepSkipped(Exception):
+    pass
+
+
+class Warmup:
+    '''
+    Does the cold work of the webhook hot paths (heavy imports, qBittorrent session, torrent index,
+    movie index, library catalog) on a background thread right after startup, so the first events
+    don't pay for it. `/healthz/ready` reports its progress.
+    Steps run in order; the app is ready once every `required` step has finished (even if it failed).
+    '''
+    def __init__(self):
+        self.steps: dict[str, dict] = {}
+        self._targets: dict[str, Callable[[], Optional[dict]]] = {}
+        self.enabled = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def add_step(self, name: str, target: Callable[[], Optional[dict]], required: bool = True):
+        self._targets[name] = target
+        self.steps[name] = {"name": name, "required": required, "status": "pending", "duration_ms": None, "detail": None, "error": None}
+
+    def start(self) -> bool:
+        with self._lock:
+            if self._thread is not None:
+                return False
+            self.enabled = True
+            self.started_at = time.time()
+            self._thread = threading.Thread(target=self._run, name='warmup', daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        for name, target in self._targets.items():
+            step = self.steps[name]
+            step['status'] = 'running'
+            start = time.perf_counter()
+            try:
+                step['detail'] = target()
+                step['status'] = 'done'
+            except StepSkipped as e:
+                step['status'] = 'skipped'
+                step['detail'] = {"reason": str(e)}
+            except Exception as e:
+                logging.error(f"Warm-up step {name} failed: {e}")
+                step['status'] = 'error'
+                step['error'] = str(e) or type(e).__name__
+            step['duration_ms'] = round((time.perf_counter() - start) * 1000, 3)
+        self.finished_at = time.time()
+        logging.info(f"Warm-up finished in {self.finished_at - self.started_at:.2f}s")
+
+    @property
+    def ready(self) -> bool:
+        # Without a warm-up everything is done lazily, on the first requests
+        return not self.enabled or all(
+            step['status'] in ('done', 'skipped', 'error') for step in self.steps.values() if step['required']
+        )
+
+    def to_dict(self) -> dict:
+        steps = [dict(step) for step in self.steps.values()]
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": (self.finished_at or time.time()) - self.started_at if self.started_at else None,
+            "progress": {
+                "done": sum(step['status'] in ('done', 'skipped', 'error') for step in steps),
+                "total": len(steps),
+            },
+            "steps": steps,
+        }
+
+
+def _warm_imports() -> dict:
+    import bs4
+    import qbittorrentapi  # noqa: F401
+
+    # Builds the lxml tree builder used to parse NFOs
+    bs4.BeautifulSoup('<warmup/>', 'xml')
+    return {"modules": ['bs4', 'lxml', 'qbittorrentapi']}
+
+
+def _warm_qbittorrent() -> dict:
+    if not c.QBT_HOST:
+        raise StepSkipped('QBT_HOST is not set')
+    return {"version": qbt_calls.app_version()}
+
+
+def _existing(roots: list) -> list:
+    if not any(os.path.isdir(root) for root in roots):
+        raise StepSkipped(f"{', '.join(roots) or 'No root'} does not exist")
+    return roots
+
+
+def _warm_torrent_index() -> dict:
+    _existing(torrent_index.roots)
+    files = torrent_index.build()
+    return {"files": files, "shards": {shard.root: shard.error or len(shard) for shard in torrent_index.shards}}
+
+
+def _warm_movie_index() -> dict:
+    _existing(movie_index.roots)
+    movie_index.refresh()
+    return {"movies": len(movie_index), "shards": {shard.root: shard.error or len(shard) for shard in movie_index.shards}}
+
+
+def _warm_library_catalog() -> dict:
+    _existing(library_catalog.roots)
+    episodes = library_catalog.load()
+    return {"series": len(library_catalog), "episodes": episodes}
+
+
+def _warm_request_index() -> dict:
+    if not c.REQUESTS_INDEX_ENABLED:
+        raise StepSkipped('REQUESTS_INDEX_ENABLED is false')
+    if not request_index.is_empty():
+        raise StepSkipped('already indexed')
+    # First start with an index: pick up the history recorded so far
+    return {"entries": request_index.rebuild()}
+
+
+warmup = Warmup()
+warmup.add_step('imports', _warm_imports)
+warmup.add_step('qbittorrent', _warm_qbittorrent)
+warmup.add_step('torrent_index', _warm_torrent_index)
+warmup.add_step('movie_index', _warm_movie_index)
+# Parsing every episode NFO can take minutes on large libraries, requests fall back to lazy loading meanwhile
+warmup.add_step('library_catalog', _warm_library_catalog, required=False)
+warmup.add_step('request_index', _warm_request_index, required=False)
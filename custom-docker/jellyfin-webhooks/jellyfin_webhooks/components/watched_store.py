@@ -0,0 +1,239 @@
+import os
+import time
+import logging
+import pathlib
+import sqlite3
+import threading
+from typing import Optional, Union
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.qbittorrent import qbt_calls
+from jellyfin_webhooks.utils.walker import scan, extensions
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS watched (
+    dev INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    torrent_name TEXT,
+    path TEXT,
+    item_id TEXT,
+    item_name TEXT,
+    source TEXT NOT NULL,
+    tagged_at REAL NOT NULL,
+    PRIMARY KEY (dev, inode, hash)
+);
+CREATE INDEX IF NOT EXISTS watched_hash ON watched (hash);
+CREATE INDEX IF NOT EXISTS watched_item_id ON watched (item_id);
+CREATE INDEX IF NOT EXISTS watched_tagged_at ON watched (tagged_at);
+'''
+
+COLUMNS = ('dev', 'inode', 'hash', 'torrent_name', 'path', 'item_id', 'item_name', 'source', 'tagged_at')
+
+
+def file_key(path: Union[str, pathlib.Path]) -> Optional[tuple[int, int]]:
+    '''
+    (device, inode) of a file: shared by the library file and its hardlink in the torrents tree
+    '''
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_dev, stat.st_ino
+
+
+def has_tag(torrent, tag: str = 'watched') -> bool:
+    return tag in [t.strip() for t in (torrent.tags or '').split(',')]
+
+
+class WatchedStore:
+    '''
+    Record of the files already tagged `watched`: (device, inode) of the file -> torrent hashes,
+    with when and by what they were tagged. Lets a repeated PlaybackStop skip resolving and tagging (`hits`),
+    and is rebuilt from the `watched` tags of qBittorrent with `rebuild`.
+    '''
+    def __init__(self, path: Optional[str] = None):
+        self._path = path
+        self._initialized = False
+        self.hits = 0
+        self.stale = 0
+        self.rebuilt_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path or c.WATCHED_STORE_FILE
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._initialized:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.row_factory = sqlite3.Row
+        connection.execute('PRAGMA journal_mode=WAL')
+        if not self._initialized:
+            connection.executescript(SCHEMA)
+            self._initialized = True
+        return connection
+
+    def _select(self, condition: str, *params) -> list[dict]:
+        connection = self._connect()
+        try:
+            rows = connection.execute(f'SELECT * FROM watched WHERE {condition}', params).fetchall()
+        finally:
+            connection.close()
+        return [dict(row) for row in rows]
+
+    def lookup(self, item_id: Optional[str] = None, key: Optional[tuple[int, int]] = None) -> list[dict]:
+        '''
+        Records of a Jellyfin item, or of a file. Item records only count while the recorded path still
+        is the file that was tagged (Jellyfin derives item ids from paths, so upgrades usually get a new one)
+        '''
+        if item_id:
+            records = self._select('item_id = ?', item_id)
+            if records and all(file_key(record['path']) == (record['dev'], record['inode']) for record in records):
+                return records
+        if key:
+            return self._select('dev = ? AND inode = ?', *key)
+        return []
+
+    def record(self, key: tuple[int, int], torrents: list, path: str, item: dict, source: str):
+        now = time.time()
+        rows = [
+            (*key, torrent.hash, torrent.name, path, item.get('ItemId'), item.get('Name'), source, now)
+            for torrent in torrents
+        ]
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT OR REPLACE INTO watched ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                )
+        finally:
+            connection.close()
+
+    def forget(self, hashes: list):
+        '''
+        Drops the records of torrents that no longer exist (or lost their tag)
+        '''
+        if not hashes:
+            return
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(f"DELETE FROM watched WHERE hash IN ({', '.join('?' * len(hashes))})", hashes)
+        finally:
+            connection.close()
+
+    def attach(self, key: tuple[int, int], item: dict):
+        '''
+        Links records made without a Jellyfin item (by `rebuild`) to `item`, so its next events skip resolving
+        '''
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'UPDATE watched SET item_id = ?, item_name = ? WHERE dev = ? AND inode = ? AND item_id IS NULL',
+                    (item.get('ItemId'), item.get('Name'), *key)
+                )
+        finally:
+            connection.close()
+
+    @staticmethod
+    def hashes(records: list[dict]) -> list:
+        return sorted({record['hash'] for record in records})
+
+    def verify(self, records: list[dict], torrents: Optional[list] = None) -> Optional[list]:
+        '''
+        Returns the torrents of `records` when every one of them still exists in qBittorrent and
+        still carries `watched`, otherwise None (and forgets the stale records)
+
+        :param torrents: `torrents_summary(torrent_hashes=...)` of the records, when already fetched (ASGI mode)
+        '''
+        hashes = self.hashes(records)
+        if torrents is None:
+            torrents = qbt_calls.torrents_summary(torrent_hashes='|'.join(hashes))
+        torrents = {t.hash: t for t in torrents}
+        stale = [h for h in hashes if h not in torrents or not has_tag(torrents[h])]
+        if stale:
+            self.forget(stale)
+            with self._lock:
+                self.stale += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return [torrents[h] for h in hashes]
+
+    def rebuild(self) -> dict:
+        '''
+        Recreates the records from the torrents tagged `watched`: every video file of their content is recorded.
+        Existing records keep their history, those of torrents no longer tagged are dropped
+        '''
+        start = time.time()
+        torrents = [t for t in qbt_calls.torrents_summary(tag='watched') if has_tag(t)]
+        non_video = extensions(c.NON_VIDEO_FILE_FORMATS)
+        rows = []
+        for torrent in torrents:
+            content_path = torrent.content_path
+            if os.path.isdir(content_path):
+                entries = [(entry.path, entry.stat()) for entry in scan(content_path, exclude=non_video)]
+            elif os.path.isfile(content_path):
+                entries = [(content_path, os.stat(content_path))]
+            else:
+                continue
+            for path, stat in entries:
+                rows.append((stat.st_dev, stat.st_ino, torrent.hash, torrent.name, path, None, None, 'rebuild', start))
+
+        hashes = sorted({torrent.hash for torrent in torrents})
+        connection = self._connect()
+        try:
+            with connection:
+                connection.executemany(
+                    f"INSERT OR IGNORE INTO watched ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", rows
+                )
+                connection.execute('CREATE TEMP TABLE tagged (hash TEXT PRIMARY KEY)')
+                connection.executemany('INSERT INTO temp.tagged VALUES (?)', [(h,) for h in hashes])
+                removed = connection.execute('DELETE FROM watched WHERE hash NOT IN (SELECT hash FROM temp.tagged)').rowcount
+        finally:
+            connection.close()
+
+        self.rebuilt_at = time.time()
+        logging.info(f"Rebuilt the watched store from {len(torrents)} tagged torrents ({len(rows)} files) in {self.rebuilt_at - start:.2f}s")
+        return {"torrents": len(torrents), "files": len(rows), "removed": removed, "duration": self.rebuilt_at - start}
+
+    def history(self, offset: int = 0, limit: int = 50, source: Optional[str] = None) -> tuple[list, int]:
+        '''
+        Records, most recently tagged first, and their total count
+        '''
+        condition, params = ('WHERE source = ?', [source]) if source else ('', [])
+        connection = self._connect()
+        try:
+            total = connection.execute(f'SELECT COUNT(*) FROM watched {condition}', params).fetchone()[0]
+            rows = connection.execute(
+                f'SELECT * FROM watched {condition} ORDER BY tagged_at DESC, hash LIMIT ? OFFSET ?', params + [limit, offset]
+            ).fetchall()
+        finally:
+            connection.close()
+        return [dict(row) for row in rows], total
+
+    def stats(self) -> dict:
+        connection = self._connect()
+        try:
+            files, torrents, last = connection.execute(
+                'SELECT COUNT(DISTINCT dev || ":" || inode), COUNT(DISTINCT hash), MAX(tagged_at) FROM watched'
+            ).fetchone()
+            sources = dict(connection.execute('SELECT source, COUNT(*) FROM watched GROUP BY source').fetchall())
+        finally:
+            connection.close()
+        return {
+            "path": self.path,
+            "files": files,
+            "torrents": torrents,
+            "sources": sources,
+            "last_tagged_at": last,
+            "hits": self.hits,
+            "stale": self.stale,
+            "rebuilt_at": self.rebuilt_at,
+        }
+
+
+watched_store = WatchedStore()
@@ -5,12 +5,14 @@ from jellyfin_webhooks.utils.constants import constants as c
 
 from jellyfin_webhooks import api as api_routes
 from jellyfin_webhooks import webhook as webhook_routes
+from jellyfin_webhooks.components.warmup import warmup
+from jellyfin_webhooks.utils.log_compactor import log_compactor
 
 # Configure Logging
 import logging
 from logging.handlers import RotatingFileHandler
 
-def create_app():
+def create_app(start_warmup: bool = c.WARMUP_ENABLED, start_compactor: bool = c.REQUESTS_LOG_COMPACT_INTERVAL > 0):
     # Define possible paths for the frontend build
     # 1. Docker Production (Separate folder to avoid volume mount overwrite)
     # 2. Local Development (Relative to this file)
@@ -60,6 +62,22 @@ def create_app():
     app.register_blueprint(api_routes.webhooks.route)
     app.register_blueprint(api_routes.torrents.route)
     app.register_blueprint(api_routes.requests.route)
+    app.register_blueprint(api_routes.reconcile.route)
+    app.register_blueprint(api_routes.run.route)
+    app.register_blueprint(api_routes.cache.route)
+    app.register_blueprint(api_routes.events.route)
+    app.register_blueprint(api_routes.health.route)
+    app.register_blueprint(api_routes.watched.route)
+    app.register_blueprint(api_routes.libraries.route)
+    app.register_blueprint(api_routes.links.route)
+
+    # Cold work (imports, qBittorrent login, indexes) happens in the background, see `/healthz/ready`
+    if start_warmup:
+        warmup.start()
+
+    # Compresses rotated request logs and applies their retention, see `/api/requests/storage`
+    if start_compactor:
+        log_compactor.start()
 
     # --- SERVE REACT FRONTEND ---
     
@@ -0,0 +1,205 @@
+import time
+import asyncio
+import collections
+from typing import TYPE_CHECKING, Awaitable, Callable, Optional, Union
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.qbittorrent import QBittorrentBusy, _summary
+from jellyfin_webhooks.utils.torrent_list import TorrentSummary, TorrentListParser, info_params
+
+# Optional dependency, only needed by the ASGI mode
+if TYPE_CHECKING:
+    import httpx
+
+
+class Torrent(dict):
+    '''
+    A torrent of `/api/v2/torrents/info`, with attribute access like `qbittorrentapi.TorrentDictionary`
+    '''
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+
+def _joined(values: Union[str, list, tuple, None], separator: str) -> Optional[str]:
+    if values is None or isinstance(values, str):
+        return values
+    return separator.join(values)
+
+
+class AsyncQBittorrentCalls:
+    '''
+    `QBittorrentCalls` for the ASGI mode: the qBittorrent Web API over a single pooled `httpx.AsyncClient`,
+    so calls in flight hold a socket, not a thread. Identical read calls in flight at the same time are sent
+    once, and at most `QBT_MAX_CONCURRENCY` calls reach qBittorrent at once (`QBittorrentBusy` after
+    `QBT_QUEUE_TIMEOUT` seconds). Only the calls the webhooks make are implemented.
+    Bound to the event loop it is first used on.
+    '''
+    def __init__(self, max_concurrency: int = c.QBT_MAX_CONCURRENCY, samples: int = 1000):
+        self.max_concurrency = max_concurrency
+        self._client: Optional['httpx.AsyncClient'] = None
+        self._client_key = None
+        # Created on the running loop
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._login_lock: Optional[asyncio.Lock] = None
+        self._flights: dict[tuple, asyncio.Future] = {}
+        self.calls: 'collections.Counter[str]' = collections.Counter()
+        self.upstream: 'collections.Counter[str]' = collections.Counter()
+        self.coalesced: 'collections.Counter[str]' = collections.Counter()
+        self.errors: 'collections.Counter[str]' = collections.Counter()
+        self.logins = 0
+        self.busy = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self._wait_ms = collections.deque(maxlen=samples)
+        self._upstream_ms = collections.deque(maxlen=samples)
+
+    async def _log_in(self, client: 'httpx.AsyncClient'):
+        # The SID cookie is kept by the client for the next calls
+        response = await client.post('auth/login', data={"username": c.QBT_USER, "password": c.QBT_PASS})
+        response.raise_for_status()
+        if response.text.strip() != 'Ok.':
+            raise PermissionError(f'qBittorrent login failed for {c.QBT_USER}')
+        self.logins += 1
+
+    async def client(self) -> 'httpx.AsyncClient':
+        '''
+        Returns the logged-in client. It only logs in again when the connection settings change
+        '''
+        key = (c.QBT_HOST, c.QBT_USER, c.QBT_PASS)
+        if self._client is not None and self._client_key == key:
+            return self._client
+        if self._login_lock is None:
+            self._login_lock = asyncio.Lock()
+        async with self._login_lock:
+            if self._client is not None and self._client_key == key:
+                return self._client
+
+            import httpx
+
+            client = httpx.AsyncClient(
+                base_url=f"{c.QBT_HOST.rstrip('/')}/api/v2/",
+                timeout=httpx.Timeout(c.QBT_TIMEOUT, connect=c.QBT_CONNECT_TIMEOUT),
+                limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            )
+            try:
+                await self._log_in(client)
+            except BaseException:
+                await client.aclose()
+                raise
+            previous, self._client, self._client_key = self._client, client, key
+        if previous is not None:
+            await previous.aclose()
+        return client
+
+    async def _request(self, method: str, endpoint: str, **kwargs) -> 'httpx.Response':
+        client = await self.client()
+        response = await client.request(method, endpoint, **kwargs)
+        if response.status_code == 403:
+            # Session expired (qBittorrent restarted, or its WebUI session timeout)
+            await self._log_in(client)
+            response = await client.request(method, endpoint, **kwargs)
+        response.raise_for_status()
+        return response
+
+    async def _upstream_call(self, name: str, function: Callable[..., Awaitable], *args, **kwargs):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=c.QBT_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.busy += 1
+            raise QBittorrentBusy(f'No qBittorrent slot available after {c.QBT_QUEUE_TIMEOUT}s ({name})') from None
+        finally:
+            self.waiting -= 1
+            self._wait_ms.append((time.perf_counter() - start) * 1000)
+
+        self.in_flight += 1
+        self.upstream[name] += 1
+        start = time.perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        except Exception:
+            self.errors[name] += 1
+            raise
+        finally:
+            self._semaphore.release()
+            self.in_flight -= 1
+            self._upstream_ms.append((time.perf_counter() - start) * 1000)
+
+    async def _read(self, name: str, function: Callable[[dict], Awaitable], params: dict):
+        self.calls[name] += 1
+        key = (name, repr(sorted(params.items())))
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = self._flights[key] = asyncio.ensure_future(self._upstream_call(name, function, params))
+            flight.add_done_callback(lambda _: self._flights.pop(key, None))
+        else:
+            self.coalesced[name] += 1
+        # A cancelled caller doesn't cancel the call the others are waiting on
+        return await asyncio.shield(flight)
+
+    async def torrents_info(self, **kwargs) -> list[Torrent]:
+        '''
+        Same arguments as `qbittorrentapi.Client.torrents_info` (`torrent_hashes`, `tag`, `category`, `status_filter`...)
+        '''
+        return await self._read('torrents_info', self._torrents_info, info_params(kwargs))
+
+    async def _torrents_info(self, params: dict) -> list[Torrent]:
+        response = await self._request('GET', 'torrents/info', params=params)
+        return [Torrent(torrent) for torrent in response.json()]
+
+    async def torrents_summary(self, **kwargs) -> list[TorrentSummary]:
+        '''
+        `qbittorrent.torrents_summary`: the torrent list decoded as it streams in, reduced to tuples
+        '''
+        return await self._read('torrents_summary', self._torrents_summary, info_params(kwargs))
+
+    async def _torrents_summary(self, params: dict) -> list[TorrentSummary]:
+        client = await self.client()
+        for attempt in range(2):
+            async with client.stream('GET', 'torrents/info', params=params) as response:
+                if response.status_code == 403 and not attempt:
+                    await self._log_in(client)
+                    continue
+                response.raise_for_status()
+                parser = TorrentListParser()
+                torrents = []
+                async for chunk in response.aiter_bytes(c.QBT_STREAM_CHUNK_SIZE):
+                    torrents.extend(parser.feed(chunk))
+                torrents.extend(parser.close())
+                return torrents
+
+    async def torrents_add_tags(self, tags: Union[str, list], torrent_hashes: Union[str, list]):
+        self.calls['torrents_add_tags'] += 1
+        data = {"hashes": _joined(torrent_hashes, '|'), "tags": _joined(tags, ',')}
+        await self._upstream_call('torrents_add_tags', self._request, 'POST', 'torrents/addTags', data=data)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = self._client_key = None
+
+    def stats(self) -> dict:
+        return {
+            "connected": self._client is not None,
+            "logins": self.logins,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": sum(self.calls.values()),
+            "upstream_calls": sum(self.upstream.values()),
+            "coalesced": sum(self.coalesced.values()),
+            "errors": sum(self.errors.values()),
+            "busy_rejections": self.busy,
+            "wait_ms": _summary(self._wait_ms),
+            "upstream_ms": _summary(self._upstream_ms),
+            "coalescing_in_flight": len(self._flights),
+        }
+
+
+async_qbt_calls = AsyncQBittorrentCalls()
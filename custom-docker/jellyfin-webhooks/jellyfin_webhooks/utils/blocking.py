@@ -0,0 +1,49 @@
+import asyncio
+import functools
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from jellyfin_webhooks.utils.constants import constants as c
+
+_executors: dict[str, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(name: str = 'fs') -> ThreadPoolExecutor:
+    '''
+    Bounded thread pools of the ASGI mode: `fs` runs the filesystem and SQLite work of the async views
+    (`ASYNC_FS_WORKERS` threads), `wsgi` the Flask views served through the WSGI fallback (`ASYNC_WSGI_WORKERS`).
+    Separate pools, so slow dashboard calls can't take the threads the webhooks need
+    '''
+    with _executors_lock:
+        if name not in _executors:
+            workers = c.ASYNC_FS_WORKERS if name == 'fs' else c.ASYNC_WSGI_WORKERS
+            _executors[name] = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'async-{name}')
+        return _executors[name]
+
+
+async def run_blocking(function: Callable, *args, executor: str = 'fs', **kwargs) -> Any:
+    '''
+    Awaits `function(*args, **kwargs)` run on a bounded pool. The caller's context (Flask app and request)
+    is carried over, so `current_app` and `request` keep working in `function`
+    '''
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, function, *args, **kwargs)
+    return await asyncio.get_running_loop().run_in_executor(get_executor(executor), call)
+
+
+def shutdown():
+    with _executors_lock:
+        for pool in _executors.values():
+            pool.shutdown(wait=False)
+        _executors.clear()
+
+
+def stats() -> dict:
+    with _executors_lock:
+        return {
+            name: {"workers": pool._max_workers, "queued": pool._work_queue.qsize()}
+            for name, pool in _executors.items()
+        }
@@ -0,0 +1,204 @@
+import time
+import asyncio
+import threading
+import collections
+from typing import Any, Callable, Hashable, Optional
+
+
+class TTLCache:
+    '''
+    Thread-safe mapping whose entries expire `ttl` seconds after being set.
+    Holds at most `maxsize` entries, evicting the oldest first.
+    '''
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: 'collections.OrderedDict[Hashable, tuple[float, Any]]' = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._data.pop(key, None)
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[1]
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._data)
+            self._data.clear()
+        return count
+
+    def items(self) -> list:
+        '''
+        Returns the live entries as (key, value, seconds left) tuples
+        '''
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value, round(expires - now, 3)) for key, (expires, value) in self._data.items() if expires >= now]
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    '''
+    Runs at most one call per key at a time: callers arriving while a call for the same key
+    is in flight wait for it and share its result (or exception)
+    '''
+    def __init__(self):
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> tuple[Any, bool]:
+        '''
+        Returns `(result, shared)`, `shared` being True when the result came from another caller's call
+        '''
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                leader = False
+            else:
+                call = self._calls[key] = _Call()
+                leader = True
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+        return call.result, False
+
+    def in_flight(self) -> list:
+        with self._lock:
+            return [{"key": key, "waiters": call.waiters} for key, call in self._calls.items()]
+
+
+class Deduplicator:
+    '''
+    Suppresses repeated work for the same key: results are kept for `ttl` seconds, and concurrent
+    duplicates wait on the first computation instead of running their own
+    '''
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.results = TTLCache(ttl, maxsize)
+        self.flights = SingleFlight()
+        self._tasks: dict[Hashable, asyncio.Future] = {}
+        self.computed = 0
+        self.suppressed_cached = 0
+        self.suppressed_in_flight = 0
+        self._lock = threading.Lock()
+
+    def run(self, key: Hashable, fn: Callable, *args, should_cache: Callable[[Any], bool] = lambda result: True, **kwargs) -> tuple[Any, Optional[str]]:
+        '''
+        Returns `(result, deduplicated)`, `deduplicated` being None when the result was computed
+        for this call, otherwise 'cached' or 'in_flight'
+        '''
+        cached = self.results.get(key)
+        if cached is not None:
+            with self._lock:
+                self.suppressed_cached += 1
+            return cached, 'cached'
+
+        def compute():
+            result = fn(*args, **kwargs)
+            if should_cache(result):
+                self.results.set(key, result)
+            return result
+
+        result, shared = self.flights.do(key, compute)
+        with self._lock:
+            if shared:
+                self.suppressed_in_flight += 1
+            else:
+                self.computed += 1
+        return result, 'in_flight' if shared else None
+
+    async def run_async(self, key: Hashable, fn: Callable, *args, should_cache: Callable[[Any], bool] = lambda result: True, **kwargs) -> tuple[Any, Optional[str]]:
+        '''
+        `run` for coroutine functions (ASGI mode). Duplicates in flight await the first call's task
+        instead of blocking a thread. Results are shared with `run`
+        '''
+        cached = self.results.get(key)
+        if cached is not None:
+            with self._lock:
+                self.suppressed_cached += 1
+            return cached, 'cached'
+
+        task = self._tasks.get(key)
+        shared = task is not None
+        if not shared:
+            async def compute():
+                result = await fn(*args, **kwargs)
+                if should_cache(result):
+                    self.results.set(key, result)
+                return result
+
+            task = self._tasks[key] = asyncio.ensure_future(compute())
+            task.add_done_callback(lambda _: self._tasks.pop(key, None))
+
+        result = await asyncio.shield(task)
+        with self._lock:
+            if shared:
+                self.suppressed_in_flight += 1
+            else:
+                self.computed += 1
+        return result, 'in_flight' if shared else None
+
+    def clear(self) -> int:
+        return self.results.clear()
+
+    def stats(self) -> dict:
+        return {
+            "computed": self.computed,
+            "suppressed": self.suppressed_cached + self.suppressed_in_flight,
+            "suppressed_cached": self.suppressed_cached,
+            "suppressed_in_flight": self.suppressed_in_flight,
+            "in_flight": len(self.flights.in_flight()) + len(self._tasks),
+            "cache": self.results.stats(),
+        }
@@ -6,15 +6,68 @@ class Constants:
     QBT_HOST = os.getenv('QBT_HOST', 'http://gluetun:8080')
     QBT_USER = os.getenv('QBT_USER', 'admin')
     QBT_PASS = os.getenv('QBT_PASS', 'adminadmin')
+    QBT_MAX_CONCURRENCY = int(os.getenv('QBT_MAX_CONCURRENCY', 4)) # Upstream calls in flight at once
+    QBT_CONNECT_TIMEOUT = float(os.getenv('QBT_CONNECT_TIMEOUT', 5))
+    QBT_TIMEOUT = float(os.getenv('QBT_TIMEOUT', 30)) # Read timeout of every upstream call
+    QBT_QUEUE_TIMEOUT = float(os.getenv('QBT_QUEUE_TIMEOUT', 30)) # Seconds a call waits for a free slot
+    QBT_STREAM_CHUNK_SIZE = int(os.getenv('QBT_STREAM_CHUNK_SIZE', 64 * 1024)) # Bytes decoded at a time from streamed torrent lists
     PORT = int(os.getenv('PORT', 5000))
+    ASYNC_FS_WORKERS = int(os.getenv('ASYNC_FS_WORKERS', 8)) # ASGI mode: threads for the filesystem work of async views
+    ASYNC_WSGI_WORKERS = int(os.getenv('ASYNC_WSGI_WORKERS', 16)) # ASGI mode: threads serving the Flask (non-async) views
     LOG_FILE = os.getenv('JELYFIN_WEBHOOKS_LOG_FILE', "/app/data/app.log")
     MAX_LOG_SIZE = int(os.getenv('MAX_LOG_SIZE', 10 * 1024 * 1024)) # 10MB default
     LOG_LEVEL = 0
     SETTINGS_FILE = os.getenv('JELYFIN_WEBHOOKS_SETTINGS_FILE', "/app/data/settings.json")
     DEBUG_ENVIRONMENT = os.getenv('JELLYFIN_WEBHOOK_DEBUG_MODE', 'false').lower() == 'true'
+    WARMUP_ENABLED = os.getenv('JELYFIN_WEBHOOKS_WARMUP', 'true').lower() == 'true' # Pre-build sessions and indexes after startup
     BASE_URL = os.getenv('JELLYFIN_WEBHOOK_BASE_URL', '').rstrip('/')
-    NON_VIDEO_FILE_FORMATS = ['jpg', 'metathumb', 'nfo', 'jpg', 'xml'] 
+    NON_VIDEO_FILE_FORMATS = frozenset({'jpg', 'metathumb', 'nfo', 'xml'})
     TORRENTS_DATA_ROOT = os.getenv('TORRENTS_DATA_ROOT')
+    MEDIA_DATA_ROOT = os.getenv('MEDIA_DATA_ROOT', '/data/media').rstrip('/')
+    # Comma separated lists, for libraries spread over several disks (see `torrent_roots`, `series_roots`, `movie_roots`)
+    TORRENTS_DATA_ROOTS = [r.strip().rstrip('/') for r in os.getenv('TORRENTS_DATA_ROOTS', '').split(',') if r.strip()]
+    SERIES_ROOTS = [r.strip().rstrip('/') for r in os.getenv('SERIES_ROOTS', '').split(',') if r.strip()]
+    MOVIE_ROOTS = [r.strip().rstrip('/') for r in os.getenv('MOVIE_ROOTS', '').split(',') if r.strip()]
+    ROOT_SCAN_WORKERS = int(os.getenv('ROOT_SCAN_WORKERS', 4)) # Roots scanned concurrently
+    REQUESTS_LOG_DIR = os.getenv('JELYFIN_WEBHOOKS_REQUESTS_DIR', "/app/data/requests")
+    REQUESTS_INDEX_FILE = os.getenv('JELYFIN_WEBHOOKS_REQUESTS_INDEX_FILE', "/app/data/requests_index.sqlite3")
+    REQUESTS_INDEX_ENABLED = os.getenv('REQUESTS_INDEX_ENABLED', 'true').lower() == 'true' # Index request logs for `/api/requests/search`
+    REQUESTS_INDEX_FLUSH_TIMEOUT = float(os.getenv('REQUESTS_INDEX_FLUSH_TIMEOUT', 0.5)) # Seconds a search waits for the entries still queued for indexing
+    REQUESTS_LOG_COMPRESSION = os.getenv('REQUESTS_LOG_COMPRESSION', 'gzip').lower() # gzip, zstd (needs `zstandard`) or none
+    REQUESTS_LOG_COMPACT_INTERVAL = int(os.getenv('REQUESTS_LOG_COMPACT_INTERVAL', 600)) # Seconds between compactions, 0 disables them
+    REQUESTS_LOG_MAX_AGE_DAYS = float(os.getenv('REQUESTS_LOG_MAX_AGE_DAYS', 90)) # Rotated segments older than this are deleted, 0 keeps them
+    REQUESTS_LOG_MAX_MB = float(os.getenv('REQUESTS_LOG_MAX_MB', 256)) # Per category, oldest segments are deleted first, 0 means no limit
+    REQUESTS_LOG_RETENTION = json.loads(os.getenv('REQUESTS_LOG_RETENTION', '{}')) # Per category overrides, e.g. {"api": {"max_age_days": 7, "max_mb": 32}}
+    WATCHED_STORE_FILE = os.getenv('JELYFIN_WEBHOOKS_WATCHED_STORE_FILE', "/app/data/watched.sqlite3")
+    WATCHED_STORE_ENABLED = os.getenv('WATCHED_STORE_ENABLED', 'true').lower() == 'true' # Skip events of items already tagged
+    LINK_REPORT_DIR = os.getenv('JELYFIN_WEBHOOKS_LINK_REPORT_DIR', "/app/data/link_reports")
+    LINK_REPORT_KEEP = int(os.getenv('LINK_REPORT_KEEP', 5)) # Finished hardlink reports kept on disk
+    RECONCILE_WORKERS = int(os.getenv('RECONCILE_WORKERS', 8))
+    RECONCILE_TAG_BATCH = int(os.getenv('RECONCILE_TAG_BATCH', 100))
+    RUN_STATE_FILE = os.getenv('JELYFIN_WEBHOOKS_RUN_STATE_FILE', "/app/data/run_state.json")
+    RUN_CONCURRENCY = int(os.getenv('RUN_CONCURRENCY', 4))
+    RUN_MISSING_MAX_ATTEMPTS = int(os.getenv('RUN_MISSING_MAX_ATTEMPTS', 10)) # Runs retrying a torrent missing on disk before giving up on it
+    PLAYBACK_DEDUP_TTL = int(os.getenv('PLAYBACK_DEDUP_TTL', 300)) # Seconds a handled PlaybackStop suppresses its duplicates
+    PLAYBACK_DEDUP_MAXSIZE = int(os.getenv('PLAYBACK_DEDUP_MAXSIZE', 1024))
+    TORRENT_INDEX_REBUILD_INTERVAL = int(os.getenv('TORRENT_INDEX_REBUILD_INTERVAL', 10)) # Seconds between rebuilds triggered by lookup misses
+    MOVIE_INDEX_REFRESH_INTERVAL = int(os.getenv('MOVIE_INDEX_REFRESH_INTERVAL', 10)) # Seconds between refreshes triggered by lookup misses
+    WALKER_WORKERS = int(os.getenv('WALKER_WORKERS', 8)) # Directories read concurrently by filesystem scans
+    NEGATIVE_CACHE_TTL = int(os.getenv('NEGATIVE_CACHE_TTL', 3600))
+    NEGATIVE_CACHE_MAXSIZE = int(os.getenv('NEGATIVE_CACHE_MAXSIZE', 4096))
+    NEGATIVE_CACHE_SIGNATURE_DEPTH = int(os.getenv('NEGATIVE_CACHE_SIGNATURE_DEPTH', 2)) # Torrent tree levels watched for changes
+    NEGATIVE_CACHE_SIGNATURE_INTERVAL = float(os.getenv('NEGATIVE_CACHE_SIGNATURE_INTERVAL', 5))
+    STREMIO_SINKS = [s.strip() for s in os.getenv('STREMIO_SINKS', 'archive,counters').split(',') if s.strip()] # archive, forward, counters
+    STREMIO_ARCHIVE_DIR = os.getenv('JELYFIN_WEBHOOKS_STREMIO_ARCHIVE_DIR', "/app/data/stremio")
+    STREMIO_ARCHIVE_MAX_MB = float(os.getenv('STREMIO_ARCHIVE_MAX_MB', 16)) # The archive is rotated past this size, rotated archives follow the `stremio` request log retention
+    STREMIO_FORWARD_URL = os.getenv('STREMIO_FORWARD_URL')
+    STREMIO_FORWARD_TIMEOUT = float(os.getenv('STREMIO_FORWARD_TIMEOUT', 5))
+    STREMIO_QUEUE_SIZE = int(os.getenv('STREMIO_QUEUE_SIZE', 1000))
+    STREMIO_WORKERS = int(os.getenv('STREMIO_WORKERS', 2))
+    STREMIO_BATCH_SIZE = int(os.getenv('STREMIO_BATCH_SIZE', 50))
+    STREMIO_BATCH_WAIT = float(os.getenv('STREMIO_BATCH_WAIT', 0.5)) # Seconds a worker waits to fill a batch
+    STREMIO_MAX_RETRIES = int(os.getenv('STREMIO_MAX_RETRIES', 5))
+    STREMIO_BACKOFF_BASE = float(os.getenv('STREMIO_BACKOFF_BASE', 0.5))
+    STREMIO_BACKOFF_MAX = float(os.getenv('STREMIO_BACKOFF_MAX', 30))
 
     # This is your "Source of Truth" in the code
     WEBHOOK_CONFIG = {
@@ -26,6 +79,19 @@ class Constants:
         }
     }
 
+    # Resolved lazily so changes to `TORRENTS_DATA_ROOT` / `MEDIA_DATA_ROOT` are picked up
+    @property
+    def torrent_roots(self) -> list:
+        return self.TORRENTS_DATA_ROOTS or ([self.TORRENTS_DATA_ROOT.rstrip('/')] if self.TORRENTS_DATA_ROOT else [])
+
+    @property
+    def series_roots(self) -> list:
+        return self.SERIES_ROOTS or [f'{self.MEDIA_DATA_ROOT}/series']
+
+    @property
+    def movie_roots(self) -> list:
+        return self.MOVIE_ROOTS or [f'{self.MEDIA_DATA_ROOT}/movies']
+
     @property
     def settings(self):
         if os.path.exists(self.SETTINGS_FILE):
@@ -1,9 +1,11 @@
 
 import functools
+import inspect
 import time
 import json
 from flask import request, g
 from jellyfin_webhooks.utils.request_logger import RequestLogger
+from jellyfin_webhooks.utils.blocking import run_blocking
 
 def log_request(category="default", endpoint=None):
     """
@@ -14,34 +16,27 @@ def log_request(category="default", endpoint=None):
                      If None, it tries to use the decorated function's name.
     """
     def decorator(func):
-        @functools.wraps(func)
-        def wrapper(*args, **kwargs):
-            # Determine endpoint name if not provided
-            endpoint_name = endpoint
-            if not endpoint_name:
-                endpoint_name = func.__name__
-
-            endpoint_name = endpoint_name.format(**kwargs).replace('/', '_')
-
-            # Capture request items
-            start_time = time.time()
-            
-            # Helper to get body safely
-            req_body = {}
-            try:
-                if request.is_json:
-                    req_body = request.get_json(silent=True) or {}
-                else:
-                    req_body = {"text": request.get_data(as_text=True)}
-            except Exception:
-                req_body = {"error": "Could not parse body"}
+        # Async views (ASGI mode) are awaited, and their entry is written off the event loop
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                endpoint_name, start_time, headers, req_body = _capture_request(func, endpoint, kwargs)
+                try:
+                    response = await func(*args, **kwargs)
+                except Exception as e:
+                    duration_ms = int((time.time() - start_time) * 1000)
+                    await run_blocking(_log_entry, category, endpoint_name, start_time, duration_ms, headers, req_body, 500, {"error": str(e)})
+                    raise e
 
-            headers = dict(request.headers)
-            headers.pop('Cookie', None) # Cookie may contain sensitive data
+                duration_ms = int((time.time() - start_time) * 1000)
+                status_code, resp_body = _capture_response(response)
+                await run_blocking(_log_entry, category, endpoint_name, start_time, duration_ms, headers, req_body, status_code, resp_body)
+                return response
+            return async_wrapper
 
-            # Redact sensitive headers if needed (optional, simplistic for now)
-            if 'Authorization' in headers:
-                headers['Authorization'] = 'REDACTED'
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            endpoint_name, start_time, headers, req_body = _capture_request(func, endpoint, kwargs)
 
             # Execute the function
             try:
@@ -54,33 +49,7 @@ def log_request(category="default", endpoint=None):
 
             # Process response
             duration_ms = int((time.time() - start_time) * 1000)
-            
-            status_code = 200
-            resp_body = {}
-
-            # Flask response objects can be complicated.
-            # If it's a tuple (body, status), unpack it.
-            # If it's a Response object, extract data.
-            try:
-                if isinstance(response, tuple):
-                    if len(response) >= 2:
-                        status_code = response[1]
-                        resp_body = _parse_response_body(response[0])
-                    else:
-                        resp_body = _parse_response_body(response[0])
-                # Check if it's a Flask Response object
-                elif hasattr(response, 'status_code'):
-                    status_code = response.status_code
-                    if response.is_json:
-                         resp_body = response.get_json(silent=True)
-                    else:
-                        # Be careful with large bodies, maybe truncate?
-                        resp_body = {"text": response.get_data(as_text=True)}
-                else:
-                    # Just a body returned
-                    resp_body = _parse_response_body(response)
-            except Exception:
-                resp_body = {"error": "Could not parse response"}
+            status_code, resp_body = _capture_response(response)
 
             _log_entry(category, endpoint_name, start_time, duration_ms, headers, req_body, status_code, resp_body)
 
@@ -88,6 +57,67 @@ def log_request(category="default", endpoint=None):
         return wrapper
     return decorator
 
+def _capture_request(func, endpoint, kwargs):
+    # Determine endpoint name if not provided
+    endpoint_name = endpoint
+    if not endpoint_name:
+        endpoint_name = func.__name__
+
+    endpoint_name = endpoint_name.format(**kwargs).replace('/', '_')
+
+    # Capture request items
+    start_time = time.time()
+
+    # Helper to get body safely
+    req_body = {}
+    try:
+        if request.is_json:
+            req_body = request.get_json(silent=True) or {}
+        else:
+            req_body = {"text": request.get_data(as_text=True)}
+    except Exception:
+        req_body = {"error": "Could not parse body"}
+
+    headers = dict(request.headers)
+    headers.pop('Cookie', None) # Cookie may contain sensitive data
+
+    # Redact sensitive headers if needed (optional, simplistic for now)
+    if 'Authorization' in headers:
+        headers['Authorization'] = 'REDACTED'
+    return endpoint_name, start_time, headers, req_body
+
+def _capture_response(response):
+    status_code = 200
+    resp_body = {}
+
+    # Flask response objects can be complicated.
+    # If it's a tuple (body, status), unpack it.
+    # If it's a Response object, extract data.
+    try:
+        if isinstance(response, tuple):
+            if len(response) >= 2:
+                status_code = response[1]
+                resp_body = _parse_response_body(response[0])
+            else:
+                resp_body = _parse_response_body(response[0])
+        # Check if it's a Flask Response object
+        elif hasattr(response, 'status_code'):
+            status_code = response.status_code
+            if response.is_streamed:
+                # Downloads: reading the body here would load it all into memory
+                resp_body = {"streamed": True, "mimetype": response.mimetype}
+            elif response.is_json:
+                 resp_body = response.get_json(silent=True)
+            else:
+                # Be careful with large bodies, maybe truncate?
+                resp_body = {"text": response.get_data(as_text=True)}
+        else:
+            # Just a body returned
+            resp_body = _parse_response_body(response)
+    except Exception:
+        resp_body = {"error": "Could not parse response"}
+    return status_code, resp_body
+
 def _parse_response_body(body):
     if isinstance(body, dict) or isinstance(body, list):
         return body
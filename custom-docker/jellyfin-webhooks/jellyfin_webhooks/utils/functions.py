@@ -1,8 +1,13 @@
-import bs4
 import pathlib
-from typing import Optional, Union, Dict, Any
+from typing import TYPE_CHECKING, Optional, Union, Dict, Any
+
+# bs4 (and lxml behind it) is only imported on first use, it weighs on startup
+if TYPE_CHECKING:
+    import bs4
 
 def markup_language_to_json(xml_filepath: Optional[Union[str, pathlib.Path]] = None, xml_content: Optional[str] = None) -> Dict[str, Any]:
+    import bs4
+
     if xml_filepath is not None:
         with open(xml_filepath, 'r', encoding='utf-8') as f:
             btree = bs4.BeautifulSoup(f, "xml")
@@ -19,7 +24,9 @@ def markup_language_to_json(xml_filepath: Optional[Union[str, pathlib.Path]] = N
         
     return {root.name: _xml_to_json(root)}
 
-def _xml_to_json(tag: Union[bs4.element.Tag, bs4.element.NavigableString]) -> Any:
+def _xml_to_json(tag: Union['bs4.element.Tag', 'bs4.element.NavigableString']) -> Any:
+    import bs4
+
     # 1. Handle Strings (Text Nodes)
     if isinstance(tag, bs4.element.NavigableString):
         text = tag.strip()
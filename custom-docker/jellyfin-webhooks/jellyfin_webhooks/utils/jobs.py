@@ -0,0 +1,139 @@
+import time
+import uuid
+import logging
+import threading
+import collections
+from typing import Callable, Optional
+
+
+class Job:
+    '''
+    A unit of background work with progress reporting.
+    The job's target receives the `Job` and updates `phase`, `total` and `done` as it goes.
+    '''
+    def __init__(self, kind: str, params: Optional[dict] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.params = params or {}
+        self.status = 'pending'
+        self.phase: Optional[str] = None
+        self.total = 0
+        self.done = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result = None
+        self.error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def set_phase(self, phase: str, total: int = 0):
+        with self._lock:
+            self.phase = phase
+            self.total = total
+            self.done = 0
+
+    def advance(self, count: int = 1):
+        with self._lock:
+            self.done += count
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('success', 'error')
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "id": self.id,
+                "kind": self.kind,
+                "params": self.params,
+                "status": self.status,
+                "phase": self.phase,
+                "progress": {
+                    "done": self.done,
+                    "total": self.total,
+                    "percent": round(self.done / self.total * 100, 1) if self.total else None,
+                },
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "duration": (self.finished_at or time.time()) - self.started_at if self.started_at else None,
+                "result": self.result,
+                "error": self.error,
+            }
+
+
+class JobRegistry:
+    _jobs: 'collections.OrderedDict[str, Job]' = collections.OrderedDict()
+    _lock = threading.Lock()
+    max_jobs = 50
+
+    @classmethod
+    def submit(cls, kind: str, target: Callable, *args, params: Optional[dict] = None, **kwargs) -> Job:
+        '''
+        Runs `target(job, *args, **kwargs)` on a background thread. Its return value becomes `job.result`
+        '''
+        job = Job(kind, params)
+        with cls._lock:
+            cls._add(job)
+        cls._start(job, target, args, kwargs)
+        return job
+
+    @classmethod
+    def submit_exclusive(cls, kind: str, target: Callable, *args, params: Optional[dict] = None, **kwargs) -> tuple[Job, bool]:
+        '''
+        `submit`, unless a job of `kind` is still running. Returns the new job and True, or the running job and False.
+        Checked and registered atomically, so concurrent calls never start two jobs
+        '''
+        with cls._lock:
+            running = next((j for j in reversed(cls._jobs.values()) if j.kind == kind and not j.finished), None)
+            if running is not None:
+                return running, False
+            job = Job(kind, params)
+            cls._add(job)
+        cls._start(job, target, args, kwargs)
+        return job, True
+
+    @classmethod
+    def _add(cls, job: Job):
+        # Called with `_lock` held
+        cls._jobs[job.id] = job
+        # Forget the oldest finished jobs
+        while len(cls._jobs) > cls.max_jobs:
+            oldest = next((j for j in cls._jobs.values() if j.finished), None)
+            if oldest is None:
+                break
+            cls._jobs.pop(oldest.id)
+
+    @staticmethod
+    def _start(job: Job, target: Callable, args: tuple, kwargs: dict):
+        kind = job.kind
+
+        def run():
+            job.status = 'running'
+            job.started_at = time.time()
+            try:
+                job.result = target(job, *args, **kwargs)
+                job.status = 'success'
+            except Exception as e:
+                logging.exception(f"Job {kind}/{job.id} failed")
+                job.error = str(e)
+                job.status = 'error'
+            finally:
+                job.finished_at = time.time()
+
+        threading.Thread(target=run, name=f'job-{kind}-{job.id}', daemon=True).start()
+
+    @classmethod
+    def get(cls, job_id: str) -> Optional[Job]:
+        with cls._lock:
+            return cls._jobs.get(job_id)
+
+    @classmethod
+    def list(cls, kind: Optional[str] = None) -> list:
+        with cls._lock:
+            jobs = [j for j in cls._jobs.values() if kind is None or j.kind == kind]
+        return list(reversed(jobs))
+
+    @classmethod
+    def running(cls, kind: str) -> Optional[Job]:
+        return next((j for j in cls.list(kind) if not j.finished), None)
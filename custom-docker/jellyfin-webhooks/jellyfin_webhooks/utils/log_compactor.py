@@ -0,0 +1,251 @@
+import os
+import gzip
+import time
+import shutil
+import logging
+import threading
+from typing import Iterator, Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.walker import scan
+from jellyfin_webhooks.utils.log_segments import SEGMENT_EXTENSIONS, Segment, parse_segment
+from jellyfin_webhooks.utils.request_index import request_index
+
+
+def _zstandard_available() -> bool:
+    try:
+        import zstandard  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class LogCompactor:
+    '''
+    Background maintenance of the request logs written by `RequestLogger`: compresses rotated
+    segments (`<endpoint>.<rotated_at>.jsonl` -> `.jsonl.gz` / `.jsonl.zst`) and enforces the age and
+    size retention of every category, deleting its oldest rotated segments first.
+    The event archives (`archives`, e.g. the Stremio `events.<rotated_at>.jsonl`) are compacted the same way,
+    each as a category of its own. The live `<endpoint>.jsonl` files are never touched.
+    '''
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        interval: Optional[int] = None,
+        compression: Optional[str] = None,
+        archives: Optional[dict] = None,
+    ):
+        self._root = root
+        self._archives = archives
+        self.interval = c.REQUESTS_LOG_COMPACT_INTERVAL if interval is None else interval
+        self.compression = self._resolve_compression(compression or c.REQUESTS_LOG_COMPRESSION)
+        self.runs = 0
+        self.compressed = 0
+        self.deleted = 0
+        self.bytes_saved = 0
+        self.bytes_deleted = 0
+        self.last_run_at: Optional[float] = None
+        self.last_duration: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._run_lock = threading.Lock()
+
+    @property
+    def root(self) -> str:
+        return self._root or c.REQUESTS_LOG_DIR
+
+    @property
+    def archives(self) -> dict:
+        '''
+        Directories of rotated event archives, by category
+        '''
+        return {'stremio': c.STREMIO_ARCHIVE_DIR} if self._archives is None else self._archives
+
+    @staticmethod
+    def _resolve_compression(compression: str) -> str:
+        if compression == 'zstd' and not _zstandard_available():
+            logging.warning("REQUESTS_LOG_COMPRESSION is zstd but `zstandard` is not installed, using gzip")
+            return 'gzip'
+        if compression not in ('gzip', 'zstd', 'none'):
+            logging.warning(f"Unknown REQUESTS_LOG_COMPRESSION {compression}, using gzip")
+            return 'gzip'
+        return compression
+
+    @staticmethod
+    def policy(category: str) -> dict:
+        '''
+        Retention of `category`: the global limits, overridden by `REQUESTS_LOG_RETENTION[category]`
+        '''
+        overrides = c.REQUESTS_LOG_RETENTION.get(category, {})
+        return {
+            "max_age_days": float(overrides.get('max_age_days', c.REQUESTS_LOG_MAX_AGE_DAYS)),
+            "max_mb": float(overrides.get('max_mb', c.REQUESTS_LOG_MAX_MB)),
+        }
+
+    def start(self) -> bool:
+        if self._thread is not None or self.interval <= 0:
+            return False
+        self._thread = threading.Thread(target=self._loop, name='log-compactor', daemon=True)
+        self._thread.start()
+        return True
+
+    def stop(self):
+        self._stopping.set()
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            try:
+                self.run()
+            except Exception as e:
+                logging.error(f"Request log compaction failed: {e}")
+            self._stopping.wait(self.interval)
+
+    def _compress(self, segment: Segment) -> Segment:
+        suffix = '.zst' if self.compression == 'zstd' else '.gz'
+        target = segment.path + suffix
+        # Written aside and moved into place, so readers never see a partial segment
+        temporary = target + '.tmp'
+        with open(segment.path, 'rb') as source:
+            if suffix == '.zst':
+                import zstandard
+                with open(temporary, 'wb') as raw:
+                    with zstandard.ZstdCompressor(level=10).stream_writer(raw) as destination:
+                        shutil.copyfileobj(source, destination)
+            else:
+                with gzip.open(temporary, 'wb', compresslevel=6) as destination:
+                    shutil.copyfileobj(source, destination)
+        shutil.copystat(segment.path, temporary)
+        os.replace(temporary, target)
+        os.remove(segment.path)
+
+        size = os.path.getsize(target)
+        self.compressed += 1
+        self.bytes_saved += segment.size - size
+        return segment._replace(path=target, suffix=suffix, size=size)
+
+    def _delete(self, category: str, segment: Segment, reason: str):
+        os.remove(segment.path)
+        self.deleted += 1
+        self.bytes_deleted += segment.size
+        logging.info(f"Deleted request log segment {segment.path} ({reason})")
+        if c.REQUESTS_INDEX_ENABLED and category not in self.archives:
+            # Segments go oldest first, so everything recorded before the rotation is gone
+            request_index.prune(category, segment.endpoint, before=segment.rotated_at)
+
+    def _entries(self, include: tuple) -> Iterator[tuple[str, os.DirEntry]]:
+        '''
+        Yields `(category, entry)` for the files of the request log categories and of the archives
+        '''
+        for entry in scan(self.root, include=include):
+            category = os.path.relpath(entry.path, self.root).split(os.sep)[0]
+            # Files at the root don't belong to a category
+            if category != entry.name:
+                yield category, entry
+        for category, directory in self.archives.items():
+            for entry in scan(directory, recursive=False, include=include):
+                yield category, entry
+
+    def run(self) -> dict:
+        '''
+        Compacts every category once. Returns per-category counts
+        '''
+        with self._run_lock:
+            start = time.time()
+            summary = {}
+            try:
+                categories: dict[str, list[Segment]] = {}
+                for category, entry in self._entries(include=SEGMENT_EXTENSIONS + ('tmp',)):
+                    if entry.name.endswith(('.jsonl.gz.tmp', '.jsonl.zst.tmp')):
+                        # Left behind by an interrupted compaction
+                        os.remove(entry.path)
+                        continue
+                    segment = parse_segment(entry)
+                    if segment is not None:
+                        categories.setdefault(category, []).append(segment)
+
+                for category, segments in categories.items():
+                    summary[category] = self._compact_category(category, segments, now=start)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                self.runs += 1
+                self.last_run_at = start
+                self.last_duration = time.time() - start
+            return summary
+
+    def _compact_category(self, category: str, segments: list[Segment], now: float) -> dict:
+        policy = self.policy(category)
+        compressed = deleted = 0
+        kept = []
+
+        # Oldest first, so size retention removes the oldest history
+        for segment in sorted(segments, key=lambda s: (s.rotated_at is None, s.rotated_at or 0)):
+            try:
+                if segment.rotated_at is None:
+                    kept.append(segment)
+                    continue
+                if policy['max_age_days'] > 0 and segment.rotated_at < now - policy['max_age_days'] * 86400:
+                    self._delete(category, segment, f"older than {policy['max_age_days']:g} days")
+                    deleted += 1
+                    continue
+                if not segment.suffix and self.compression != 'none':
+                    segment = self._compress(segment)
+                    compressed += 1
+                kept.append(segment)
+            except OSError as e:
+                logging.warning(f"Could not compact request log segment {segment.path}: {e}")
+
+        if policy['max_mb'] > 0:
+            size = sum(segment.size for segment in kept)
+            limit = policy['max_mb'] * 1024 * 1024
+            for segment in kept:
+                if size <= limit:
+                    break
+                if segment.rotated_at is None:
+                    continue
+                try:
+                    self._delete(category, segment, f"{category} exceeds {policy['max_mb']:g} MB")
+                    deleted += 1
+                    size -= segment.size
+                except OSError as e:
+                    logging.warning(f"Could not delete request log segment {segment.path}: {e}")
+
+        return {"compressed": compressed, "deleted": deleted}
+
+    def usage(self) -> dict:
+        '''
+        Bytes and segments on disk, per category
+        '''
+        usage = {}
+        for category, entry in self._entries(include=SEGMENT_EXTENSIONS):
+            segment = parse_segment(entry)
+            if segment is None:
+                continue
+            stats = usage.setdefault(category, {"bytes": 0, "segments": 0, "compressed": 0, "policy": self.policy(category)})
+            stats['bytes'] += segment.size
+            stats['segments'] += 1
+            stats['compressed'] += bool(segment.suffix)
+        return usage
+
+    def stats(self) -> dict:
+        return {
+            "root": self.root,
+            "archives": self.archives,
+            "running": self._thread is not None and not self._stopping.is_set(),
+            "interval": self.interval,
+            "compression": self.compression,
+            "runs": self.runs,
+            "compressed": self.compressed,
+            "deleted": self.deleted,
+            "bytes_saved": self.bytes_saved,
+            "bytes_deleted": self.bytes_deleted,
+            "last_run_at": self.last_run_at,
+            "last_duration": self.last_duration,
+            "last_error": self.last_error,
+        }
+
+
+log_compactor = LogCompactor()
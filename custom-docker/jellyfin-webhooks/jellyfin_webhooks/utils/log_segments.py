@@ -0,0 +1,140 @@
+import io
+import os
+import re
+import gzip
+import json
+import logging
+import functools
+from itertools import islice
+from typing import IO, Iterator, NamedTuple, Optional
+
+from jellyfin_webhooks.utils.walker import scan
+
+# `<endpoint>.jsonl` (live), `<endpoint>.<rotated_at>.jsonl` (rotated), `<endpoint>.<rotated_at>.jsonl.gz|.zst` (compacted)
+SEGMENT_PATTERN = re.compile(r'^(?P<endpoint>.+?)(?:\.(?P<rotated_at>\d+))?\.jsonl(?P<suffix>\.gz|\.zst)?$')
+SEGMENT_EXTENSIONS = ('jsonl', 'gz', 'zst')
+
+
+class Segment(NamedTuple):
+    path: str
+    endpoint: str
+    rotated_at: Optional[int]
+    suffix: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def live(self) -> bool:
+        return self.rotated_at is None and not self.suffix
+
+
+def parse_segment(entry: os.DirEntry) -> Optional[Segment]:
+    match = SEGMENT_PATTERN.match(entry.name)
+    if not match:
+        return None
+    try:
+        stat = entry.stat()
+    except OSError:
+        return None
+    rotated_at = match.group('rotated_at')
+    return Segment(
+        path=entry.path,
+        endpoint=match.group('endpoint'),
+        rotated_at=int(rotated_at) if rotated_at else None,
+        suffix=match.group('suffix') or '',
+        size=stat.st_size,
+        mtime_ns=stat.st_mtime_ns,
+    )
+
+
+def _newest_first(segment: Segment) -> tuple:
+    # The live file is always the newest
+    return (segment.rotated_at is not None, -(segment.rotated_at or 0))
+
+
+def list_segments(directory: str, endpoint: Optional[str] = None) -> list[Segment]:
+    '''
+    Returns the log segments of `directory` (of `endpoint` only, if given), newest first
+    '''
+    segments = {}
+    for entry in scan(directory, recursive=False, include=SEGMENT_EXTENSIONS):
+        segment = parse_segment(entry)
+        if segment is None or (endpoint is not None and segment.endpoint != endpoint):
+            continue
+        # While being compacted, a segment briefly exists both plain and compressed
+        key = (segment.endpoint, segment.rotated_at, segment.live)
+        if key not in segments or segment.suffix:
+            segments[key] = segment
+    return sorted(segments.values(), key=_newest_first)
+
+
+def open_segment(path: str) -> IO[str]:
+    '''
+    Opens a segment for reading as text, decompressing `.gz` / `.zst` segments on the fly
+    '''
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    if path.endswith('.zst'):
+        # Optional dependency, only needed when `REQUESTS_LOG_COMPRESSION` is `zstd`
+        import zstandard
+        return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True), encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def iter_lines(path: str) -> Iterator[str]:
+    with open_segment(path) as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+@functools.lru_cache(maxsize=4096)
+def _count_lines(path: str, size: int, mtime_ns: int) -> int:
+    return sum(1 for _ in iter_lines(path))
+
+
+def count_lines(segment: Segment) -> int:
+    '''
+    Number of entries of a segment. Rotated segments never change, so their count is only computed once
+    '''
+    return _count_lines(segment.path, segment.size, segment.mtime_ns)
+
+
+def _parse(lines) -> list:
+    entries = []
+    for line in lines:
+        try:
+            entries.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return entries
+
+
+def read_entries(segments: list[Segment], start: int, stop: int) -> tuple[list, int]:
+    '''
+    Returns the entries `[start, stop)` of `segments` (newest first, as returned by `list_segments`)
+    and the total number of entries. Only the segments overlapping the range are decoded.
+    '''
+    entries, total = [], 0
+    for segment in segments:
+        try:
+            if segment.live:
+                # Still being appended to, read it once so the count and the slice agree
+                lines = list(iter_lines(segment.path))
+                count = len(lines)
+            else:
+                lines = None
+                count = count_lines(segment)
+
+            # Newest-first positions `[total, total + count)` are lines `[count - hi, count - lo)` of the file
+            lo = max(start, total) - total
+            hi = min(stop, total + count) - total
+            if lo < hi:
+                chunk = lines[count - hi:count - lo] if lines is not None else list(islice(iter_lines(segment.path), count - hi, count - lo))
+                entries.extend(reversed(_parse(chunk)))
+        except (OSError, EOFError, ImportError) as e:
+            # Compacted or removed by retention since it was listed
+            logging.warning(f"Could not read request log segment {segment.path}: {e}")
+            continue
+        total += count
+    return entries, total
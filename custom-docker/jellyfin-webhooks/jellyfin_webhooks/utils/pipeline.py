@@ -0,0 +1,272 @@
+import os
+import abc
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import threading
+import collections
+import urllib.request
+from typing import Optional
+
+
+class Sink(abc.ABC):
+    '''
+    Destination of an `EventPipeline`. `handle` receives a batch of events and raises to have it retried
+    '''
+    name = 'sink'
+
+    @abc.abstractmethod
+    def handle(self, batch: list):
+        ...
+
+    def stats(self) -> dict:
+        return {}
+
+
+class JsonlArchiveSink(Sink):
+    '''
+    Appends events to `<directory>/events.jsonl`. Past `max_bytes` the file is rotated to
+    `events.<rotated_at>.jsonl`, the segment layout of the request logs, so `LogCompactor`
+    compresses the rotated archives and applies their retention
+    '''
+    name = 'archive'
+
+    def __init__(self, directory: str, filename: str = 'events.jsonl', max_bytes: int = 0):
+        self.path = os.path.join(directory, filename)
+        self.max_bytes = max_bytes
+        self.rotations = 0
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        base = self.path[:-len('.jsonl')] if self.path.endswith('.jsonl') else self.path
+        rotated_at = int(time.time())
+        # Two rotations within the same second don't overwrite each other
+        while os.path.exists(f"{base}.{rotated_at}.jsonl"):
+            rotated_at += 1
+        os.rename(self.path, f"{base}.{rotated_at}.jsonl")
+        self.rotations += 1
+        self._size = 0
+
+    def handle(self, batch: list):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lines = ''.join(json.dumps(event) + '\n' for event in batch).encode('utf-8')
+        with self._lock:
+            if self._size is None:
+                self._size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+            if self.max_bytes > 0 and self._size > 0 and self._size + len(lines) > self.max_bytes:
+                self._rotate()
+            with open(self.path, 'ab') as f:
+                f.write(lines)
+            self._size += len(lines)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"path": self.path, "bytes": self._size, "max_bytes": self.max_bytes, "rotations": self.rotations}
+
+
+class HttpForwardSink(Sink):
+    '''
+    POSTs every batch as a JSON list to `url`. Non-2xx responses raise, so the batch is retried
+    '''
+    name = 'forward'
+
+    def __init__(self, url: str, timeout: float = 5):
+        self.url = url
+        self.timeout = timeout
+
+    def handle(self, batch: list):
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(batch).encode('utf-8'),
+            headers={"Content-Type": "application/json"},
+            method='POST',
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    def stats(self) -> dict:
+        return {"url": self.url}
+
+
+class CounterSink(Sink):
+    '''
+    Aggregates events by their `event` field
+    '''
+    name = 'counters'
+
+    def __init__(self, key: str = 'event'):
+        self.key = key
+        self.counts: 'collections.Counter[str]' = collections.Counter()
+        self.last_event_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def handle(self, batch: list):
+        with self._lock:
+            for event in batch:
+                self.counts[str(event.get(self.key))] += 1
+            self.last_event_at = time.time()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"counts": dict(self.counts.most_common()), "last_event_at": self.last_event_at}
+
+
+class EventPipeline:
+    '''
+    Bounded in-memory queue drained by a pool of worker threads, which hand events to every sink
+    in batches (up to `batch_size` events, or whatever arrived within `batch_wait` seconds).
+    A failing sink is retried with exponential backoff, `max_retries` times, before its batch is dropped.
+    `submit` never blocks: when the queue is full the event is dropped and counted.
+    '''
+    def __init__(
+        self,
+        name: str,
+        sinks: list,
+        maxsize: int = 1000,
+        workers: int = 2,
+        batch_size: int = 50,
+        batch_wait: float = 0.5,
+        max_retries: int = 5,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30,
+    ):
+        self.name = name
+        self.sinks = sinks
+        self.maxsize = maxsize
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self._queue: 'queue.Queue[dict]' = queue.Queue(maxsize=maxsize)
+        self._threads: list[threading.Thread] = []
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.dropped = 0
+        self.processed = 0
+        self.batches = 0
+        self.in_flight = 0
+        self.high_water = 0
+        self.started_at: Optional[float] = None
+        self.sink_stats = {
+            sink.name: {"delivered": 0, "failed": 0, "retries": 0, "last_error": None, "last_latency_ms": None}
+            for sink in sinks
+        }
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self.started_at = time.time()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f'{self.name}-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        # Deliver what's still queued when the server stops
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(0, deadline - time.monotonic()))
+
+    def submit(self, event: dict) -> bool:
+        '''
+        Queues `event`. Returns False (and counts a drop) when the queue is full
+        '''
+        if not self._threads:
+            self.start()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        with self._lock:
+            self.accepted += 1
+            self.high_water = max(self.high_water, self._queue.qsize())
+        return True
+
+    def _next_batch(self) -> list:
+        try:
+            batch = [self._queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.batch_wait
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                if self._stopping.is_set():
+                    return
+                continue
+
+            with self._lock:
+                self.in_flight += len(batch)
+            for sink in self.sinks:
+                self._deliver(sink, batch)
+            with self._lock:
+                self.in_flight -= len(batch)
+                self.processed += len(batch)
+                self.batches += 1
+
+    def _deliver(self, sink: Sink, batch: list):
+        stats = self.sink_stats[sink.name]
+        for attempt in range(self.max_retries + 1):
+            start = time.perf_counter()
+            try:
+                sink.handle(batch)
+                with self._lock:
+                    stats['delivered'] += len(batch)
+                    stats['last_latency_ms'] = round((time.perf_counter() - start) * 1000, 3)
+                return
+            except Exception as e:
+                with self._lock:
+                    stats['last_error'] = f'{type(e).__name__}: {e}'
+                if attempt == self.max_retries or self._stopping.is_set():
+                    break
+                with self._lock:
+                    stats['retries'] += 1
+                # Full jitter, so workers retrying the same sink spread out
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                time.sleep(delay)
+
+        logging.error(f"Pipeline {self.name}: dropping {len(batch)} events for sink {sink.name} ({stats['last_error']})")
+        with self._lock:
+            stats['failed'] += len(batch)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "name": self.name,
+                "running": bool(self._threads) and not self._stopping.is_set(),
+                "started_at": self.started_at,
+                "queue": {"size": self._queue.qsize(), "maxsize": self.maxsize, "high_water": self.high_water},
+                "accepted": self.accepted,
+                "dropped": self.dropped,
+                "processed": self.processed,
+                "in_flight": self.in_flight,
+                "batches": self.batches,
+                "workers": self.workers,
+                "batch_size": self.batch_size,
+                "sinks": {
+                    sink.name: dict(self.sink_stats[sink.name], **sink.stats())
+                    for sink in self.sinks
+                },
+            }
@@ -0,0 +1,230 @@
+import time
+import functools
+import threading
+import collections
+from typing import TYPE_CHECKING, Any
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.cache import SingleFlight
+from jellyfin_webhooks.utils.torrent_list import TorrentSummary, TorrentListParser, info_params
+
+# qbittorrentapi (and requests behind it) is only imported on first use, it weighs on startup
+if TYPE_CHECKING:
+    import requests
+    import qbittorrentapi
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+_session = None
+_session_key = None
+_session_lock = threading.Lock()
+
+
+def get_client() -> 'qbittorrentapi.Client':
+    '''
+    Returns a logged-in qBittorrent client.
+    The client (and its HTTP session) is shared, and only logs in again when the connection settings change.
+    Prefer `qbt_calls`, which coalesces and rate limits the calls made through it
+    '''
+    global _client, _client_key
+    key = (c.QBT_HOST, c.QBT_USER, c.QBT_PASS)
+    with _client_lock:
+        if _client is not None and _client_key == key:
+            return _client
+
+        import qbittorrentapi
+
+        qbt_client = qbittorrentapi.Client(
+            host=c.QBT_HOST,
+            username=c.QBT_USER,
+            password=c.QBT_PASS,
+            REQUESTS_ARGS={"timeout": (c.QBT_CONNECT_TIMEOUT, c.QBT_TIMEOUT)},
+        )
+        qbt_client.auth_log_in()
+        _client, _client_key = qbt_client, key
+        return qbt_client
+
+
+def _log_in(session: 'requests.Session'):
+    # The SID cookie is kept by the session for the next calls
+    response = session.post(
+        f"{c.QBT_HOST.rstrip('/')}/api/v2/auth/login", data={"username": c.QBT_USER, "password": c.QBT_PASS},
+        timeout=(c.QBT_CONNECT_TIMEOUT, c.QBT_TIMEOUT),
+    )
+    response.raise_for_status()
+    if response.text.strip() != 'Ok.':
+        raise PermissionError(f'qBittorrent login failed for {c.QBT_USER}')
+
+
+def get_session() -> 'requests.Session':
+    '''
+    Returns a plain HTTP session logged into the qBittorrent Web API, for the calls whose
+    response is streamed instead of decoded whole by `qbittorrentapi`
+    '''
+    global _session, _session_key
+    key = (c.QBT_HOST, c.QBT_USER, c.QBT_PASS)
+    with _session_lock:
+        if _session is not None and _session_key == key:
+            return _session
+
+        import requests
+
+        session = requests.Session()
+        _log_in(session)
+        _session, _session_key = session, key
+        return session
+
+
+def torrents_summary(**kwargs) -> list[TorrentSummary]:
+    '''
+    `torrents_info` for callers that only need the `TorrentSummary` fields: the response is decoded
+    while it streams in and each torrent is reduced to a tuple, so the full list of dictionaries
+    is never held in memory. Same arguments as `qbittorrentapi.Client.torrents_info`
+    '''
+    session = get_session()
+    url = f"{c.QBT_HOST.rstrip('/')}/api/v2/torrents/info"
+    params = info_params(kwargs)
+    timeout = (c.QBT_CONNECT_TIMEOUT, c.QBT_TIMEOUT)
+    response = session.get(url, params=params, stream=True, timeout=timeout)
+    if response.status_code == 403:
+        # Session expired (qBittorrent restarted, or its WebUI session timeout)
+        response.close()
+        _log_in(session)
+        response = session.get(url, params=params, stream=True, timeout=timeout)
+    with response:
+        response.raise_for_status()
+        parser = TorrentListParser()
+        torrents = []
+        for chunk in response.iter_content(chunk_size=c.QBT_STREAM_CHUNK_SIZE):
+            torrents.extend(parser.feed(chunk))
+        torrents.extend(parser.close())
+    return torrents
+
+
+class QBittorrentBusy(TimeoutError):
+    pass
+
+
+def _summary(values) -> dict:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "p50": round(ordered[len(ordered) // 2], 3),
+        "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+class QBittorrentCalls:
+    '''
+    Call layer in front of the shared client (attributes proxy the `qbittorrentapi.Client` methods):
+    identical read calls in flight at the same time are sent once and their result shared by every
+    caller, and at most `QBT_MAX_CONCURRENCY` calls reach qBittorrent at once. Callers wait up to
+    `QBT_QUEUE_TIMEOUT` seconds for a slot before `QBittorrentBusy` is raised.
+    '''
+    # Calls without side effects, safe to share between callers
+    READ_METHODS = frozenset({
+        'app_version', 'app_web_api_version', 'app_build_info', 'app_preferences',
+        'torrents_info', 'torrents_properties', 'torrents_files', 'torrents_trackers',
+        'torrents_categories', 'torrents_tags', 'transfer_info', 'sync_maindata', 'torrents_summary',
+    })
+    # Calls served by this module instead of `qbittorrentapi`
+    LOCAL_METHODS = {'torrents_summary': torrents_summary}
+
+    def __init__(self, max_concurrency: int = c.QBT_MAX_CONCURRENCY, samples: int = 1000):
+        self.max_concurrency = max_concurrency
+        self._semaphore = threading.BoundedSemaphore(max_concurrency)
+        self._flights = SingleFlight()
+        self._lock = threading.Lock()
+        self.calls: 'collections.Counter[str]' = collections.Counter()
+        self.upstream: 'collections.Counter[str]' = collections.Counter()
+        self.coalesced: 'collections.Counter[str]' = collections.Counter()
+        self.errors: 'collections.Counter[str]' = collections.Counter()
+        self.busy = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self._wait_ms = collections.deque(maxlen=samples)
+        self._upstream_ms = collections.deque(maxlen=samples)
+
+    def __getattr__(self, method: str):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return functools.partial(self.call, method)
+
+    def call(self, method: str, *args, **kwargs) -> Any:
+        with self._lock:
+            self.calls[method] += 1
+        if method not in self.READ_METHODS:
+            return self._upstream_call(method, args, kwargs)
+
+        key = (method, repr(args), repr(sorted(kwargs.items())))
+        result, shared = self._flights.do(key, self._upstream_call, method, args, kwargs)
+        if shared:
+            with self._lock:
+                self.coalesced[method] += 1
+        return result
+
+    def torrents_summary(self, **kwargs) -> list[TorrentSummary]:
+        return self.call('torrents_summary', **kwargs)
+
+    def _upstream_call(self, method: str, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+        acquired = self._semaphore.acquire(timeout=c.QBT_QUEUE_TIMEOUT)
+        waited_ms = (time.perf_counter() - start) * 1000
+        with self._lock:
+            self.waiting -= 1
+            self._wait_ms.append(waited_ms)
+            if not acquired:
+                self.busy += 1
+        if not acquired:
+            raise QBittorrentBusy(f'No qBittorrent slot available after {c.QBT_QUEUE_TIMEOUT}s ({method})')
+
+        with self._lock:
+            self.in_flight += 1
+            self.upstream[method] += 1
+        start = time.perf_counter()
+        try:
+            function = self.LOCAL_METHODS.get(method) or getattr(get_client(), method)
+            return function(*args, **kwargs)
+        except Exception:
+            with self._lock:
+                self.errors[method] += 1
+            raise
+        finally:
+            self._semaphore.release()
+            with self._lock:
+                self.in_flight -= 1
+                self._upstream_ms.append((time.perf_counter() - start) * 1000)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "waiting": self.waiting,
+                "calls": sum(self.calls.values()),
+                "upstream_calls": sum(self.upstream.values()),
+                "coalesced": sum(self.coalesced.values()),
+                "errors": sum(self.errors.values()),
+                "busy_rejections": self.busy,
+                "wait_ms": _summary(self._wait_ms),
+                "upstream_ms": _summary(self._upstream_ms),
+                "coalescing_in_flight": len(self._flights.in_flight()),
+                "methods": {
+                    method: {
+                        "calls": self.calls[method],
+                        "upstream": self.upstream[method],
+                        "coalesced": self.coalesced[method],
+                        "errors": self.errors[method],
+                    }
+                    for method in sorted(self.calls)
+                },
+            }
+
+
+qbt_calls = QBittorrentCalls()
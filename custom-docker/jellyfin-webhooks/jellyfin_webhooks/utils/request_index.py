@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import zlib
+import queue
+import logging
+import sqlite3
+import threading
+from typing import Optional
+
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.log_segments import list_segments, iter_lines
+
+# Body fields of the recorded requests that can be searched on (Jellyfin notification fields)
+BODY_FIELDS = {
+    "series_name": 'SeriesName',
+    "name": 'Name',
+    "item_type": 'ItemType',
+    "notification_type": 'NotificationType',
+}
+
+SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS requests (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    timestamp REAL NOT NULL,
+    method TEXT,
+    status INTEGER,
+    duration_ms INTEGER,
+    {', '.join(f'{column} TEXT COLLATE NOCASE' for column in BODY_FIELDS)},
+    entry BLOB NOT NULL,
+    UNIQUE (category, endpoint, timestamp)
+);
+CREATE INDEX IF NOT EXISTS requests_endpoint_timestamp ON requests (category, endpoint, timestamp);
+CREATE INDEX IF NOT EXISTS requests_timestamp ON requests (timestamp);
+CREATE INDEX IF NOT EXISTS requests_status ON requests (status, timestamp);
+CREATE INDEX IF NOT EXISTS requests_series_name ON requests (series_name, timestamp);
+'''
+
+# Full-text search on the names, kept in sync with `requests` by triggers
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS requests_fts USING fts5(series_name, name, content='requests', content_rowid='id');
+CREATE TRIGGER IF NOT EXISTS requests_fts_insert AFTER INSERT ON requests BEGIN
+    INSERT INTO requests_fts (rowid, series_name, name) VALUES (new.id, new.series_name, new.name);
+END;
+CREATE TRIGGER IF NOT EXISTS requests_fts_delete AFTER DELETE ON requests BEGIN
+    INSERT INTO requests_fts (requests_fts, rowid, series_name, name) VALUES ('delete', old.id, old.series_name, old.name);
+END;
+'''
+
+_INSERT = f'''
+INSERT OR IGNORE INTO requests (category, endpoint, timestamp, method, status, duration_ms, {', '.join(BODY_FIELDS)}, entry)
+VALUES ({', '.join('?' * (7 + len(BODY_FIELDS)))})
+'''
+
+# Queued by `flush`, so the writer doesn't wait for its batch to fill
+_FLUSH = object()
+
+
+def _row(category: str, endpoint: str, entry: dict) -> Optional[tuple]:
+    timestamp = entry.get('timestamp')
+    if not isinstance(timestamp, (int, float)):
+        return None
+    body = entry.get('body') if isinstance(entry.get('body'), dict) else {}
+    response = entry.get('response') if isinstance(entry.get('response'), dict) else {}
+    try:
+        status = int(response.get('status'))
+    except (TypeError, ValueError):
+        status = None
+    fields = [body.get(key) if isinstance(body.get(key), str) else None for key in BODY_FIELDS.values()]
+    return (
+        category, endpoint, timestamp, entry.get('method'), status, entry.get('duration_ms'),
+        *fields, zlib.compress(json.dumps(entry).encode('utf-8')),
+    )
+
+
+class RequestIndex:
+    '''
+    SQLite index of the request logs, so they can be searched without reading the JSONL segments.
+    `RequestLogger` hands every entry to `add`, a writer thread inserts them in batches.
+    Entries are unique per (category, endpoint, timestamp), so re-indexing a segment is harmless.
+    '''
+    def __init__(self, path: Optional[str] = None, batch_size: int = 200, batch_wait: float = 1):
+        self._path = path
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.fts: Optional[bool] = None
+        self.indexed = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self.rebuilt_at: Optional[float] = None
+        self._queue: 'queue.Queue' = queue.Queue(maxsize=10000)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+
+    @property
+    def path(self) -> str:
+        return self._path or c.REQUESTS_INDEX_FILE
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.fts is None:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        if self.fts is None:
+            connection.executescript(SCHEMA)
+            try:
+                connection.executescript(FTS_SCHEMA)
+                self.fts = True
+            except sqlite3.OperationalError as e:
+                # SQLite built without FTS5, `q` falls back to LIKE
+                logging.warning(f"Request index without full-text search: {e}")
+                self.fts = False
+        return connection
+
+    def add(self, category: str, endpoint: str, entry: dict):
+        '''
+        Queues `entry` for indexing. Never blocks the request being logged
+        '''
+        row = _row(category, endpoint, entry)
+        if row is None:
+            return
+        self._start()
+        try:
+            self._queue.put_nowait(row)
+        except queue.Full:
+            # Recovered by the next rebuild
+            self.errors += 1
+
+    def _start(self):
+        # Also restarts a writer that died, so queued entries never wait on a thread that's gone
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    logging.error("Request index writer stopped, restarting it")
+                self._thread = threading.Thread(target=self._write, name='request-index', daemon=True)
+                self._thread.start()
+
+    def _next_batch(self) -> tuple[list, int]:
+        '''
+        Waits for the next rows: up to `batch_size`, or whatever arrived within `batch_wait` seconds.
+        A flush marker ends the batch early. Returns the rows and the number of queue items taken
+        '''
+        item = self._queue.get()
+        rows, taken = ([] if item is _FLUSH else [item]), 1
+        deadline = time.monotonic() + self.batch_wait
+        while item is not _FLUSH and len(rows) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            taken += 1
+            if item is not _FLUSH:
+                rows.append(item)
+        return rows, taken
+
+    def _write(self):
+        connection, failures = None, 0
+        while True:
+            if connection is None:
+                try:
+                    connection = self._connect()
+                    failures = 0
+                except Exception as e:
+                    # Entries stay queued (up to the queue size) until the index can be opened again
+                    failures += 1
+                    self.last_error = str(e)
+                    delay = min(60, 2 ** (failures - 1))
+                    logging.error(f"Could not open the request index {self.path}, retrying in {delay}s: {e}")
+                    time.sleep(delay)
+                    continue
+
+            rows, taken = self._next_batch()
+            try:
+                if rows:
+                    with connection:
+                        connection.executemany(_INSERT, rows)
+                    self.indexed += len(rows)
+            except Exception as e:
+                self.errors += len(rows)
+                self.last_error = str(e)
+                logging.error(f"Could not index {len(rows)} request log entries: {e}")
+                # Reopened for the next batch, in case the connection is what broke
+                connection.close()
+                connection = None
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        '''
+        Has the queued entries written right away and waits until they are indexed, up to `timeout` seconds.
+        Returns False when some are still queued
+        '''
+        if self._thread is None:
+            return True
+        self._start()
+        try:
+            self._queue.put_nowait(_FLUSH)
+        except queue.Full:
+            # Full batches are written without waiting anyway
+            pass
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def rebuild(self, clear: bool = False) -> int:
+        '''
+        Indexes every segment of `REQUESTS_LOG_DIR`, compressed or not. Returns the number of entries read
+        '''
+        with self._rebuild_lock:
+            connection = self._connect()
+            try:
+                if clear:
+                    with connection:
+                        connection.execute('DELETE FROM requests')
+                count = 0
+                root = c.REQUESTS_LOG_DIR
+                categories = sorted(os.listdir(root)) if os.path.isdir(root) else []
+                for category in categories:
+                    directory = os.path.join(root, category)
+                    if not os.path.isdir(directory):
+                        continue
+                    for segment in list_segments(directory):
+                        rows = []
+                        try:
+                            for line in iter_lines(segment.path):
+                                try:
+                                    row = _row(category, segment.endpoint, json.loads(line))
+                                except (json.JSONDecodeError, AttributeError):
+                                    continue
+                                if row is not None:
+                                    rows.append(row)
+                        except (OSError, EOFError, ImportError) as e:
+                            logging.warning(f"Could not index request log segment {segment.path}: {e}")
+                            continue
+                        with connection:
+                            connection.executemany(_INSERT, rows)
+                        count += len(rows)
+                self.rebuilt_at = time.time()
+                logging.info(f"Indexed {count} request log entries")
+                return count
+            finally:
+                connection.close()
+
+    def is_empty(self) -> bool:
+        connection = self._connect()
+        try:
+            return connection.execute('SELECT 1 FROM requests LIMIT 1').fetchone() is None
+        finally:
+            connection.close()
+
+    def prune(self, category: str, endpoint: str, before: float):
+        '''
+        Drops the entries of `endpoint` recorded up to `before`, once retention deleted their segment
+        '''
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    'DELETE FROM requests WHERE category = ? AND endpoint = ? AND timestamp <= ?',
+                    (category, endpoint, before)
+                )
+        finally:
+            connection.close()
+
+    def search(
+        self,
+        category: Optional[str] = None,
+        endpoint: Optional[str] = None,
+        statuses: Optional[list] = None,
+        min_status: Optional[int] = None,
+        max_status: Optional[int] = None,
+        min_duration: Optional[int] = None,
+        max_duration: Optional[int] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        fields: Optional[dict] = None,
+        text: Optional[str] = None,
+        offset: int = 0,
+        limit: int = 50,
+    ) -> tuple[list, int]:
+        '''
+        Returns the matching entries (newest first) between `offset` and `offset + limit`, and the number of matches.
+        `fields` filters on `BODY_FIELDS` (case-insensitive equality), `text` searches the names
+        '''
+        where, params = [], []
+        for column, value in (('category', category), ('endpoint', endpoint)):
+            if value:
+                where.append(f'r.{column} = ?')
+                params.append(value)
+        if statuses:
+            where.append(f"r.status IN ({', '.join('?' * len(statuses))})")
+            params.extend(statuses)
+        for clause, value in (
+            ('r.status >= ?', min_status), ('r.status <= ?', max_status),
+            ('r.duration_ms >= ?', min_duration), ('r.duration_ms <= ?', max_duration),
+            ('r.timestamp >= ?', since), ('r.timestamp <= ?', until),
+        ):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        for column, value in (fields or {}).items():
+            if column in BODY_FIELDS and value:
+                where.append(f'r.{column} = ?')
+                params.append(value)
+
+        connection = self._connect()
+        try:
+            source = 'requests r'
+            if text:
+                if self.fts:
+                    source = 'requests_fts JOIN requests r ON r.id = requests_fts.rowid'
+                    where.append('requests_fts MATCH ?')
+                    # Every word as a quoted prefix, so user input can't break the FTS query syntax
+                    params.append(' '.join('"{}"*'.format(word.replace('"', '""')) for word in text.split()))
+                else:
+                    where.append('(r.series_name LIKE ? OR r.name LIKE ?)')
+                    params.extend([f'%{text}%'] * 2)
+            condition = f"WHERE {' AND '.join(where)}" if where else ''
+
+            total = connection.execute(f'SELECT COUNT(*) FROM {source} {condition}', params).fetchone()[0]
+            rows = connection.execute(
+                f'SELECT r.category, r.endpoint, r.entry FROM {source} {condition} ORDER BY r.timestamp DESC LIMIT ? OFFSET ?',
+                params + [limit, offset]
+            ).fetchall()
+        finally:
+            connection.close()
+
+        entries = []
+        for category, endpoint, blob in rows:
+            entry = json.loads(zlib.decompress(blob))
+            entry['category'] = category
+            entry['endpoint'] = endpoint
+            entries.append(entry)
+        return entries, total
+
+    def stats(self) -> dict:
+        connection = self._connect()
+        try:
+            entries = connection.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+        finally:
+            connection.close()
+        return {
+            "path": self.path,
+            "size": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "entries": entries,
+            "full_text": self.fts,
+            "queued": self._queue.qsize(),
+            "writer_running": self._thread is not None and self._thread.is_alive(),
+            "indexed": self.indexed,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "rebuilt_at": self.rebuilt_at,
+        }
+
+
+request_index = RequestIndex()
@@ -5,6 +5,9 @@ import logging
 import time
 from threading import Lock
 
+from jellyfin_webhooks.utils.constants import constants as c
+from jellyfin_webhooks.utils.request_index import request_index
+
 class RequestLogger:
     _locks = {}
     _lock_access = Lock()
@@ -20,11 +23,12 @@ class RequestLogger:
     @staticmethod
     def write_log(category: str, endpoint: str, data: dict):
         """
-        Writes a log entry to /app/data/requests/<category>/<endpoint>.jsonl
+        Writes a log entry to <REQUESTS_LOG_DIR>/<category>/<endpoint>.jsonl
         Rotates file if it exceeds 5000 lines.
+        The entry is also handed to the search index.
         """
         # 1. Determine paths
-        base_dir = f"/app/data/requests/{category}"
+        base_dir = os.path.join(c.REQUESTS_LOG_DIR, category)
         os.makedirs(base_dir, exist_ok=True)
         
         filename = f"{endpoint}.jsonl"
@@ -60,3 +64,7 @@ class RequestLogger:
                     f.write(json.dumps(data) + "\n")
             except Exception as e:
                 logging.error(f"Failed to write request log to {file_path}: {e}")
+                return
+
+        if c.REQUESTS_INDEX_ENABLED:
+            request_index.add(category, endpoint, data)
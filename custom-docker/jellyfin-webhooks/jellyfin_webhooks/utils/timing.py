@@ -0,0 +1,23 @@
+import time
+import contextlib
+
+
+class PhaseTimer:
+    '''
+    Collects wall-clock timings (in milliseconds) for the named phases of a request.
+    Phases entered more than once are accumulated.
+    '''
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.phases[name] = round(self.phases.get(name, 0.0) + elapsed_ms, 3)
+
+    def to_dict(self) -> dict:
+        return dict(self.phases)
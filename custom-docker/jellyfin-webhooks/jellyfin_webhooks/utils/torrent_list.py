@@ -0,0 +1,113 @@
+import re
+import json
+import codecs
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+
+class TorrentSummary(NamedTuple):
+    '''
+    The fields of a `/api/v2/torrents/info` torrent the webhooks and the dashboard use.
+    Attribute access like `qbittorrentapi.TorrentDictionary`, at a fraction of its size
+    '''
+    hash: str
+    name: str
+    size: int
+    state: str
+    progress: float
+    content_path: str
+    tags: str
+
+    @classmethod
+    def from_dict(cls, torrent: dict) -> 'TorrentSummary':
+        return cls(
+            torrent.get('hash', ''), torrent.get('name', ''), torrent.get('size', 0), torrent.get('state', ''),
+            torrent.get('progress', 0), torrent.get('content_path', ''), torrent.get('tags', ''),
+        )
+
+
+# qbittorrentapi argument names -> Web API parameters
+PARAMETERS = {'torrent_hashes': 'hashes', 'status_filter': 'filter'}
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+def info_params(kwargs: dict) -> dict:
+    '''
+    `torrents/info` query parameters of `qbittorrentapi.Client.torrents_info` arguments
+    (`torrent_hashes`, `tag`, `category`, `status_filter`...)
+    '''
+    params = {PARAMETERS.get(k, k): v for k, v in kwargs.items() if v is not None}
+    if params.get('hashes') is not None and not isinstance(params['hashes'], str):
+        params['hashes'] = '|'.join(params['hashes'])
+    return params
+
+
+class TorrentListParser:
+    '''
+    Incremental decoder of a `torrents/info` response: bytes are fed as they arrive, and each torrent
+    is turned into a `TorrentSummary` as soon as its object is complete. Only one torrent's dict and
+    the unparsed tail of the response are held at a time, never the whole document
+    '''
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        # 'start': before '[', 'first': after '[', 'value': after ',', 'separator': after a torrent, 'end': after ']'
+        self._state = 'start'
+        self.count = 0
+
+    def feed(self, data: bytes) -> list[TorrentSummary]:
+        self._buffer += self._text.decode(data)
+        return self._parse()
+
+    def close(self) -> list[TorrentSummary]:
+        self._buffer += self._text.decode(b'', final=True)
+        torrents = self._parse()
+        if self._state != 'end':
+            raise ValueError(f'Truncated torrent list after {self.count} torrents')
+        return torrents
+
+    def _parse(self) -> list[TorrentSummary]:
+        torrents = []
+        buffer, position = self._buffer, 0
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position == len(buffer):
+                break
+            char = buffer[position]
+            if self._state == 'start':
+                if char != '[':
+                    raise ValueError(f'Expected a torrent list, got {char!r}')
+                self._state, position = 'first', position + 1
+            elif self._state == 'separator' or (self._state == 'first' and char == ']'):
+                if char == ']':
+                    self._state, position = 'end', position + 1
+                elif char == ',' and self._state == 'separator':
+                    self._state, position = 'value', position + 1
+                else:
+                    raise ValueError(f'Unexpected {char!r} after {self.count} torrents')
+            elif self._state in ('first', 'value'):
+                if char != '{':
+                    raise ValueError(f'Expected a torrent object, got {char!r}')
+                try:
+                    torrent, position = self._decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    # The object continues in the next chunk
+                    break
+                torrents.append(TorrentSummary.from_dict(torrent))
+                self.count += 1
+                self._state = 'separator'
+            else:
+                raise ValueError(f'Unexpected data after the torrent list: {char!r}')
+        self._buffer = buffer[position:]
+        return torrents
+
+
+def iter_torrents(chunks: Iterable[bytes], parser: Optional[TorrentListParser] = None) -> Iterator[TorrentSummary]:
+    '''
+    Yields the torrents of a `torrents/info` response read as `chunks`
+    '''
+    parser = parser or TorrentListParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
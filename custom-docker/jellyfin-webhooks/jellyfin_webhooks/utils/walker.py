@@ -0,0 +1,172 @@
+import os
+import queue
+import pathlib
+import logging
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from jellyfin_webhooks.utils.constants import constants as c
+
+# `include` / `exclude` filters: file extensions (with or without the dot) or a predicate on the entry
+EntryFilter = Union[Iterable[str], Callable[[os.DirEntry], bool], None]
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Shared by every scan, so the number of concurrent directory reads stays bounded process-wide
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=c.WALKER_WORKERS, thread_name_prefix='walker')
+        return _executor
+
+
+def extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower().lstrip('.')
+
+
+@functools.lru_cache(maxsize=None)
+def _normalized_extensions(formats: frozenset) -> frozenset:
+    return frozenset(f.lower().replace('.', '') for f in formats)
+
+
+def extensions(formats: Iterable[str]) -> frozenset:
+    '''
+    Normalizes file formats (`.NFO` -> `nfo`). Equal sets of formats share the same frozenset
+    '''
+    return _normalized_extensions(frozenset(formats))
+
+
+def _as_predicate(entry_filter: EntryFilter) -> Optional[Callable[[os.DirEntry], bool]]:
+    if entry_filter is None or callable(entry_filter):
+        return entry_filter
+    allowed = extensions(entry_filter)
+    return lambda entry: extension(entry.name) in allowed
+
+
+def _scan_dir(path: str, follow_symlinks: bool) -> tuple[list, list]:
+    files, dirs = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                except OSError:
+                    continue
+                (dirs if is_dir else files).append(entry)
+    except OSError as e:
+        logging.debug(f"Could not scan {path}: {e}")
+    return files, dirs
+
+
+def scan(
+    root: Union[str, pathlib.Path],
+    recursive: bool = True,
+    include: EntryFilter = None,
+    exclude: EntryFilter = None,
+    files: bool = True,
+    dirs: bool = False,
+    max_depth: Optional[int] = None,
+    follow_symlinks: bool = False,
+    workers: Optional[int] = None,
+) -> Iterator[os.DirEntry]:
+    '''
+    Yields the `os.DirEntry` objects below `root`, in no particular order.
+    Entries carry their cached type/inode (and stat, once requested), so callers shouldn't stat paths again.
+
+    Subdirectories are read in parallel on a shared, bounded thread pool: on spinning disks and network
+    mounts the per-directory latency dominates, not the CPU work.
+
+    :param recursive: Descend into subdirectories
+    :param include: Only yield files matching (extensions or predicate)
+    :param exclude: Skip files matching (extensions or predicate)
+    :param files: Yield files
+    :param dirs: Yield directories (filters don't apply to them)
+    :param max_depth: Don't descend below this depth (entries directly in `root` have depth 1)
+    :param workers: Set to 1 to scan on the calling thread
+    '''
+    include_fn = _as_predicate(include)
+    exclude_fn = _as_predicate(exclude)
+
+    def selected(file_entries: list, dir_entries: list) -> Iterator[os.DirEntry]:
+        if dirs:
+            yield from dir_entries
+        if files:
+            for entry in file_entries:
+                if include_fn is not None and not include_fn(entry):
+                    continue
+                if exclude_fn is not None and exclude_fn(entry):
+                    continue
+                yield entry
+
+    def descend(depth: int) -> bool:
+        return recursive and (max_depth is None or depth < max_depth)
+
+    root = os.fspath(root)
+    workers = c.WALKER_WORKERS if workers is None else workers
+    if not recursive or workers <= 1:
+        pending = [(root, 0)]
+        while pending:
+            path, depth = pending.pop()
+            file_entries, dir_entries = _scan_dir(path, follow_symlinks)
+            if descend(depth + 1):
+                pending.extend((d.path, depth + 1) for d in dir_entries)
+            yield from selected(file_entries, dir_entries)
+        return
+
+    executor = _get_executor()
+    results: 'queue.Queue' = queue.Queue()
+    cancelled = threading.Event()
+
+    def task(path: str, depth: int):
+        if cancelled.is_set():
+            results.put(([], [], depth))
+            return
+        try:
+            results.put((*_scan_dir(path, follow_symlinks), depth))
+        except BaseException:
+            results.put(([], [], depth))
+            raise
+
+    outstanding = 1
+    executor.submit(task, root, 0)
+    try:
+        while outstanding:
+            file_entries, dir_entries, depth = results.get()
+            outstanding -= 1
+            if descend(depth + 1):
+                for d in dir_entries:
+                    executor.submit(task, d.path, depth + 1)
+                    outstanding += 1
+            yield from selected(file_entries, dir_entries)
+    finally:
+        # The consumer stopped early, let queued directory reads return immediately
+        cancelled.set()
+
+
+def map_roots(function: Callable[[str], object], roots: Iterable[str], workers: Optional[int] = None) -> dict:
+    '''
+    Runs `function(root)` for every root concurrently, each on its own thread, so a slow or unmounted
+    disk only delays its own result. Returns root -> result, or the exception `function` raised
+    '''
+    roots = list(dict.fromkeys(roots))
+    if len(roots) <= 1:
+        pool_size = 1
+    else:
+        pool_size = min(len(roots), workers or c.ROOT_SCAN_WORKERS)
+
+    def run(root: str):
+        try:
+            return function(root)
+        except Exception as e:
+            return e
+
+    if pool_size == 1:
+        return {root: run(root) for root in roots}
+    # Not the shared walker pool: `function` scans, and would wait on that pool from inside it
+    with ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='roots') as pool:
+        return dict(zip(roots, pool.map(run, roots)))
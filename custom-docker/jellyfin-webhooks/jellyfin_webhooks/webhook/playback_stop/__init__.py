@@ -1,107 +1,277 @@
-import qbittorrentapi
+from typing import Optional
 from flask import Blueprint, request, current_app, jsonify
 from jellyfin_webhooks.utils.constants import constants as c
 from jellyfin_webhooks.utils.decorators import log_request
-from jellyfin_webhooks.components.series import Series
-from jellyfin_webhooks.components.movie import Movie
+from jellyfin_webhooks.utils.cache import Deduplicator
+from jellyfin_webhooks.utils.qbittorrent import get_session, qbt_calls
+from jellyfin_webhooks.utils.async_qbittorrent import async_qbt_calls
+from jellyfin_webhooks.utils.blocking import run_blocking
+from jellyfin_webhooks.utils.timing import PhaseTimer
+from jellyfin_webhooks.components.resolver import resolve_torrent_paths, TorrentLookup
+from jellyfin_webhooks.components.torrent_index import torrent_index
+from jellyfin_webhooks.components.movie_index import movie_index
+from jellyfin_webhooks.components.catalog import library_catalog
+from jellyfin_webhooks.components.watched_store import watched_store, file_key
 
 
 route = Blueprint('playback_stop', __name__)
 
+# Jellyfin may send several PlaybackStop notifications for the same viewing (multiple clients, retries)
+deduplicator = Deduplicator(ttl=c.PLAYBACK_DEDUP_TTL, maxsize=c.PLAYBACK_DEDUP_MAXSIZE)
+
 @route.route(f'{c.BASE_URL}/webhook/playback_stop', methods=['POST'])
 @log_request(category="webhook", endpoint="playback_stop")
 def main():
+    response, data, dry_run = parse_event()
+    if response is not None:
+        return jsonify(response[0]), response[1]
+
+    # Manual tests from the dashboard carry no `ItemId` and always run in full
+    if not data.get('ItemId'):
+        payload, status = process(data, dry_run)
+        return jsonify(payload), status
+
+    (payload, status), deduplicated = deduplicator.run(
+        dedup_key(data, dry_run), process, data, dry_run,
+        should_cache=lambda result: result[1] == 200
+    )
+    return respond(data, payload, status, deduplicated)
+
+
+@log_request(category="webhook", endpoint="playback_stop")
+async def main_async():
+    '''
+    `main` for the ASGI mode, where `jellyfin_webhooks.asgi` routes `/webhook/playback_stop` here:
+    qBittorrent is called with the async client and the filesystem work runs on the bounded executor
+    '''
+    # Reads the settings file
+    response, data, dry_run = await run_blocking(parse_event)
+    if response is not None:
+        return jsonify(response[0]), response[1]
+
+    if not data.get('ItemId'):
+        payload, status = await process_async(data, dry_run)
+        return jsonify(payload), status
+
+    (payload, status), deduplicated = await deduplicator.run_async(
+        dedup_key(data, dry_run), process_async, data, dry_run,
+        should_cache=lambda result: result[1] == 200
+    )
+    return respond(data, payload, status, deduplicated)
+
+
+def parse_event() -> tuple[Optional[tuple[dict, int]], Optional[dict], bool]:
+    '''
+    Returns the response to send when the notification isn't processed (None otherwise), its payload and whether it's a dry run
+    '''
     # Always pull fresh settings to check if enabled
     if not c.settings.get('playback_stop', {}).get('enabled'):
         current_app.logger.info("Received /tagger request but webhook is currently DISABLED.")
-        return jsonify({"status": "disabled"}), 200
+        return ({"status": "disabled"}, 200), None, False
 
     data = request.json
     dry_run = request.args.get('dry_run', 'false').lower() == 'true' or data.get('dry_run', False)
+    # Replayed traffic (`benchmarks/replay.py`) is a dry run that still goes through the event filter,
+    # so events the live service ignored are ignored again
+    replay = request.args.get('replay', 'false').lower() == 'true'
     
-    should_process = (data.get('NotificationType') == 'PlaybackStop' and data.get('PlayedToCompletion', False)) or dry_run
+    watched = data.get('NotificationType') == 'PlaybackStop' and data.get('PlayedToCompletion', False)
+    should_process = watched or (dry_run and not replay)
 
     if not should_process:
-        return jsonify({"status": "ignored", "reason": "Not a watched event"}), 200
-
-    torrent_file_path = None
-    last_ep_torrent_file_path = None
-    if data.get('ItemType') == 'Episode':
-        season = Series(
-            name=data.get('SeriesName'),
-            base_dir = f'/data/media/series/{data.get("SeriesName")}'
-        )[int(data.get('SeasonNumber'))]
-        torrent_file_path = season[data.get('EpisodeNumber')].get_torrent_path()
-        assert torrent_file_path is not None, 'Could not proceed with request. Server was unable to find torrent file corresponding to Episode'
-
-        # Must verify if Episode is part of a `Series Pack`. 
-        #   This is done by checking all episodes, and comparing the torrent file path of the latest episode
-        #   With the torrents (if both `watched` ep and `last` ep have similar root (base-dir), they're a season pack)
-        last_ep_torrent_file_path = season[-1].get_torrent_path()
-        if last_ep_torrent_file_path == torrent_file_path:
-            last_ep_torrent_file_path = None    # If `watched` == `last_ep`, then proceed normally (so tag torrent as watched either way)
-    else:
-        movie = Movie(
-            name=data.get('Name'),
-            base_dir = f'/data/media/movies/{data.get("Name")} ({data.get("PremiereDate").split("-")[0]})'.replace(':', ' -')
-        )
-        torrent_file_path = movie.get_torrent_path()
-    
-    assert torrent_file_path is not None, 'Cannot proceed with torrent_file_path as None'
+        return ({"status": "ignored", "reason": "Not a watched event"}, 200), data, dry_run
+    return None, data, dry_run
+
+
+def dedup_key(data: dict, dry_run: bool) -> tuple:
+    # Dry runs never share results with live events
+    return (data.get('ItemId'), data.get('UserId'), data.get('NotificationType'), bool(dry_run))
+
+
+def respond(data: dict, payload: dict, status: int, deduplicated: Optional[str]):
+    if deduplicated:
+        current_app.logger.info(f"Suppressed duplicate PlaybackStop for: {data.get('Name', '')} ({deduplicated})")
+        payload = dict(payload, deduplicated=deduplicated)
+    return jsonify(payload), status
+
 
+def process(data: dict, dry_run: bool) -> tuple[dict, int]:
+    '''
+    Resolves the watched item and tags its torrent. Returns the response payload and status code
+    '''
+    timer = PhaseTimer()
     # If dry_run is True and we have a media_name, it might be a manual test
     log_prefix = "[DRY RUN]" if dry_run else "[LIVE]"
+
+    # An item tagged before, whose file hasn't changed, skips resolving altogether
+    if c.WATCHED_STORE_ENABLED and data.get('ItemId'):
+        with timer.phase('watched_lookup'):
+            records = watched_store.lookup(item_id=data.get('ItemId'))
+        result = already_watched(records, data, dry_run, timer, log_prefix)
+        if result is not None:
+            return result
+
+    torrent_file_path, last_ep_torrent_file_path = resolve_torrent_paths(data, timer, index=torrent_index, movie_index=movie_index, catalog=library_catalog)
     
+    assert torrent_file_path is not None, 'Cannot proceed with torrent_file_path as None'
+
+    key = file_key(torrent_file_path) if c.WATCHED_STORE_ENABLED else None
+    if key is not None:
+        with timer.phase('watched_lookup'):
+            records = watched_store.lookup(key=key)
+        result = already_watched(records, data, dry_run, timer, log_prefix)
+        if result is not None:
+            if not dry_run:
+                watched_store.attach(key, data)
+            return result
+    
+    log_processing(data, log_prefix)
+    
+    try:
+        # The session `torrents_summary` streams the list with, logged in once and then shared
+        with timer.phase('qbt_login'):
+            get_session()
+        
+        # Concurrent events share a single in-flight torrent list call
+        with timer.phase('torrents_info'):
+            torrents = qbt_calls.torrents_summary()
+        with timer.phase('match_and_tag'):
+            matches, message = TorrentLookup(torrents).match(torrent_file_path, last_ep_torrent_file_path)
+            if matches and not dry_run:
+                qbt_calls.torrents_add_tags(tags='watched', torrent_hashes=[torrent.hash for torrent in matches])
+                if key is not None:
+                    watched_store.record(key, matches, str(torrent_file_path), data, source='playback_stop')
+        return tagged(matches, message, data, dry_run, timer)
+            
+    except Exception as e:
+        current_app.logger.error(f"Error connecting to qBittorrent: {e}")
+        return {"status": "error", "message": str(e)}, 500
+
+
+async def process_async(data: dict, dry_run: bool) -> tuple[dict, int]:
+    '''
+    `process` without blocking the event loop: the watched store, the resolution (filesystem walks and
+    NFO parsing) run on the bounded executor, qBittorrent calls on the async client
+    '''
+    timer = PhaseTimer()
+    log_prefix = "[DRY RUN]" if dry_run else "[LIVE]"
+
+    if c.WATCHED_STORE_ENABLED and data.get('ItemId'):
+        with timer.phase('watched_lookup'):
+            records = await run_blocking(watched_store.lookup, item_id=data.get('ItemId'))
+        result = await already_watched_async(records, data, dry_run, timer, log_prefix)
+        if result is not None:
+            return result
+
+    torrent_file_path, last_ep_torrent_file_path = await run_blocking(
+        resolve_torrent_paths, data, timer, index=torrent_index, movie_index=movie_index, catalog=library_catalog
+    )
+
+    assert torrent_file_path is not None, 'Cannot proceed with torrent_file_path as None'
+
+    key = await run_blocking(file_key, torrent_file_path) if c.WATCHED_STORE_ENABLED else None
+    if key is not None:
+        with timer.phase('watched_lookup'):
+            records = await run_blocking(watched_store.lookup, key=key)
+        result = await already_watched_async(records, data, dry_run, timer, log_prefix)
+        if result is not None:
+            if not dry_run:
+                await run_blocking(watched_store.attach, key, data)
+            return result
+
+    log_processing(data, log_prefix)
+
+    try:
+        with timer.phase('qbt_login'):
+            await async_qbt_calls.client()
+
+        with timer.phase('torrents_info'):
+            torrents = await async_qbt_calls.torrents_summary()
+        with timer.phase('match_and_tag'):
+            matches, message = TorrentLookup(torrents).match(torrent_file_path, last_ep_torrent_file_path)
+            if matches and not dry_run:
+                await async_qbt_calls.torrents_add_tags(tags='watched', torrent_hashes=[torrent.hash for torrent in matches])
+                if key is not None:
+                    await run_blocking(watched_store.record, key, matches, str(torrent_file_path), data, source='playback_stop')
+        return tagged(matches, message, data, dry_run, timer)
+
+    except Exception as e:
+        current_app.logger.error(f"Error connecting to qBittorrent: {e}")
+        return {"status": "error", "message": str(e)}, 500
+
+
+def log_processing(data: dict, log_prefix: str):
     # Get played Percentage
     position_ticks = int(data.get('PlaybackPositionTicks', 0) or 0)
     total_ticks = int(data.get('RunTimeTicks', 0) or 1) # avoid divide by zero
     played_percentage = (position_ticks / total_ticks) * 100
 
     current_app.logger.info(f"{log_prefix} Processing watched event for: {data.get('Name', '')} (Watched {int(played_percentage)}%)")
+
+
+def tagged(matches: list, message: str, data: dict, dry_run: bool, timer: PhaseTimer) -> tuple[dict, int]:
     tagged_torrents = []
-    
-    try:
-        qbt_client = qbittorrentapi.Client(
-            host=c.QBT_HOST, 
-            username=c.QBT_USER, 
-            password=c.QBT_PASS
-        )
-        qbt_client.auth_log_in()
+    for torrent in matches:
+        if not dry_run:
+            current_app.logger.info(f"SUCCESS: Tagged {torrent.name} as 'watched'")
+        else:
+            current_app.logger.info(f"DRY RUN: Found match {torrent.name}")
         
-        torrents = qbt_client.torrents_info()
-        found = False
-        message = ''
-        for torrent in torrents:
-            if torrent.content_path.lower() not in torrent_file_path.as_posix().lower():
-                continue
-
-            # Check if torrent path is also root of `last_ep`
-            if last_ep_torrent_file_path and torrent.content_path.lower() in last_ep_torrent_file_path.as_posix().lower():
-                found = True
-                message = 'Episode is part of a Series Pack, can only tag as watched on series last episode.'
-                break
-                
-            # Check if they match, otherwise
-            if not dry_run:
-                torrent.add_tags(tags='watched')
-                current_app.logger.info(f"SUCCESS: Tagged {torrent.name} as 'watched'")
-            else:
-                current_app.logger.info(f"DRY RUN: Found match {torrent.name}")
-            
-            tagged_torrents.append(torrent.name)
-            found = True
+        tagged_torrents.append(torrent.name)
+    found = bool(matches) or bool(message)
+    
+    if not found:
+        current_app.logger.warning(f"No torrent found matching name: {data.get('Name', '')}")
         
-        if not found:
-            current_app.logger.warning(f"No torrent found matching name: {data.get('Name', '')}")
-            
-        return jsonify({
-            "status": "success",
-            "dry_run": dry_run,
-            "tagged_torrents": tagged_torrents,
-            "match_found": found,
-            "message": message
-        }), 200
-            
+    return {
+        "status": "success",
+        "dry_run": dry_run,
+        "tagged_torrents": tagged_torrents,
+        "match_found": found,
+        "message": message,
+        "timings_ms": timer.to_dict()
+    }, 200
+
+
+def already_watched(records: list, data: dict, dry_run: bool, timer: PhaseTimer, log_prefix: str) -> Optional[tuple[dict, int]]:
+    '''
+    Returns the response for an item whose recorded torrents all still exist and carry `watched`, None otherwise
+    '''
+    if not records:
+        return None
+    try:
+        with timer.phase('watched_verify'):
+            torrents = watched_store.verify(records)
     except Exception as e:
-        current_app.logger.error(f"Error connecting to qBittorrent: {e}")
-        return jsonify({"status": "error", "message": str(e)}), 500
+        current_app.logger.warning(f"Could not verify the watched records of {data.get('Name', '')}: {e}")
+        return None
+    return watched_response(torrents, data, dry_run, timer, log_prefix)
+
+
+async def already_watched_async(records: list, data: dict, dry_run: bool, timer: PhaseTimer, log_prefix: str) -> Optional[tuple[dict, int]]:
+    if not records:
+        return None
+    try:
+        with timer.phase('watched_verify'):
+            torrents = await async_qbt_calls.torrents_summary(torrent_hashes=watched_store.hashes(records))
+            torrents = await run_blocking(watched_store.verify, records, torrents)
+    except Exception as e:
+        current_app.logger.warning(f"Could not verify the watched records of {data.get('Name', '')}: {e}")
+        return None
+    return watched_response(torrents, data, dry_run, timer, log_prefix)
+
+
+def watched_response(torrents: Optional[list], data: dict, dry_run: bool, timer: PhaseTimer, log_prefix: str) -> Optional[tuple[dict, int]]:
+    if torrents is None:
+        return None
+
+    current_app.logger.info(f"{log_prefix} Already tagged as watched: {data.get('Name', '')} ({', '.join(t.name for t in torrents)})")
+    return {
+        "status": "success",
+        "dry_run": dry_run,
+        "tagged_torrents": [torrent.name for torrent in torrents],
+        "match_found": True,
+        "already_watched": True,
+        "message": "Already tagged as watched",
+        "timings_ms": timer.to_dict()
+    }, 200
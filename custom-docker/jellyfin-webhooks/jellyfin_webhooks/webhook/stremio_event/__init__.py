@@ -1,14 +1,57 @@
-from flask import Blueprint, request, current_app
+import time
+import logging
+from flask import Blueprint, request, current_app, jsonify
 from jellyfin_webhooks.utils.constants import constants as c
 from jellyfin_webhooks.utils.decorators import log_request
+from jellyfin_webhooks.utils.pipeline import EventPipeline, JsonlArchiveSink, HttpForwardSink, CounterSink
 
 route = Blueprint('stremio', __name__)
 
+
+def build_sinks() -> list:
+    sinks = []
+    for name in c.STREMIO_SINKS:
+        if name == 'archive':
+            sinks.append(JsonlArchiveSink(c.STREMIO_ARCHIVE_DIR, max_bytes=int(c.STREMIO_ARCHIVE_MAX_MB * 1024 * 1024)))
+        elif name == 'forward':
+            if not c.STREMIO_FORWARD_URL:
+                logging.warning("Stremio `forward` sink is enabled but STREMIO_FORWARD_URL is not set, skipping it")
+                continue
+            sinks.append(HttpForwardSink(c.STREMIO_FORWARD_URL, timeout=c.STREMIO_FORWARD_TIMEOUT))
+        elif name == 'counters':
+            sinks.append(CounterSink())
+        else:
+            logging.warning(f"Unknown Stremio sink `{name}`, skipping it")
+    return sinks
+
+
+# Events are handled off the request thread, so bursts never hold up the server (or the Jellyfin webhook)
+pipeline = EventPipeline(
+    'stremio_event',
+    build_sinks(),
+    maxsize=c.STREMIO_QUEUE_SIZE,
+    workers=c.STREMIO_WORKERS,
+    batch_size=c.STREMIO_BATCH_SIZE,
+    batch_wait=c.STREMIO_BATCH_WAIT,
+    max_retries=c.STREMIO_MAX_RETRIES,
+    backoff_base=c.STREMIO_BACKOFF_BASE,
+    backoff_max=c.STREMIO_BACKOFF_MAX,
+)
+
 @route.route(f'{c.BASE_URL}/webhook/stremio-event', methods=['POST'])
 @log_request(category="webhook", endpoint="stremio-event")
 def handle_stremio():
-    data = request.json
-    current_app.logger.info(f"Stremio Signal Received: {data.get('event')}")
-    
-    # Add your custom logic here (e.g. notify Discord when someone uses Stremio)
-    return "OK", 200
\ No newline at end of file
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Expected a JSON object"}), 400
+
+    dry_run = request.args.get('dry_run', 'false').lower() == 'true' or data.get('dry_run', False)
+    current_app.logger.info(f"{'[DRY RUN]' if dry_run else '[LIVE]'} Stremio Signal Received: {data.get('event')}")
+    if dry_run:
+        # Every sink has side effects (archive, counters, forward), so dry runs never reach the pipeline
+        return jsonify({"status": "dry_run", "event": data.get('event'), "sinks": [sink.name for sink in pipeline.sinks]}), 200
+
+    if not pipeline.submit({"received_at": time.time(), "event": data.get('event'), "payload": data}):
+        current_app.logger.warning("Stremio event queue is full, dropping event")
+        return jsonify({"status": "dropped", "reason": "Event queue is full"}), 429, {"Retry-After": "1"}
+    return jsonify({"status": "queued"}), 202